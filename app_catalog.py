@@ -0,0 +1,462 @@
+"""Installed-application catalog for "open ..." commands.
+
+Applications are found by scanning the platform's own sources instead of a
+hard-coded table. These are executables on PATH, ``.desktop`` entries in the
+XDG ``applications`` directories on Linux, and Start Menu shortcuts on
+Windows. The scan is saved to a JSON index. ``refresh`` only rescans
+directories whose mtime changed, and only re-parses files whose mtime
+changed inside them, so a refresh with nothing installed costs one
+``stat`` per directory. Every name, generic name and file name is indexed
+by character trigrams. A spoken "vs code" or "spot if i" then finds
+Visual Studio Code or Spotify in well under a millisecond. ``python
+app_catalog.py`` runs the whole flow against the fake apps in
+``data/app_fixture`` and reports match accuracy, lookup latency and refresh
+cost; ``python app_catalog.py find vs code`` searches this machine.
+"""
+
+import argparse
+import configparser
+import json
+import logging
+import os
+import re
+import shlex
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from dataclasses import asdict, dataclass, field
+from itertools import chain
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+INDEX_VERSION = 1
+FIXTURE_DIR = Path(__file__).with_name("data") / "app_fixture"
+
+# Lower is preferred when two sources offer the same name
+SOURCE_PRIORITY = {"builtin": 0, "desktop": 1, "start_menu": 1, "path": 2}
+WORD_WEIGHT = 0.9       # a single word of a longer name, e.g. "writer" for LibreOffice Writer
+QUERY_FILLERS = {"the", "my", "app", "application", "program", "please", "up"}
+SHORTCUT_SUFFIXES = (".lnk", ".url", ".appref-ms")
+FIELD_CODE_RE = re.compile(r"%[fFuUdDnNickvm]")
+WORD_RE = re.compile(r"[a-z0-9]+")
+
+# Windows programs that have no Start Menu shortcut, or are asked for by another name
+BUILTIN_APPS = {
+    'notepad': 'notepad.exe',
+    'calculator': 'calc.exe',
+    'paint': 'mspaint.exe',
+    'explorer': 'explorer.exe',
+    'file explorer': 'explorer.exe',
+    'cmd': 'cmd.exe',
+    'command prompt': 'cmd.exe',
+    'powershell': 'powershell.exe',
+    'task manager': 'taskmgr.exe',
+    'control panel': 'control.exe',
+    'settings': 'ms-settings:',
+}
+
+
+@dataclass(frozen=True)
+class Source:
+    path: str
+    kind: str            # "desktop", "start_menu" or "path"
+    recursive: bool = True
+
+
+@dataclass
+class App:
+    name: str
+    source: str          # "desktop", "start_menu", "path" or "builtin"
+    target: str          # command line, executable, shortcut or URI
+    file: str = ""       # file the entry was read from; empty for built-ins
+    mtime: float = 0.0
+    aliases: List[str] = field(default_factory=list)
+
+    def launch(self):
+        """Start the application without waiting for it"""
+        quiet = {"stdin": subprocess.DEVNULL, "stdout": subprocess.DEVNULL, "stderr": subprocess.DEVNULL}
+        if self.source == "start_menu" or self.target.endswith(":"):
+            os.startfile(self.target)
+        elif self.source == "desktop":
+            subprocess.Popen(shlex.split(self.target), start_new_session=True, **quiet)
+        elif self.source == "path":
+            subprocess.Popen([self.target], start_new_session=True, **quiet)
+        else:
+            subprocess.Popen(self.target, shell=True)
+
+
+@dataclass
+class Match:
+    app: App
+    score: float
+    alias: str
+
+
+def words(text: str) -> List[str]:
+    return WORD_RE.findall(text.lower())
+
+
+def compact(text: str) -> str:
+    """Lowercase letters and digits only, so "VS Code", "vs-code" and "vscode" compare equal"""
+    return "".join(words(text))
+
+
+def trigrams(key: str) -> List[str]:
+    padded = f"^{key}$"
+    return list({padded[i:i + 3] for i in range(len(padded) - 2)})
+
+
+def default_sources() -> List[Source]:
+    """Where this platform keeps its launchable applications"""
+    sources = []
+    if sys.platform == "win32":
+        for base in (os.environ.get("APPDATA"), os.environ.get("PROGRAMDATA")):
+            if base:
+                sources.append(Source(os.path.join(base, "Microsoft", "Windows", "Start Menu", "Programs"),
+                                      "start_menu"))
+    else:
+        data_home = os.environ.get("XDG_DATA_HOME") or os.path.expanduser("~/.local/share")
+        data_dirs = (os.environ.get("XDG_DATA_DIRS") or "/usr/local/share:/usr/share").split(":")
+        for base in [data_home, *data_dirs]:
+            if base:
+                sources.append(Source(os.path.join(base, "applications"), "desktop"))
+    for directory in os.environ.get("PATH", "").split(os.pathsep):
+        if directory:
+            sources.append(Source(directory, "path", recursive=False))
+    return list(dict.fromkeys(sources))
+
+
+def parse_desktop_entry(path: str) -> Optional[Tuple[str, List[str], str]]:
+    """(name, other names, command line) of a launchable .desktop file; None for hidden or non-app entries"""
+    parser = configparser.ConfigParser(interpolation=None, strict=False)
+    parser.optionxform = str  # "Name" and "Name[de]" are different keys
+    try:
+        parser.read(path, encoding="utf-8")
+        entry = parser["Desktop Entry"]
+    except (configparser.Error, KeyError, UnicodeDecodeError):
+        return None
+    if (entry.get("Type", "Application") != "Application" or not entry.get("Exec") or not entry.get("Name")
+            or entry.get("NoDisplay", "").lower() == "true" or entry.get("Hidden", "").lower() == "true"):
+        return None
+    command = FIELD_CODE_RE.sub("", entry["Exec"]).replace("%%", "%").strip()
+    # org.gnome.Nautilus.desktop is also known as "nautilus"
+    stem = Path(path).stem
+    others = [entry.get("GenericName", ""), stem, stem.rsplit(".", 1)[-1]]
+    return entry["Name"], [name for name in others if name], command
+
+
+def _is_executable(entry: os.DirEntry) -> bool:
+    if sys.platform == "win32":
+        extensions = os.environ.get("PATHEXT", ".EXE;.BAT;.CMD;.COM").lower().split(";")
+        return os.path.splitext(entry.name)[1].lower() in extensions
+    return entry.is_file() and os.access(entry.path, os.X_OK)
+
+
+def scan_file(source: Source, entry: os.DirEntry, mtime: float) -> List[App]:
+    """Applications defined by one file of a source directory"""
+    stem, suffix = os.path.splitext(entry.name)
+    if source.kind == "desktop":
+        if suffix != ".desktop":
+            return []
+        parsed = parse_desktop_entry(entry.path)
+        if parsed is None:
+            return []
+        name, others, command = parsed
+        return [App(name, "desktop", command, entry.path, mtime, others)]
+    if source.kind == "start_menu":
+        if suffix.lower() not in SHORTCUT_SUFFIXES or stem.lower().startswith("uninstall"):
+            return []
+        return [App(stem, "start_menu", entry.path, entry.path, mtime)]
+    if source.kind == "path" and _is_executable(entry):
+        return [App(stem, "path", entry.path, entry.path, mtime)]
+    return []
+
+
+class _Lookup:
+    """Immutable search structures; a refresh builds a new one and swaps it in"""
+
+    def __init__(self, apps: List[App], min_score: float):
+        self.apps = apps
+        self.min_score = min_score
+        self.keys: List[Tuple[str, int, float, tuple]] = []     # (compact alias, app, weight, preference)
+        self.exact: Dict[str, int] = {}
+        self.postings: Dict[str, List[int]] = {}
+        self.sizes: List[int] = []
+        # Better sources first, then names before other names and single words; the first claim on a key wins
+        candidates = []
+        for app_id, app in enumerate(apps):
+            priority = SOURCE_PRIORITY.get(app.source, 9)
+            candidates.append((priority, 0, compact(app.name), app_id, 1.0))
+            candidates += [(priority, 1, compact(alias), app_id, 1.0) for alias in app.aliases]
+            candidates += [(priority, 2, word, app_id, WORD_WEIGHT) for name in [app.name, *app.aliases]
+                           if len(words(name)) > 1 for word in words(name) if len(word) >= 4]
+        seen = set()
+        for priority, tier, key, app_id, weight in sorted(candidates, key=lambda c: c[:2]):
+            if not key or (key, app_id) in seen:
+                continue
+            seen.add((key, app_id))
+            if weight == 1.0:
+                self.exact.setdefault(key, app_id)
+            key_id = len(self.keys)
+            self.keys.append((key, app_id, weight, (-priority, -tier)))
+            grams = trigrams(key)
+            self.sizes.append(len(grams))
+            for gram in grams:
+                self.postings.setdefault(gram, []).append(key_id)
+
+    def find(self, query: str) -> Optional[Match]:
+        key = "".join(word for word in words(query) if word not in QUERY_FILLERS) or compact(query)
+        if not key:
+            return None
+        app_id = self.exact.get(key)
+        if app_id is not None:
+            return Match(self.apps[app_id], 1.0, key)
+        grams = trigrams(key)
+        counts = Counter(chain.from_iterable(self.postings.get(gram, ()) for gram in grams))
+        best, best_rank = None, None
+        for key_id, common in counts.items():
+            alias, app_id, weight, preference = self.keys[key_id]
+            score = weight * 2 * common / (len(grams) + self.sizes[key_id])
+            rank = (score, preference)
+            if best_rank is None or rank > best_rank:
+                best, best_rank = (key_id, score), rank
+        if best is None or best[1] < self.min_score:
+            return None
+        alias, app_id, _, _ = self.keys[best[0]]
+        return Match(self.apps[app_id], round(best[1], 3), alias)
+
+
+class AppCatalog:
+    """Scanned applications, persisted between runs and searched by trigram similarity"""
+
+    def __init__(self, sources: Optional[Sequence[Source]] = None, index_path: Optional[str] = None,
+                 min_score: float = 0.5, builtins: Optional[Dict[str, str]] = None):
+        self.sources = list(default_sources() if sources is None else sources)
+        self.index_path = Path(index_path) if index_path else None
+        self.min_score = min_score
+        if builtins is None:
+            builtins = BUILTIN_APPS if sys.platform == "win32" else {}
+        self.builtins = [App(name, "builtin", target) for name, target in builtins.items()]
+        self._directories: Dict[str, dict] = {}
+        self._refresh_lock = threading.Lock()
+        self._load()
+        self._lookup = self._build()
+
+    # Index on disk
+    def _load(self):
+        if self.index_path is None:
+            return
+        try:
+            with open(self.index_path, 'r', encoding='utf-8') as f:
+                index = json.load(f)
+        except (OSError, ValueError):
+            return
+        if index.get("version") == INDEX_VERSION:
+            self._directories = index.get("directories", {})
+
+    def save(self):
+        """Write the index through a temporary file so a crash never leaves half of it"""
+        if self.index_path is None:
+            return
+        temp_path = self.index_path.with_suffix(".tmp")
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump({"version": INDEX_VERSION, "directories": self._directories}, f, separators=(",", ":"))
+        os.replace(temp_path, self.index_path)
+
+    # Scanning
+    def refresh(self) -> dict:
+        """Rescan what changed since the last scan; saves and rebuilds the lookup only if something did"""
+        with self._refresh_lock:
+            started = time.perf_counter()
+            stats = {"directories": 0, "rescanned": 0, "parsed": 0}
+            directories: Dict[str, dict] = {}
+            for source in self.sources:
+                self._walk(source, source.path, directories, stats)
+            changed = stats["rescanned"] > 0 or directories.keys() != self._directories.keys()
+            self._directories = directories
+            if changed:
+                self._lookup = self._build()
+                try:
+                    self.save()
+                except OSError as e:
+                    logger.warning(f"Could not save the application index: {e}")
+            stats["apps"] = len(self._lookup.apps)
+            stats["ms"] = round((time.perf_counter() - started) * 1000, 2)
+            return stats
+
+    def _walk(self, source: Source, path: str, out: Dict[str, dict], stats: dict):
+        try:
+            mtime = os.stat(path).st_mtime
+        except OSError:
+            return
+        stats["directories"] += 1
+        old = self._directories.get(path)
+        # A directory's mtime changes when entries are added, removed or renamed in it
+        if old is not None and old["mtime"] == mtime and old["kind"] == source.kind:
+            entry = old
+        else:
+            entry = self._scan_directory(source, path, mtime, old, stats)
+        out[path] = entry
+        for subdirectory in entry["subdirectories"]:
+            if subdirectory not in out:  # symlink loops
+                self._walk(source, subdirectory, out, stats)
+
+    def _scan_directory(self, source: Source, path: str, mtime: float, old: Optional[dict], stats: dict) -> dict:
+        stats["rescanned"] += 1
+        previous: Dict[str, List[dict]] = {}
+        for app in (old or {}).get("apps", ()):
+            previous.setdefault(app["file"], []).append(app)
+        apps, subdirectories = [], []
+        try:
+            with os.scandir(path) as entries:
+                entries = sorted(entries, key=lambda entry: entry.name)
+        except OSError:
+            entries = []
+        for entry in entries:
+            try:
+                if entry.is_dir():
+                    if source.recursive:
+                        subdirectories.append(entry.path)
+                    continue
+                file_mtime = entry.stat().st_mtime
+            except OSError:
+                continue
+            known = previous.get(entry.path)
+            if known and known[0]["mtime"] == file_mtime:
+                apps.extend(known)
+                continue
+            stats["parsed"] += 1
+            apps.extend(asdict(app) for app in scan_file(source, entry, file_mtime))
+        return {"kind": source.kind, "mtime": mtime, "subdirectories": sorted(subdirectories), "apps": apps}
+
+    def _build(self) -> _Lookup:
+        apps = list(self.builtins)
+        seen_desktop_ids = set()
+        for directory in self._directories.values():
+            for values in directory["apps"]:
+                app = App(**values)
+                if app.source == "desktop":
+                    # The same desktop file ID in a later XDG directory is shadowed by the first one
+                    desktop_id = os.path.basename(app.file)
+                    if desktop_id in seen_desktop_ids:
+                        continue
+                    seen_desktop_ids.add(desktop_id)
+                apps.append(app)
+        return _Lookup(apps, self.min_score)
+
+    # Lookup
+    def find(self, query: str, check_installs: bool = True) -> Optional[Match]:
+        """Best application for a spoken name.
+
+        Anything short of an exact match first checks for new installs, since
+        a close fuzzy match ("obs studio" for Visual Studio Code) may only
+        mean the real one is not indexed yet. An unchanged tree costs one
+        stat per directory.
+        """
+        match = self._lookup.find(query)
+        if (match is None or match.score < 1.0) and check_installs and self.refresh()["rescanned"]:
+            match = self._lookup.find(query)
+        return match
+
+    def names(self, include_path: bool = False) -> List[str]:
+        """Names and aliases of the indexed applications; PATH executables only on request"""
+        names = []
+        for app in self._lookup.apps:
+            if app.source != "path" or include_path:
+                names.append(app.name)
+                names.extend(app.aliases)
+        return list(dict.fromkeys(names))
+
+    def stats(self) -> dict:
+        lookup = self._lookup
+        return {"apps": len(lookup.apps), "keys": len(lookup.keys), "trigrams": len(lookup.postings),
+                "directories": len(self._directories)}
+
+
+def fixture_sources(root: Path) -> List[Source]:
+    return [Source(str(root / "applications"), "desktop"),
+            Source(str(root / "start_menu"), "start_menu"),
+            Source(str(root / "bin"), "path", recursive=False)]
+
+
+def benchmark(fixture: Path = FIXTURE_DIR, rounds: int = 200) -> dict:
+    """Index a copy of the fixture tree, check the expected matches, and time lookups and refreshes"""
+    with open(fixture / "queries.json", 'r', encoding='utf-8') as f:
+        cases = json.load(f)
+    with tempfile.TemporaryDirectory() as temporary:
+        root = Path(temporary) / "apps"
+        shutil.copytree(fixture, root, symlinks=True)
+        index_path = root / "index.json"
+
+        started = time.perf_counter()
+        catalog = AppCatalog(fixture_sources(root), index_path, builtins={})
+        first = catalog.refresh()
+        build_ms = (time.perf_counter() - started) * 1000
+
+        started = time.perf_counter()
+        reloaded = AppCatalog(fixture_sources(root), index_path, builtins={})
+        load_ms = (time.perf_counter() - started) * 1000
+        unchanged = reloaded.refresh()
+
+        wrong = []
+        durations = []
+        for case in cases:
+            match = reloaded.find(case["query"], check_installs=False)
+            found = match.app.name if match else None
+            if found != case["app"]:
+                wrong.append({"query": case["query"], "expected": case["app"], "found": found,
+                              "score": match.score if match else None})
+            for _ in range(rounds):
+                started = time.perf_counter()
+                reloaded.find(case["query"], check_installs=False)
+                durations.append(time.perf_counter() - started)
+        durations.sort()
+
+        # Before the refresh "obs studio" is a weak match for Visual Studio; the refresh rescans one directory
+        before_install = reloaded.find("obs studio", check_installs=False)
+        (root / "applications" / "obs.desktop").write_text(
+            "[Desktop Entry]\nName=OBS Studio\nExec=obs\nType=Application\n", encoding="utf-8")
+        after_install = reloaded.refresh()
+        new_install = reloaded.find("obs studio", check_installs=False)
+
+    return {
+        "first_scan": {**first, "total_ms": round(build_ms, 2)},
+        "index_load_ms": round(load_ms, 2),
+        "unchanged_refresh": unchanged,
+        "refresh_after_install": after_install,
+        "before_install": f"{before_install.app.name} ({before_install.score})" if before_install else None,
+        "after_install": f"{new_install.app.name} ({new_install.score})" if new_install else None,
+        "accuracy": f"{len(cases) - len(wrong)}/{len(cases)}",
+        "wrong": wrong,
+        "lookup_mean_us": round(sum(durations) / len(durations) * 1e6, 1),
+        "lookup_p99_us": round(durations[int(len(durations) * 0.99)] * 1e6, 1),
+        "catalog": reloaded.stats(),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Application catalog for Beastboy's open command")
+    parser.add_argument("command", nargs="?", choices=("benchmark", "find", "scan"), default="benchmark")
+    parser.add_argument("query", nargs="*", help="spoken application name for 'find'")
+    parser.add_argument("--index", default="app_index.json", help="index file for 'find' and 'scan'")
+    args = parser.parse_args()
+
+    if args.command == "benchmark":
+        print(json.dumps(benchmark(), indent=2))
+    else:
+        catalog = AppCatalog(index_path=args.index)
+        print(catalog.refresh())
+        if args.command == "find":
+            started = time.perf_counter()
+            match = catalog.find(" ".join(args.query), check_installs=False)
+            elapsed = (time.perf_counter() - started) * 1e6
+            print(f"{match.app.name} ({match.app.source}: {match.app.target}), score {match.score}, "
+                  f"matched {match.alias!r} in {elapsed:.0f} us" if match else f"No match ({elapsed:.0f} us)")
+        else:
+            print(catalog.stats())
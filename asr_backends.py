@@ -0,0 +1,280 @@
+"""Speech recognition backends for Beastboy.
+
+``listen`` and the wake-word fallback talk to a ``RecognizerBackend`` rather
+than to ``recognize_google`` directly, so the engine can be swapped for an
+offline one or a deterministic mock. ``transcribe_alternatives`` returns the
+engine's n-best hypotheses for re-scoring; engines without them return
+their single transcript. ``transcribe_directory`` runs a folder
+of WAV files through a backend on a worker pool and reports the real-time
+factor, for throughput measurements on CPU-only machines.
+"""
+
+import argparse
+import hashlib
+import json
+import logging
+import time
+import wave
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+try:
+    import speech_recognition as sr
+    SPEECH_RECOGNITION_AVAILABLE = True
+except ImportError:
+    SPEECH_RECOGNITION_AVAILABLE = False
+
+try:
+    import vosk
+    VOSK_AVAILABLE = True
+except ImportError:
+    VOSK_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+
+class RecognitionError(Exception):
+    """The engine failed (network, model, quota), as opposed to hearing nothing"""
+
+
+@dataclass
+class Hypothesis:
+    text: str
+    confidence: Optional[float] = None  # engines often score only their top hypothesis
+
+
+class RecognizerBackend:
+    """Base class: turns 16-bit mono PCM into lowercase text ('' if nothing was understood)"""
+
+    name = "base"
+    offline = False
+
+    def transcribe(self, audio: bytes, sample_rate: int, sample_width: int = 2,
+                   language: str = 'en-US') -> str:
+        raise NotImplementedError
+
+    def transcribe_alternatives(self, audio: bytes, sample_rate: int, sample_width: int = 2,
+                                language: str = 'en-US', limit: int = 5) -> List[Hypothesis]:
+        """Up to ``limit`` hypotheses, best first; empty if nothing was understood"""
+        text = self.transcribe(audio, sample_rate, sample_width, language)
+        return [Hypothesis(text)] if text else []
+
+    def close(self):
+        """Release models or connections"""
+
+
+class GoogleBackend(RecognizerBackend):
+    """The free Google Web Speech API through speech_recognition"""
+
+    name = "google"
+
+    def __init__(self, recognizer=None):
+        if not SPEECH_RECOGNITION_AVAILABLE:
+            raise RecognitionError("speech_recognition is not installed")
+        self.recognizer = recognizer or sr.Recognizer()
+
+    def transcribe(self, audio: bytes, sample_rate: int, sample_width: int = 2,
+                   language: str = 'en-US') -> str:
+        try:
+            audio_data = sr.AudioData(audio, sample_rate, sample_width)
+            return self.recognizer.recognize_google(audio_data, language=language).lower()
+        except sr.UnknownValueError:
+            return ""
+        except sr.RequestError as e:
+            raise RecognitionError(str(e)) from e
+
+    def transcribe_alternatives(self, audio: bytes, sample_rate: int, sample_width: int = 2,
+                                language: str = 'en-US', limit: int = 5) -> List[Hypothesis]:
+        try:
+            audio_data = sr.AudioData(audio, sample_rate, sample_width)
+            # show_all returns the raw response: {"alternative": [{"transcript", "confidence"?}, ...]} or []
+            response = self.recognizer.recognize_google(audio_data, language=language, show_all=True)
+        except sr.UnknownValueError:
+            return []
+        except sr.RequestError as e:
+            raise RecognitionError(str(e)) from e
+        if not isinstance(response, dict):
+            return []
+        return [Hypothesis(alternative["transcript"].lower(), alternative.get("confidence"))
+                for alternative in response.get("alternative", [])[:limit] if alternative.get("transcript")]
+
+
+class VoskBackend(RecognizerBackend):
+    """Offline Kaldi recognition with a downloaded Vosk model"""
+
+    name = "vosk"
+    offline = True
+
+    def __init__(self, model_path: str = "models/vosk-model-small-en-us-0.15"):
+        if not VOSK_AVAILABLE:
+            raise RecognitionError("Vosk is not installed. Please install it: pip install vosk")
+        if not Path(model_path).is_dir():
+            raise RecognitionError(f"Vosk model not found at {model_path}")
+        vosk.SetLogLevel(-1)
+        # The model is read-only and shared; recognizers are cheap and per call
+        self.model = vosk.Model(model_path)
+
+    def transcribe(self, audio: bytes, sample_rate: int, sample_width: int = 2,
+                   language: str = 'en-US') -> str:
+        recognizer = vosk.KaldiRecognizer(self.model, sample_rate)
+        recognizer.AcceptWaveform(audio)
+        return json.loads(recognizer.FinalResult()).get("text", "").lower()
+
+    def transcribe_alternatives(self, audio: bytes, sample_rate: int, sample_width: int = 2,
+                                language: str = 'en-US', limit: int = 5) -> List[Hypothesis]:
+        recognizer = vosk.KaldiRecognizer(self.model, sample_rate)
+        recognizer.SetMaxAlternatives(limit)
+        recognizer.AcceptWaveform(audio)
+        # Kaldi confidences are unnormalised lattice scores, useful only for ordering
+        return [Hypothesis(alternative["text"].lower(), alternative.get("confidence"))
+                for alternative in json.loads(recognizer.FinalResult()).get("alternatives", [])
+                if alternative.get("text")]
+
+
+class MockBackend(RecognizerBackend):
+    """Deterministic engine: returns the transcripts registered for the exact audio bytes.
+
+    A transcript file with several lines registers n-best alternatives, best first.
+    """
+
+    name = "mock"
+    offline = True
+
+    def __init__(self, transcripts: Optional[Dict[str, str]] = None, default: str = "",
+                 directory: Optional[str] = None):
+        self.transcripts = dict(transcripts or {})
+        self.default = default
+        if directory:
+            self.load_directory(directory)
+
+    @staticmethod
+    def fingerprint(audio: bytes) -> str:
+        return hashlib.sha1(audio).hexdigest()
+
+    def register(self, audio: bytes, text: str):
+        self.transcripts[self.fingerprint(audio)] = text.lower()
+
+    def load_directory(self, directory: str):
+        """Register every ``clip.wav`` that has a ``clip.txt`` transcript next to it"""
+        for wav_path in Path(directory).glob("*.wav"):
+            text_path = wav_path.with_suffix(".txt")
+            if text_path.exists():
+                audio, _, _ = read_wav(wav_path)
+                self.register(audio, text_path.read_text(encoding="utf-8").strip())
+
+    def transcribe(self, audio: bytes, sample_rate: int, sample_width: int = 2,
+                   language: str = 'en-US') -> str:
+        return self.transcripts.get(self.fingerprint(audio), self.default).split("\n")[0]
+
+    def transcribe_alternatives(self, audio: bytes, sample_rate: int, sample_width: int = 2,
+                                language: str = 'en-US', limit: int = 5) -> List[Hypothesis]:
+        lines = self.transcripts.get(self.fingerprint(audio), self.default).split("\n")
+        return [Hypothesis(line.strip()) for line in lines[:limit] if line.strip()]
+
+
+BACKENDS: Dict[str, type] = {
+    GoogleBackend.name: GoogleBackend,
+    VoskBackend.name: VoskBackend,
+    MockBackend.name: MockBackend,
+}
+
+
+def create_backend(name: str, **options) -> RecognizerBackend:
+    """Instantiate a registered backend by name"""
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown ASR engine '{name}', choose from {sorted(BACKENDS)}")
+    return BACKENDS[name](**options)
+
+
+def read_wav(path) -> Tuple[bytes, int, int]:
+    """Read a mono WAV file as (frames, sample_rate, sample_width)"""
+    with wave.open(str(path), 'rb') as wav:
+        if wav.getnchannels() != 1:
+            raise ValueError(f"{path}: only mono WAV files are supported")
+        return wav.readframes(wav.getnframes()), wav.getframerate(), wav.getsampwidth()
+
+
+@dataclass
+class BatchResult:
+    path: str
+    text: str
+    audio_seconds: float
+    seconds: float
+    error: Optional[str] = None
+
+
+@dataclass
+class BatchReport:
+    engine: str
+    workers: int
+    wall_seconds: float
+    results: List[BatchResult] = field(default_factory=list)
+
+    @property
+    def audio_seconds(self) -> float:
+        return sum(r.audio_seconds for r in self.results)
+
+    @property
+    def real_time_factor(self) -> float:
+        """Wall-clock processing time per second of audio (lower is faster)"""
+        return self.wall_seconds / self.audio_seconds if self.audio_seconds else 0.0
+
+    def summary(self) -> dict:
+        return {
+            "engine": self.engine,
+            "workers": self.workers,
+            "files": len(self.results),
+            "errors": sum(1 for r in self.results if r.error),
+            "audio_seconds": round(self.audio_seconds, 2),
+            "wall_seconds": round(self.wall_seconds, 3),
+            "real_time_factor": round(self.real_time_factor, 4),
+            "per_file_rtf": round(sum(r.seconds for r in self.results) / self.audio_seconds, 4)
+            if self.audio_seconds else 0.0,
+        }
+
+
+def transcribe_directory(backend: RecognizerBackend, directory: str, workers: int = 4,
+                         language: str = 'en-US') -> BatchReport:
+    """Transcribe every WAV in ``directory`` through a pool of ``workers`` threads"""
+    paths = sorted(Path(directory).glob("*.wav"))
+
+    def run(path: Path) -> BatchResult:
+        audio, sample_rate, sample_width = read_wav(path)
+        audio_seconds = len(audio) / (sample_rate * sample_width)
+        started = time.perf_counter()
+        try:
+            text = backend.transcribe(audio, sample_rate, sample_width, language)
+            return BatchResult(str(path), text, audio_seconds, time.perf_counter() - started)
+        except Exception as e:
+            return BatchResult(str(path), "", audio_seconds, time.perf_counter() - started, str(e))
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        results = list(pool.map(run, paths))
+    return BatchReport(backend.name, workers, time.perf_counter() - started, results)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Batch-transcribe a folder of WAV files")
+    parser.add_argument("directory")
+    parser.add_argument("--engine", default="vosk", choices=sorted(BACKENDS))
+    parser.add_argument("--model", default="models/vosk-model-small-en-us-0.15", help="Vosk model directory")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--language", default="en-US")
+    parser.add_argument("--show", action="store_true", help="print every transcript")
+    args = parser.parse_args()
+
+    if args.engine == "vosk":
+        engine = create_backend("vosk", model_path=args.model)
+    elif args.engine == "mock":
+        engine = create_backend("mock", directory=args.directory)
+    else:
+        engine = create_backend(args.engine)
+
+    report = transcribe_directory(engine, args.directory, args.workers, args.language)
+    if args.show:
+        for result in report.results:
+            print(f"{Path(result.path).name}: {result.error or result.text}")
+    print(report.summary())
@@ -0,0 +1,454 @@
+"""Continuous audio capture for Beastboy.
+
+One audio stream stays open for the whole process and a background thread
+copies its frames into a preallocated ring buffer. The wake-word and command
+stages read windows out of that buffer through independent cursors, so no
+audio is lost between two calls to ``listen``.
+"""
+
+import argparse
+import array
+import logging
+import math
+import threading
+import time
+import wave
+from typing import Callable, Iterable, Iterator, List, Optional
+
+try:
+    import speech_recognition as sr
+    _AudioSourceBase = sr.AudioSource
+except ImportError:
+    sr = None
+    _AudioSourceBase = object
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SAMPLE_RATE = 16000
+DEFAULT_SAMPLE_WIDTH = 2
+DEFAULT_CHUNK = 1024
+
+
+class AudioInputSource:
+    """Base class for anything that produces raw PCM frames"""
+
+    sample_rate = DEFAULT_SAMPLE_RATE
+    sample_width = DEFAULT_SAMPLE_WIDTH
+    chunk = DEFAULT_CHUNK
+    # Live sources block in read() and pace themselves; file and synthetic
+    # sources can be drained as fast as the consumer wants.
+    realtime = False
+
+    def open(self):
+        """Open the underlying device or file"""
+
+    def read(self) -> bytes:
+        """Return the next chunk of frames, or b'' when the source is exhausted"""
+        raise NotImplementedError
+
+    def close(self):
+        """Release the underlying device or file"""
+
+
+class MicrophoneSource(AudioInputSource):
+    """Live microphone input through speech_recognition's PyAudio wrapper"""
+
+    realtime = True
+
+    def __init__(self, microphone=None):
+        if microphone is None:
+            if sr is None:
+                raise ImportError("speech_recognition is required for microphone capture")
+            microphone = sr.Microphone(sample_rate=DEFAULT_SAMPLE_RATE)
+        self.microphone = microphone
+        self.sample_rate = microphone.SAMPLE_RATE
+        self.sample_width = microphone.SAMPLE_WIDTH
+        self.chunk = microphone.CHUNK
+        self._stream = None
+
+    def open(self):
+        self._stream = self.microphone.__enter__().stream
+
+    def read(self) -> bytes:
+        return self._stream.read(self.chunk)
+
+    def close(self):
+        if self._stream is not None:
+            self._stream = None
+            self.microphone.__exit__(None, None, None)
+
+
+class WavFileSource(AudioInputSource):
+    """Replay a mono WAV file, optionally looping and paced in real time"""
+
+    def __init__(self, path: str, chunk: int = DEFAULT_CHUNK, loop: bool = False, realtime: bool = False):
+        self.path = path
+        self.chunk = chunk
+        self.loop = loop
+        self.realtime = realtime
+        self._wav = None
+        with wave.open(path, 'rb') as wav:
+            if wav.getnchannels() != 1:
+                raise ValueError(f"{path}: only mono WAV files are supported")
+            self.sample_rate = wav.getframerate()
+            self.sample_width = wav.getsampwidth()
+
+    def open(self):
+        self._wav = wave.open(self.path, 'rb')
+
+    def read(self) -> bytes:
+        data = self._wav.readframes(self.chunk)
+        if not data and self.loop:
+            self._wav.rewind()
+            data = self._wav.readframes(self.chunk)
+        if self.realtime and data:
+            time.sleep(len(data) / (self.sample_rate * self.sample_width))
+        return data
+
+    def close(self):
+        if self._wav is not None:
+            self._wav.close()
+            self._wav = None
+
+
+class GeneratorSource(AudioInputSource):
+    """Pull frames from any iterable of bytes, e.g. a synthetic signal generator"""
+
+    def __init__(self, frames: Iterable[bytes], sample_rate: int = DEFAULT_SAMPLE_RATE,
+                 sample_width: int = DEFAULT_SAMPLE_WIDTH, realtime: bool = False):
+        self.frames = frames
+        self.sample_rate = sample_rate
+        self.sample_width = sample_width
+        self.realtime = realtime
+        self._iterator: Optional[Iterator[bytes]] = None
+
+    def open(self):
+        self._iterator = iter(self.frames)
+
+    def read(self) -> bytes:
+        data = next(self._iterator, b'')
+        if self.realtime and data:
+            time.sleep(len(data) / (self.sample_rate * self.sample_width))
+        return data
+
+
+class RingBuffer:
+    """Fixed-size byte ring addressed by absolute stream positions.
+
+    Positions grow monotonically from zero; the buffer only ever holds the
+    most recent ``capacity`` bytes. ``window`` hands out memoryviews into the
+    backing store; the writer overwrites them in place, so they are only
+    stable while ``_cond`` is held and readers copy before releasing it.
+    """
+
+    def __init__(self, capacity: int):
+        if capacity <= 0:
+            raise ValueError("capacity must be positive")
+        self.capacity = capacity
+        self._data = bytearray(capacity)
+        self._view = memoryview(self._data)
+        self.write_pos = 0
+        self.closed = False
+        self._cond = threading.Condition()
+
+    @property
+    def oldest_pos(self) -> int:
+        """Oldest absolute position still held in the buffer"""
+        return max(0, self.write_pos - self.capacity)
+
+    def write(self, data: bytes):
+        """Append data, overwriting the oldest bytes when full"""
+        size = len(data)
+        if size == 0:
+            return
+        with self._cond:
+            if size > self.capacity:
+                data = data[-self.capacity:]
+                self.write_pos += size - self.capacity
+                size = self.capacity
+            start = self.write_pos % self.capacity
+            first = min(size, self.capacity - start)
+            self._view[start:start + first] = data[:first]
+            if first < size:
+                self._view[0:size - first] = data[first:]
+            self.write_pos += size
+            self._cond.notify_all()
+
+    def close(self):
+        """Wake every waiting reader; no more data will arrive"""
+        with self._cond:
+            self.closed = True
+            self._cond.notify_all()
+
+    def wait_for(self, position: int, timeout: Optional[float] = None) -> bool:
+        """Block until ``position`` bytes have been written. Returns False on timeout or close"""
+        with self._cond:
+            return self._cond.wait_for(lambda: self.write_pos >= position or self.closed,
+                                       timeout) and self.write_pos >= position
+
+    def window(self, start: int, end: int) -> List[memoryview]:
+        """Views covering [start, end), one segment or two when wrapping; call with ``_cond`` held"""
+        if start < self.oldest_pos or end > self.write_pos or start > end:
+            raise IndexError(f"window [{start}, {end}) outside buffer "
+                             f"[{self.oldest_pos}, {self.write_pos})")
+        if start == end:
+            return []
+        lo = start % self.capacity
+        hi = lo + (end - start)
+        if hi <= self.capacity:
+            return [self._view[lo:hi]]
+        return [self._view[lo:], self._view[:hi - self.capacity]]
+
+    def copy(self, start: int, end: int) -> bytes:
+        """Materialise [start, end) as bytes, e.g. for handing audio to a recognizer"""
+        with self._cond:
+            return b''.join(self.window(start, end))
+
+
+class RingReader:
+    """Independent cursor into a RingBuffer"""
+
+    def __init__(self, ring: RingBuffer, position: Optional[int] = None):
+        self.ring = ring
+        self.position = ring.write_pos if position is None else position
+        self.overruns = 0
+
+    def seek_to_live(self, preroll: int = 0):
+        """Skip everything buffered so far, keeping ``preroll`` bytes of history"""
+        with self.ring._cond:
+            self.position = max(self.ring.oldest_pos, self.ring.write_pos - preroll)
+            # A capture thread pacing itself on this reader may be waiting for room
+            self.ring._cond.notify_all()
+
+    def read(self, size: int, timeout: Optional[float] = None) -> Optional[bytes]:
+        """Return a copy of the next ``size`` bytes, or None on timeout/close.
+
+        The copy is taken under the buffer lock, so the capture thread cannot
+        overwrite the window halfway through. A reader that fell further
+        behind than the buffer capacity is moved forward to the oldest
+        retained byte and the overrun is counted.
+        """
+        if not self.ring.wait_for(self.position + size, timeout):
+            return None
+        with self.ring._cond:
+            oldest = self.ring.oldest_pos
+            if self.position < oldest:
+                self.overruns += 1
+                logger.warning(f"Audio reader overrun, skipped {oldest - self.position} bytes")
+                self.position = oldest
+            end = min(self.position + size, self.ring.write_pos)
+            data = b''.join(self.ring.window(self.position, end))
+            self.position = end
+            self.ring._cond.notify_all()
+        return data
+
+    def read_bytes(self, size: int, timeout: Optional[float] = None) -> bytes:
+        """Like read(), but b'' on timeout/close"""
+        return self.read(size, timeout) or b''
+
+
+class AudioCapture:
+    """Keeps one input stream open and feeds it into a ring buffer on a thread"""
+
+    def __init__(self, source: AudioInputSource, buffer_seconds: float = 30.0):
+        self.source = source
+        self.sample_rate = source.sample_rate
+        self.sample_width = source.sample_width
+        self.chunk = source.chunk
+        self.bytes_per_second = self.sample_rate * self.sample_width
+        self.ring = RingBuffer(int(buffer_seconds * self.bytes_per_second))
+        self.frames_captured = 0
+        self._thread: Optional[threading.Thread] = None
+        self._running = False
+        self._on_frame: List[Callable[[bytes], None]] = []
+        self._pace_reader: Optional[RingReader] = None
+
+    @property
+    def running(self) -> bool:
+        return self._running
+
+    def add_frame_listener(self, callback: Callable[[bytes], None]):
+        """Call ``callback(frame)`` from the capture thread for every chunk"""
+        self._on_frame.append(callback)
+
+    def pace_with(self, reader: Optional[RingReader]):
+        """Throttle non-realtime sources so ``reader`` is never overrun"""
+        self._pace_reader = reader
+
+    def _wait_for_pace_reader(self, size: int):
+        reader = self._pace_reader
+        if reader is None or self.source.realtime:
+            return
+        ring = self.ring
+        with ring._cond:
+            ring._cond.wait_for(lambda: not self._running
+                                or ring.write_pos + size - reader.position <= ring.capacity)
+
+    def start(self):
+        """Open the source and start the capture thread"""
+        if self._running:
+            return
+        self.source.open()
+        self._running = True
+        self._thread = threading.Thread(target=self._capture_loop, name="audio-capture", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop capturing and release the source"""
+        self._running = False
+        with self.ring._cond:
+            self.ring._cond.notify_all()
+        if self._thread and self._thread is not threading.current_thread():
+            self._thread.join(timeout=2)
+        self._thread = None
+        self.ring.close()
+
+    def _capture_loop(self):
+        try:
+            while self._running:
+                data = self.source.read()
+                if not data:
+                    break
+                self._wait_for_pace_reader(len(data))
+                self.ring.write(data)
+                self.frames_captured += len(data) // self.sample_width
+                for callback in self._on_frame:
+                    callback(data)
+        except Exception as e:
+            logger.error(f"Audio capture stopped: {e}")
+        finally:
+            self._running = False
+            self.ring.close()
+            try:
+                self.source.close()
+            except Exception:
+                pass
+
+    def reader(self, preroll_seconds: float = 0.0) -> RingReader:
+        """New cursor starting at the live position minus an optional preroll"""
+        reader = RingReader(self.ring)
+        reader.seek_to_live(int(preroll_seconds * self.bytes_per_second) // self.sample_width * self.sample_width)
+        return reader
+
+    def seconds(self, size: int) -> float:
+        """Convert a byte count into seconds of audio"""
+        return size / self.bytes_per_second
+
+
+def pcm_samples(frame, sample_width: int = DEFAULT_SAMPLE_WIDTH):
+    """View 16-bit PCM bytes as a sequence of ints (a NumPy array when available)"""
+    if sample_width != 2:
+        raise ValueError("only 16-bit PCM is supported")
+    if NUMPY_AVAILABLE:
+        return np.frombuffer(frame, dtype=np.int16)
+    samples = array.array('h')
+    samples.frombytes(bytes(frame))
+    return samples
+
+
+def frame_rms(frame, sample_width: int = DEFAULT_SAMPLE_WIDTH) -> float:
+    """Root-mean-square amplitude of a chunk of 16-bit PCM"""
+    samples = pcm_samples(frame, sample_width)
+    if len(samples) == 0:
+        return 0.0
+    if NUMPY_AVAILABLE:
+        values = samples.astype(np.float64)
+        return float(np.sqrt(np.dot(values, values) / len(values)))
+    return math.sqrt(sum(x * x for x in samples) / len(samples))
+
+
+class _CaptureStream:
+    """File-like stream over a RingReader, as speech_recognition expects"""
+
+    def __init__(self, reader: RingReader, timeout: Optional[float]):
+        self.reader = reader
+        self.timeout = timeout
+
+    def read(self, size: int) -> bytes:
+        return self.reader.read_bytes(size, self.timeout)
+
+    def close(self):
+        pass
+
+
+class CaptureAudioSource(_AudioSourceBase):
+    """speech_recognition AudioSource backed by a shared AudioCapture.
+
+    Entering the context does not touch the device; it just hands the
+    recognizer a stream that reads from this source's cursor.
+    """
+
+    def __init__(self, capture: AudioCapture, reader: Optional[RingReader] = None,
+                 read_timeout: Optional[float] = 1.0):
+        self.capture = capture
+        self.reader = reader or capture.reader()
+        self.SAMPLE_RATE = capture.sample_rate
+        self.SAMPLE_WIDTH = capture.sample_width
+        self.CHUNK = capture.chunk
+        self.stream = _CaptureStream(self.reader, read_timeout)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return None
+
+
+def synthetic_frames(seconds: float, sample_rate: int = DEFAULT_SAMPLE_RATE,
+                     chunk: int = DEFAULT_CHUNK, frequency: float = 440.0,
+                     amplitude: int = 8000) -> Iterator[bytes]:
+    """Generate 16-bit mono sine-wave chunks, for headless benchmarking"""
+    total = int(seconds * sample_rate)
+    step = 2 * math.pi * frequency / sample_rate
+    produced = 0
+    while produced < total:
+        count = min(chunk, total - produced)
+        samples = array.array('h', (int(amplitude * math.sin(step * (produced + i))) for i in range(count)))
+        produced += count
+        yield samples.tobytes()
+
+
+def benchmark(source: AudioInputSource, window_seconds: float = 0.5) -> dict:
+    """Capture ``source`` to exhaustion while a reader drains fixed windows"""
+    capture = AudioCapture(source, buffer_seconds=5)
+    reader = RingReader(capture.ring, 0)
+    capture.pace_with(reader)
+    window = int(window_seconds * capture.bytes_per_second)
+    windows = 0
+    started = time.perf_counter()
+    cpu_started = time.process_time()
+    capture.start()
+    while reader.read(window, timeout=1.0) is not None:
+        windows += 1
+    capture.stop()
+    elapsed = time.perf_counter() - started
+    audio_seconds = capture.frames_captured / capture.sample_rate
+    return {
+        "audio_seconds": round(audio_seconds, 3),
+        "wall_seconds": round(elapsed, 4),
+        "cpu_seconds": round(time.process_time() - cpu_started, 4),
+        "windows_read": windows,
+        "reader_overruns": reader.overruns,
+        "realtime_factor": round(elapsed / audio_seconds, 5) if audio_seconds else None,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the Beastboy capture ring buffer")
+    parser.add_argument("--wav", help="mono WAV file to replay instead of a synthetic tone")
+    parser.add_argument("--seconds", type=float, default=60.0, help="length of the synthetic signal")
+    parser.add_argument("--window", type=float, default=0.5, help="reader window in seconds")
+    args = parser.parse_args()
+
+    if args.wav:
+        source = WavFileSource(args.wav)
+    else:
+        # Pre-render the tone so the benchmark measures the buffer, not the generator
+        source = GeneratorSource(list(synthetic_frames(args.seconds)))
+    print(benchmark(source, args.window))
@@ -1,54 +1,63 @@
 import speech_recognition as sr
-import pyttsx3
-import subprocess
 import os
 import webbrowser
 import datetime
 import psutil
-import json
 import threading
 import time
-import requests
-from pathlib import Path
-import re
-import asyncio
-import aiohttp
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, Set, Tuple, Union
 import logging
 from dataclasses import dataclass
 from enum import Enum
 import sys
-import tkinter as tk
-from tkinter import messagebox
-import pystray
-from PIL import Image, ImageDraw
 import queue
 import signal
 
-# Optional imports with fallbacks
-try:
-    from googletrans import Translator
-    TRANSLATION_AVAILABLE = True
-except ImportError:
-    TRANSLATION_AVAILABLE = False
-
-try:
-    import wikipedia
-    WIKIPEDIA_AVAILABLE = True
-except ImportError:
-    WIKIPEDIA_AVAILABLE = False
-
-try:
-    import yfinance as yf
-    STOCKS_AVAILABLE = True
-except ImportError:
-    STOCKS_AVAILABLE = False
-
-try:
-    import openai
-    OPENAI_AVAILABLE = True
-except ImportError:
-    OPENAI_AVAILABLE = False
+from app_catalog import AppCatalog
+from asr_backends import RecognitionError, create_backend
+from audio_capture import AudioCapture, MicrophoneSource
+from conversation import ConversationMemory
+from dispatcher import SpeculativeDispatcher
+from http_client import HttpClient, HttpClientConfig, HttpError
+from intent_router import Intent, IntentRouter, default_router
+from language_id import LanguageIdentifier
+import math_engine
+from llm_stream import StreamingReply, open_chat_stream
+import log_pipeline
+from nbest import ENTITIES_PATH, HypothesisRescorer, load_entities
+from phrases import Phrase, PhraseBook, phrase
+from metrics import MetricsRegistry, start_metrics_server
+from reminders import ReminderScheduler, describe_due, parse_reminder
+from response_cache import CachePolicy, ResponseCache
+from settings import DEFAULT_CONFIG, ConfigWatcher, Settings, load_settings
+from voice_pipeline import VoicePipeline
+from speech_output import Priority, SpeechOutput
+from startup import StartupTimer, lazy_import, module_available
+from system_monitor import METRICS, MonitorConfig, SystemMonitor
+from tts_cache import TtsCache, WavPlayer
+from vad import UtteranceSegmenter, VadConfig, VoiceActivityDetector
+from wake_word import WakeWordUnavailable, create_detector
+
+# Optional imports are checked without importing; each module loads on first use
+TRANSLATION_AVAILABLE = module_available("googletrans")
+STOCKS_AVAILABLE = module_available("yfinance")
+OPENAI_AVAILABLE = module_available("openai")
+googletrans = lazy_import("googletrans")
+yf = lazy_import("yfinance")
+openai = lazy_import("openai")
+messagebox = lazy_import("tkinter.messagebox")
+# The tray needs a display; importing pystray on a headless host fails, so it waits for setup_tray_icon
+pystray = lazy_import("pystray")
+Image = lazy_import("PIL.Image")
+ImageDraw = lazy_import("PIL.ImageDraw")
+
+# Config sections read only at startup; changing them is logged as needing a restart
+RESTART_SECTIONS = {"pipeline", "reminders", "startup", "metrics", "http", "tts_cache", "asr", "vad"}
+
+AI_SYSTEM_PROMPT = ("You are Beastboy, a helpful Windows voice assistant running in the background. "
+                    "Provide concise, helpful responses. If the user asks you to perform a system action, "
+                    "clearly state what action should be taken. Keep responses under 50 words unless "
+                    "specifically asked for more detail.")
 
 class ServiceStatus(Enum):
     ENABLED = "enabled"
@@ -65,42 +74,76 @@ class SystemInfo:
 class EnhancedBeastboy:
     def __init__(self):
         """Initialize the Beastboy assistant with background operation"""
-        self.setup_logging()
-        self.initialize_speech_components()
-        self.load_configuration()
-        self.setup_services()
+        self.startup = StartupTimer()
+        with self.startup.phase("config"):
+            self.setup_logging()
+            self.load_configuration()
+            if self.config["logging"] != DEFAULT_CONFIG["logging"]:
+                self.setup_logging(self.config["logging"])
+        with self.startup.phase("speech"):
+            self.initialize_speech_components()
+            self.setup_recognizer_backend()
+            self.setup_metrics()
+        with self.startup.phase("services"):
+            self.http = HttpClient(HttpClientConfig.from_dict(self.config.get("http", {})))
+            self.setup_response_cache()
+            self.setup_dispatcher()
+            self.setup_reminders()
+            self.setup_system_monitor()
+            self.setup_app_catalog()
+            self.setup_services()
+            self.setup_language_id()
+            self.phrase_book = PhraseBook()
+            self.setup_intent_handlers()
+            self.setup_rescorer()
         
         self.listening = False
-        self.wake_words = ["hey bb", "bb", "hey b b", "b b","beasty","hey beasty", "beastboy"]
+        self.wake_words = list(self.settings.system.wake_words)
+        with self.startup.phase("wake_word"):
+            self.setup_voice_activity_detection()
+            self.setup_wake_word_detector()
         self.current_language = 'en'
         self.session_active = False
         self.running = True
         self.paused = False
         
-        # Background operation setup
+        # Background operation setup; responses are spoken by the speech output worker
         self.command_queue = queue.Queue()
-        self.response_queue = queue.Queue()
+        self.response_queue = self.speech_output.queue
+        pipeline_config = self.config.get("pipeline", {})
+        self.pipeline = VoicePipeline(self, queue_size=pipeline_config.get("queue_size", 4),
+                                      max_workers=pipeline_config.get("max_workers", 4), metrics=self.metrics)
         
         # System tray setup
         self.tray_icon = None
-        self.setup_tray_icon()
+        with self.startup.phase("tray"):
+            self.setup_tray_icon()
+        self.setup_config_watcher()
+        
+        # Pre-render constant responses so they play without synthesis
+        self.fixed_phrases = {
+            phrase("ack"),
+            phrase("listening_again"),
+            phrase("paused_hint"),
+            phrase("now_paused"),
+            phrase("now_resumed"),
+            phrase("voice_test"),
+            phrase("goodbye"),
+            phrase("not_understood"),
+            self.get_help_text()
+        }
+        self.speech_output.warm(self.fixed_phrases)
         
         self.logger.info("Beastboy initialized successfully for background operation!")
         print("🤖 Beastboy is running in background! Minimizing to system tray...")
         
         # Initial greeting
-        self.speak("Hello! I'm Beastboy, your voice assistant. I'm now running in the background. Say BB or Beasty To wake me up")
-
-    def setup_logging(self):
-        """Setup logging configuration"""
-        logging.basicConfig(
-            level=logging.INFO,
-            format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-            handlers=[
-                logging.FileHandler('beastboy.log'),
-                logging.StreamHandler()
-            ]
-        )
+        self.speak("Hello! I'm Beastboy, your voice assistant. I'm now running in the background. Say BB or Beasty To wake me up",
+                   priority=Priority.BACKGROUND)
+
+    def setup_logging(self, values: Optional[Dict[str, Any]] = None):
+        """Log through a queue to a rotating JSON file; calling it again replaces the pipeline"""
+        self.log_pipeline = log_pipeline.setup_logging(values if values is not None else DEFAULT_CONFIG["logging"])
         self.logger = logging.getLogger(__name__)
 
     def create_tray_image(self):
@@ -145,101 +188,336 @@ class EnhancedBeastboy:
         """Initialize speech recognition and text-to-speech with better error handling"""
         try:
             self.recognizer = sr.Recognizer()
-            self.microphone = sr.Microphone()
-            self.engine = pyttsx3.init()
+            self.microphone = sr.Microphone(sample_rate=16000)
             
-            # Configure voice settings
-            self.engine.setProperty('rate', 200)
-            self.engine.setProperty('volume', 0.9)
+            # The TTS engine lives on its own worker thread; unless configured to wait,
+            # engine and voice setup finish there while startup continues
+            cache, player = self.create_tts_cache()
+            voice = self.settings.voice
+            self.speech_output = SpeechOutput(rate=voice.rate, volume=voice.volume, voice_index=voice.voice_index,
+                                              cache=cache, player=player)
+            wait_for_tts = self.config.get("startup", {}).get("wait_for_tts", False)
+            self.speech_output.start(timeout=10.0 if wait_for_tts else 0)
             
-            # Set voice preference
-            voices = self.engine.getProperty('voices')
-            if len(voices) > 1:
-                self.engine.setProperty('voice', voices[1].id)
+            # The translator is created on first use
+            self._translator = None
             
-            # Initialize translator if available
-            if TRANSLATION_AVAILABLE:
-                self.translator = Translator()
-            
-            # Test microphone
-            with self.microphone as source:
-                self.recognizer.adjust_for_ambient_noise(source, duration=1)
+            # Keep a single microphone stream open for the whole session; the
+            # VAD learns the noise floor from it, so there is no calibration step
+            self.capture = AudioCapture(MicrophoneSource(self.microphone))
+            self.capture.start()
+            self.listen_reader = self.capture.reader()
                 
         except Exception as e:
             self.logger.error(f"Failed to initialize speech components: {e}")
             raise
 
+    def create_tts_cache(self):
+        """Create the synthesized-audio cache and its player, if enabled and possible"""
+        cache_config = self.config.get("tts_cache", {})
+        if not cache_config.get("enabled", True):
+            return None, None
+        try:
+            player = WavPlayer()
+            cache = TtsCache(cache_config.get("directory", "tts_cache"),
+                             int(cache_config.get("max_mb", 50) * 1024 * 1024))
+            return cache, player
+        except Exception as e:
+            self.logger.warning(f"TTS cache not available: {e}")
+            return None, None
+
     def load_configuration(self):
-        """Load configuration with improved structure"""
-        config_file = "config.json"
-        default_config = {
-            "api_keys": {
-                "openai_api_key": "your-openai-api-key-here"
-            },
-            "voice_settings": {
-                "rate": 200,
-                "volume": 0.9,
-                "voice_index": 1
-            },
-            "features": {
-                "weather_enabled": False,
-                "news_enabled": False,
-                "advanced_ai_enabled": True,
-                "music_enabled": False,
-                "email_enabled": False
-            },
-            "system": {
-                "default_language": "en",
-                "wake_words": ["hey bb", "bb", "beastboy"],
-                "session_timeout": 300,
-                "background_mode": True,
-                "minimize_to_tray": True
-            }
-        }
+        """Load and validate config.json; invalid values fall back to their defaults"""
+        self.config_path = "config.json"
+        self.settings = load_settings(self.config_path)
+        self.config = self.settings.data
+        self.config_lock = threading.Lock()
+
+    def setup_config_watcher(self):
+        """Watch config.json so edits apply without a restart"""
+        interval = self.config.get("system", {}).get("config_poll_seconds", 1.0)
+        self.config_watcher = ConfigWatcher(self.config_path, self.settings, self.apply_settings, interval)
+
+    def apply_settings(self, settings: Settings, changed: Set[str]):
+        """Apply a reloaded, already validated config; runs on the watcher thread"""
+        sections = {key.split(".")[0] for key in changed}
+        with self.config_lock:
+            self.settings = settings
+            self.config = settings.data
+            if "voice_settings" in sections:
+                voice = settings.voice
+                self.speech_output.configure(voice.rate, voice.volume, voice.voice_index)
+            if any(key.startswith("system.wake_word") for key in changed):
+                # Built here without the shared VAD; the voice loop swaps it in between frames
+                self.wake_words = list(settings.system.wake_words)
+                try:
+                    self.pending_wake_detector = self.build_wake_word_detector()
+                except WakeWordUnavailable as e:
+                    self.logger.error(f"Keeping the current wake-word detector: {e}")
+            if "rescoring" in sections or any(key.startswith("system.wake_words") for key in changed):
+                self.setup_rescorer()
+            if "system.session_timeout" in changed:
+                self.conversation.session_timeout = settings.system.session_timeout
+            if sections & {"features", "api_keys", "ai"}:
+                self.setup_services()
+            if "dispatch" in sections:
+                self.dispatcher.deadline = self.config["dispatch"]["deadline_seconds"]
+                self.dispatcher.local_confidence = self.config["dispatch"]["local_confidence"]
+            if "language_id" in sections:
+                self.setup_language_id()
+            if "logging" in sections:
+                self.setup_logging(self.config["logging"])
+            if "system_monitor" in sections:
+                self.setup_system_monitor()
+            if "apps" in sections:
+                self.setup_app_catalog()
+            if any(key.startswith("cache.services") for key in changed):
+                self.response_cache.policies.update(
+                    {name: CachePolicy.from_dict(values) for name, values in self.config["cache"]["services"].items()})
         
-        if not os.path.exists(config_file):
-            with open(config_file, 'w') as f:
-                json.dump(default_config, f, indent=4)
-            self.logger.info(f"Created default {config_file}")
+        pending = sorted(key for key in changed if key.split(".")[0] in RESTART_SECTIONS
+                         or key in ("dispatch.max_workers", "cache.enabled", "cache.max_entries", "cache.path"))
+        self.logger.info(f"Config reloaded: {', '.join(sorted(changed))}")
+        if pending:
+            self.logger.info(f"Takes effect after a restart: {', '.join(pending)}")
+
+    def setup_metrics(self):
+        """Setup per-stage latency histograms, counters and the localhost metrics endpoint"""
+        metrics_config = self.config.get("metrics", {})
+        self.metrics = MetricsRegistry(tracing=metrics_config.get("tracing", False))
+        self.metrics_server = None
+        self.speech_output.on_started.append(self.record_speech_latency)
+        cache = self.speech_output.cache
+        if cache is not None:
+            # The TTS cache keeps its own totals; they are read whenever metrics are exported
+            for name, help in (("hits", "Responses played from the TTS cache"),
+                               ("misses", "Responses synthesized because they were not cached"),
+                               ("bytes_served", "Audio bytes played from the TTS cache"),
+                               ("evictions", "Entries evicted from the TTS cache")):
+                self.metrics.counter_from(f"tts_cache_{name}", lambda name=name: getattr(cache, name), help)
+        if metrics_config.get("enabled", True) and metrics_config.get("port"):
+            try:
+                self.metrics_server = start_metrics_server(self.metrics, metrics_config["port"])
+            except OSError as e:
+                self.logger.warning(f"Metrics endpoint not available: {e}")
+
+    def record_speech_latency(self, utterance):
+        """Enqueue-to-first-audio time of every spoken response"""
+        self.metrics.observe("tts", utterance.latency)
+
+    def setup_response_cache(self):
+        """Setup the TTL cache for service lookups; disabled means every policy has no TTL"""
+        cache_config = self.config.get("cache", {})
+        if cache_config.get("enabled", True):
+            policies = {name: CachePolicy.from_dict(values)
+                        for name, values in cache_config.get("services", {}).items()}
+        else:
+            policies = {name: CachePolicy(ttl=0) for name in ("stock", "weather", "wikipedia", "translation")}
+        self.response_cache = ResponseCache(policies, max_entries=cache_config.get("max_entries", 512),
+                                            path=cache_config.get("path") or None)
+
+    def setup_reminders(self):
+        """Setup the reminder scheduler, restoring reminders saved before a restart"""
+        journal = self.config.get("reminders", {}).get("journal", "reminders.jsonl")
+        self.reminders = ReminderScheduler(self.on_reminder_due, journal or None)
+        self.reminders.start()
+
+    def setup_system_monitor(self):
+        """Setup the background sampler that answers system questions; a new config starts a new history"""
+        monitor_config = MonitorConfig.from_dict(self.config.get("system_monitor"))
+        monitor = SystemMonitor(monitor_config) if monitor_config.enabled else None
+        if monitor is not None:
+            monitor.start()
+        old, self.system_monitor = getattr(self, "system_monitor", None), monitor
+        if old is not None:
+            old.stop()
+
+    def setup_app_catalog(self):
+        """Load the application index and refresh it in the background; open commands wait for it"""
+        apps_config = self.config.get("apps", {})
+        self.app_catalog_ready = threading.Event()
+        
+        def load():
+            try:
+                catalog = AppCatalog(index_path=apps_config.get("index_path") or None,
+                                     min_score=apps_config.get("min_score", 0.5))
+                self.logger.info(f"Application index refreshed: {catalog.refresh()}")
+                self.app_catalog = catalog
+                rescorer = getattr(self, "rescorer", None)
+                if rescorer is not None:
+                    rescorer.set_apps(catalog.names())
+            except Exception as e:
+                self.logger.error(f"Application index failed: {e}")
+            finally:
+                self.app_catalog_ready.set()
+        
+        if not hasattr(self, "app_catalog"):
+            self.app_catalog = None
+        threading.Thread(target=load, name="app-catalog", daemon=True).start()
+
+    def setup_rescorer(self):
+        """Setup n-best re-scoring against the wake words, intents and known names; None when disabled"""
+        rescoring_config = self.config.get("rescoring", {})
+        rescorer = None
+        if rescoring_config.get("enabled", True):
+            rescorer = HypothesisRescorer(self.intent_router, self.settings.system.wake_words)
+            try:
+                rescorer.set_entities(load_entities(rescoring_config.get("entities") or ENTITIES_PATH))
+            except (OSError, ValueError) as e:
+                self.logger.warning(f"Entity vocabulary not loaded: {e}")
+        self.rescorer = rescorer
+        # The catalog loads in the background; whichever finishes second hands over the app names
+        catalog = getattr(self, "app_catalog", None)
+        if rescorer is not None and catalog is not None:
+            rescorer.set_apps(catalog.names())
+
+    def on_reminder_due(self, reminder):
+        """Called on the scheduler thread when a reminder is due"""
+        if self.running and not self.paused:
+            # Hand the alert to the speech worker instead of touching TTS from this thread
+            print(f"🤖 Beastboy: Reminder: {reminder.text}")
+            self.speech_output.say(f"Reminder: {reminder.text}", Priority.ALERT)
+            self.logger.info(f"Reminder triggered: {reminder.text}")
+
+    def setup_dispatcher(self):
+        """Setup the dispatcher that races local handlers against the AI"""
+        dispatch_config = self.config.get("dispatch", {})
+        self.dispatcher = SpeculativeDispatcher(deadline=dispatch_config.get("deadline_seconds", 4.0),
+                                                local_confidence=dispatch_config.get("local_confidence", 0.75),
+                                                max_workers=dispatch_config.get("max_workers", 4))
+
+    @property
+    def translator(self):
+        """googletrans client, imported and created on the first translation"""
+        if self._translator is None:
+            self._translator = googletrans.Translator()
+        return self._translator
+
+    def translate_text(self, text: str, language: str) -> str:
+        """Translate through googletrans, remembering earlier translations"""
+        return self.response_cache.get_or_fetch(
+            "translation", f"{language}:{text}",
+            lambda: self.translator.translate(text, dest=language).text)
+
+    def setup_recognizer_backend(self):
+        """Setup the speech recognition engine, falling back to Google"""
+        asr_config = self.config.get("asr", {})
+        engine = asr_config.get("engine", "google")
+        options = {}
+        if engine == "google":
+            options = {"recognizer": self.recognizer}
+        elif engine == "vosk":
+            options = {"model_path": asr_config.get("vosk_model_path", "models/vosk-model-small-en-us-0.15")}
         
         try:
-            with open(config_file, 'r') as f:
-                self.config = json.load(f)
-        except Exception as e:
-            self.logger.error(f"Failed to load config: {e}")
-            self.config = default_config
+            self.asr_backend = create_backend(engine, **options)
+        except (RecognitionError, ValueError) as e:
+            self.logger.error(f"Failed to setup ASR engine '{engine}': {e}")
+            self.asr_backend = create_backend("google", recognizer=self.recognizer)
+        self.logger.info(f"ASR engine: {self.asr_backend.name}")
 
     def setup_services(self):
-        """Setup available services based on configuration"""
-        self.services = {
-            'weather': ServiceStatus.DISABLED,
-            'news': ServiceStatus.DISABLED,
+        """Setup available services from the feature switches; called again when config.json changes"""
+        features = self.settings.features
+        
+        def status(enabled: bool) -> ServiceStatus:
+            return ServiceStatus.ENABLED if enabled else ServiceStatus.DISABLED
+        
+        services = {
+            'weather': status(features.weather_enabled),
+            'news': status(features.news_enabled),
             'ai': ServiceStatus.DISABLED,
-            'music': ServiceStatus.DISABLED,
-            'email': ServiceStatus.DISABLED,
-            'translation': ServiceStatus.ENABLED if TRANSLATION_AVAILABLE else ServiceStatus.DISABLED,
-            'wikipedia': ServiceStatus.ENABLED if WIKIPEDIA_AVAILABLE else ServiceStatus.DISABLED,
-            'stocks': ServiceStatus.ENABLED if STOCKS_AVAILABLE else ServiceStatus.DISABLED
+            'music': status(features.music_enabled),
+            'email': status(features.email_enabled),
+            'translation': status(TRANSLATION_AVAILABLE and features.translation_enabled),
+            'wikipedia': status(features.wikipedia_enabled),
+            'stocks': status(STOCKS_AVAILABLE and features.stocks_enabled)
         }
         
         # Setup OpenAI if available and configured
-        self.setup_openai()
+        services['ai'] = status(self.setup_openai())
         
+        # Replace the whole table at once so handlers never see a half-updated one
+        self.services = services
         self.logger.info(f"Services status: {self.services}")
 
+    def setup_language_id(self):
+        """Setup on-device language identification; without profiles every command is taken as English"""
+        language_config = self.config.get("language_id", {})
+        self.language_id = None
+        if not language_config.get("enabled", True):
+            return
+        try:
+            self.language_id = LanguageIdentifier.load(min_chars=language_config.get("min_chars", 10),
+                                                       min_margin=language_config.get("min_margin", 0.1))
+        except (OSError, ValueError, KeyError) as e:
+            self.logger.warning(f"Language identification unavailable: {e}")
+
+    def service_enabled(self, name: str) -> bool:
+        return self.services.get(name) == ServiceStatus.ENABLED
+
+    def setup_voice_activity_detection(self):
+        """Setup the VAD that endpoints both wake words and commands"""
+        vad_config = VadConfig.from_dict(self.config.get("vad"))
+        self.vad = VoiceActivityDetector(vad_config, self.capture.sample_rate, self.capture.sample_width)
+
+    def setup_wake_word_detector(self):
+        """Setup the on-device wake-word detector"""
+        self.pending_wake_detector = None
+        self.wake_detector = self.build_wake_word_detector(self.vad)
+
+    def build_wake_word_detector(self, vad: Optional[VoiceActivityDetector] = None):
+        """Wake-word detector for the current config; without ``vad`` it is gated by a private one"""
+        system_config = self.config.get("system", {})
+        name = system_config.get("wake_word_detector", "template")
+        options = {}
+        if name == "template":
+            options = {
+                "templates_dir": system_config.get("wake_word_templates", "wake_words"),
+                "threshold": system_config.get("wake_word_threshold", 0.6)
+            }
+        # Raises WakeWordUnavailable when nothing could ever wake the assistant, so startup fails loudly
+        detector = create_detector(name, self.wake_words, transcribe=self.recognize_segment, vad=vad,
+                                   fallback=system_config.get("wake_word_fallback", True), **options)
+        self.logger.info(f"Wake-word detector: {detector.name}")
+        if name == "template" and detector.name != name:
+            print('⚠️ No wake-word templates enrolled: every speech segment is sent to the speech recognizer '
+                  'to find the wake word. Run python wake_word.py enroll "hey bb" to detect it on-device.')
+        return detector
+
     def setup_openai(self):
-        """Setup OpenAI API if available and configured"""
-        if not OPENAI_AVAILABLE:
+        """Setup OpenAI API if available and configured; returns whether AI answers are enabled"""
+        self.ai_config = self.config.get("ai", {})
+        self.ai_stream = self.ai_config.get("stream", True)
+        if not hasattr(self, "conversation"):
+            self.active_reply: Optional[StreamingReply] = None
+            self.last_reply: Optional[StreamingReply] = None
+            self.speech_output.on_started.append(self.on_speech_started)
+            self.conversation = ConversationMemory(
+                AI_SYSTEM_PROMPT,
+                token_budget=self.ai_config.get("context_tokens", 1200),
+                max_turns=self.ai_config.get("context_turns", 16),
+                session_timeout=self.settings.system.session_timeout)
+        else:
+            # Reloaded config: keep the conversation, update its budget
+            self.conversation.token_budget = self.ai_config.get("context_tokens", 1200)
+        if not self.settings.features.advanced_ai_enabled:
+            self.openai_enabled = False
+            self.logger.info("AI answers disabled in config")
+            return False
+        if not OPENAI_AVAILABLE and not self.ai_stream:
+            # Streaming talks to the endpoint directly; the package is only needed without it
             self.openai_enabled = False
             self.logger.info("OpenAI package not installed")
-            return
+            return False
         
         api_key = self.config.get("api_keys", {}).get("openai_api_key", "")
         if api_key and api_key.strip():
             try:
-                openai.api_key = api_key
+                self.openai_api_key = api_key
+                # The openai package is configured on first non-streamed request
+                self.openai_configured = False
                 self.openai_enabled = True
-                self.services['ai'] = ServiceStatus.ENABLED
                 self.logger.info("OpenAI API configured successfully")
             except Exception as e:
                 self.logger.error(f"Failed to configure OpenAI: {e}")
@@ -247,48 +525,128 @@ class EnhancedBeastboy:
         else:
             self.openai_enabled = False
             self.logger.info("OpenAI API key not provided")
+        return self.openai_enabled
+
+    def get_ai_response(self, query: str, abandoned: Optional[threading.Event] = None) -> Optional[Union[str, StreamingReply]]:
+        """Get intelligent response using OpenAI; a StreamingReply when streaming is enabled.
 
-    def get_ai_response(self, query: str) -> Optional[str]:
-        """Get intelligent response using OpenAI"""
-        if not self.openai_enabled:
+        Once ``abandoned`` is set (a local answer won) no request is started
+        and a stream is closed as soon as its headers arrive.
+        """
+        if not self.openai_enabled or (abandoned is not None and abandoned.is_set()):
             return None
         
+        # Recent turns of this session go along so follow-up questions make sense
+        messages = self.conversation.build_messages(query)
+        self.logger.info(f"AI prompt: {self.conversation.last_prompt_tokens} tokens, "
+                         f"{len(self.conversation.turns)} earlier turns, "
+                         f"{self.conversation.memory_bytes()} bytes of memory")
         try:
+            if self.ai_stream:
+                # Returns once headers arrive; tokens are read while speaking
+                reply = open_chat_stream(self.http.requests_session,
+                                        self.ai_config.get("api_base", "https://api.openai.com/v1"),
+                                        self.openai_api_key, messages,
+                                        model=self.ai_config.get("model", "gpt-3.5-turbo"),
+                                        timeout=self.http.config.total_timeout,
+                                        max_tokens=self.ai_config.get("max_tokens", 150),
+                                        temperature=self.ai_config.get("temperature", 0.7))
+                if abandoned is not None and abandoned.is_set():
+                    reply.close()
+                    return None
+                def remember(done: StreamingReply):
+                    if done.text:
+                        self.conversation.add_turn(query, done.text)
+                reply.on_done = remember
+                return reply
+            self.configure_openai_module()
             response = openai.ChatCompletion.create(
-                model="gpt-3.5-turbo",
-                messages=[
-                    {
-                        "role": "system", 
-                        "content": "You are Beastboy, a helpful Windows voice assistant running in the background. Provide concise, helpful responses. If the user asks you to perform a system action, clearly state what action should be taken. Keep responses under 50 words unless specifically asked for more detail."
-                    },
-                    {"role": "user", "content": query}
-                ],
-                max_tokens=150,
-                temperature=0.7
+                model=self.ai_config.get("model", "gpt-3.5-turbo"),
+                messages=messages,
+                max_tokens=self.ai_config.get("max_tokens", 150),
+                temperature=self.ai_config.get("temperature", 0.7)
             )
             return response.choices[0].message.content.strip()
         except Exception as e:
             self.logger.error(f"OpenAI API error: {e}")
             return None
 
-    def speak(self, text: str, language: str = 'en'):
-        """Enhanced text-to-speech with improved error handling"""
+    def configure_openai_module(self):
+        """Import and configure the openai package the first time it is needed"""
+        if self.openai_configured:
+            return
+        openai.api_key = self.openai_api_key
+        openai.api_base = self.ai_config.get("api_base", "https://api.openai.com/v1")
+        # Reuse the pooled connections instead of a session per thread
+        openai.requestssession = self.http.requests_session
+        self.openai_configured = True
+
+    def on_speech_started(self, utterance):
+        """Record time to first audio when a streamed reply starts playing"""
+        reply = self.last_reply
+        if reply is not None and reply.first_utterance is utterance:
+            reply.mark_audio(utterance.started_at)
+            metrics = reply.metrics()
+            self.logger.info(f"AI reply: first token {metrics['ttft_ms']} ms, first audio {metrics['ttfa_ms']} ms")
+
+    def speak_stream(self, reply: StreamingReply, language: str = 'en', priority: Priority = Priority.RESPONSE):
+        """Speak a streamed reply chunk by chunk as it is generated; cancelled by barge-in"""
+        self.active_reply = self.last_reply = reply
+        try:
+            for chunk in reply:
+                if self.paused:
+                    reply.cancel()
+                    break
+                print(f"🤖 Beastboy: {chunk}")
+                if language != 'en' and TRANSLATION_AVAILABLE:
+                    try:
+                        chunk = self.translate_text(chunk, language)
+                    except Exception as e:
+                        self.logger.warning(f"Translation failed: {e}")
+                # The first chunk's latency is measured from the request, i.e. time to first audio
+                created_at = reply.started_at if reply.first_utterance is None else None
+                utterance = self.speech_output.say(chunk, priority, created_at=created_at, language=language)
+                if reply.first_utterance is None:
+                    reply.first_utterance = utterance
+        except Exception as e:
+            self.logger.error(f"AI stream failed: {e}")
+        finally:
+            if self.active_reply is reply:
+                self.active_reply = None
+        self.logger.info(f"AI reply streamed: {reply.metrics()}")
+
+    def speak(self, text: Union[str, StreamingReply], language: str = 'en', priority: Priority = Priority.RESPONSE):
+        """Queue text for the speech output worker; returns without waiting for playback"""
+        if isinstance(text, StreamingReply):
+            return self.speak_stream(text, language, priority)
+        created_at = time.perf_counter()
+        original_text = text
         try:
             if self.paused:
                 return
                 
             print(f"🤖 Beastboy: {text}")
             
-            # Translate if not in English and translation is available
-            if language != 'en' and TRANSLATION_AVAILABLE:
-                try:
-                    translated = self.translator.translate(text, dest=language)
-                    text = translated.text
-                except Exception as e:
-                    self.logger.warning(f"Translation failed: {e}")
+            # Templated responses come from the pre-translated phrase tables; other text is translated
+            if language != 'en':
+                localized = self.phrase_book.render(text, language)
+                if localized is not None:
+                    text = localized
+                    source = "table"
+                elif TRANSLATION_AVAILABLE:
+                    try:
+                        text = self.translate_text(text, language)
+                        source = "translator"
+                    except Exception as e:
+                        self.logger.warning(f"Translation failed: {e}")
+                        source = "failed"
+                else:
+                    source = "untranslated"
+                self.metrics.counter("responses_localized", "Non-English responses by how they were localized",
+                                     source=source).inc()
             
-            self.engine.say(text)
-            self.engine.runAndWait()
+            self.speech_output.say(text, priority, created_at=created_at,
+                                   cacheable=original_text in self.fixed_phrases, language=language)
         except Exception as e:
             self.logger.error(f"Speech synthesis failed: {e}")
             print(f"🤖 Beastboy: {text}")  # Fallback to text only
@@ -299,50 +657,122 @@ class EnhancedBeastboy:
             return ""
             
         try:
-            with self.microphone as source:
-                self.recognizer.adjust_for_ambient_noise(source, duration=0.5)
-                audio = self.recognizer.listen(source, timeout=timeout, phrase_time_limit=7)
-            
-            # Try Google Speech Recognition
-            text = self.recognizer.recognize_google(audio, language=language).lower()
-            self.logger.info(f"Voice input: {text}")
-            
-            # Auto-detect language and translate if needed
-            if TRANSLATION_AVAILABLE:
-                try:
-                    detected_lang = self.translator.detect(text).lang
-                    if detected_lang != 'en':
-                        translated = self.translator.translate(text, dest='en')
-                        english_text = translated.text.lower()
-                        self.current_language = detected_lang
-                        self.logger.info(f"Detected: {detected_lang}, Translated: {english_text}")
-                        return english_text
-                except Exception as e:
-                    self.logger.warning(f"Language detection failed: {e}")
+            audio = self.capture_utterance(timeout=timeout, phrase_time_limit=7)
+            if not audio:
+                return ""
             
+            text, _ = self.recognize_command(audio, language)
             return text
             
-        except sr.WaitTimeoutError:
-            return ""
-        except sr.UnknownValueError:
+        except Exception as e:
+            self.logger.error(f"Listening failed: {e}")
             return ""
-        except sr.RequestError as e:
+
+    def recognize_command(self, audio: bytes, language: str = 'en-US') -> Tuple[str, str]:
+        """Transcribe a captured command; returns (English text, detected language).
+
+        The language of the last understood command is also kept in
+        ``current_language``, so the next acknowledgement is spoken in it.
+        """
+        text = self.recognize_segment(audio, language)
+        if not text:
+            return "", 'en'
+        self.logger.info(f"Voice input: {text}")
+        text, self.current_language = self.identify_language(text)
+        return text, self.current_language
+
+    def identify_language(self, text: str) -> Tuple[str, str]:
+        """(English text, language) of a transcribed command"""
+        # Identify the language on-device; only a command in another language costs a translation
+        if self.language_id is None:
+            return text, 'en'
+        with self.metrics.stage("language_detect"):
+            detection = self.language_id.detect(text)
+        if detection.language != 'en' and TRANSLATION_AVAILABLE and self.service_enabled('translation'):
+            try:
+                with self.metrics.stage("translate"):
+                    english_text = self.translate_text(text, 'en').lower()
+                self.logger.info(f"Detected: {detection.language} ({detection.method}), Translated: {english_text}")
+                return english_text, detection.language
+            except Exception as e:
+                self.logger.warning(f"Translation failed: {e}")
+        
+        return text, 'en'
+
+    def capture_utterance(self, timeout: float = 2, phrase_time_limit: float = 7) -> Optional[bytes]:
+        """Read frames until the VAD ends an utterance; None if nobody spoke within timeout"""
+        segmenter = UtteranceSegmenter(self.vad, max_segment_ms=int(phrase_time_limit * 1000))
+        frame_seconds = self.vad.config.frame_ms / 1000
+        waited = 0.0
+        started = time.perf_counter()
+        vad_seconds = 0.0
+        while self.running:
+            frame = self.listen_reader.read_bytes(self.vad.frame_bytes, timeout=1)
+            if not frame:
+                return None
+            frame_started = time.perf_counter()
+            segment = segmenter.process(frame)
+            vad_seconds += time.perf_counter() - frame_started
+            if segment:
+                # Capture includes the user speaking; VAD is the processing cost alone
+                self.metrics.observe("capture", time.perf_counter() - started, started)
+                self.metrics.observe("vad", vad_seconds)
+                return segment.audio
+            if not segmenter.in_speech:
+                waited += frame_seconds
+                if waited >= timeout:
+                    return None
+        return None
+
+    def recognize_segment(self, audio: bytes, language: str = 'en-US') -> str:
+        """Transcribe a short captured segment, returning '' if nothing was understood.
+
+        With re-scoring on, the best of the recognizer's alternatives is returned.
+        """
+        # The vocabularies are English, so other languages keep the recognizer's first choice
+        rescorer = self.rescorer if language.startswith('en') else None
+        try:
+            with self.metrics.stage("asr"):
+                if rescorer is None:
+                    return self.asr_backend.transcribe(audio, self.capture.sample_rate,
+                                                       self.capture.sample_width, language)
+                hypotheses = self.asr_backend.transcribe_alternatives(
+                    audio, self.capture.sample_rate, self.capture.sample_width, language,
+                    limit=self.config["rescoring"]["alternatives"])
+        except RecognitionError as e:
+            self.metrics.counter("asr_errors", "Failed speech recognition requests").inc()
             self.logger.error(f"Speech recognition error: {e}")
             return ""
+        
+        with self.metrics.stage("rescore"):
+            best = rescorer.best(hypotheses)
+        if best is None:
+            return ""
+        if best.rank or best.corrections:
+            self.metrics.counter("rescored", "Transcripts changed by n-best re-scoring").inc()
+            self.logger.info(f"Re-scored: {hypotheses[0].text!r} -> {best.text!r}")
+        return best.text
 
     # System tray menu functions
     def show_status(self, icon=None, item=None):
         """Show current status"""
         status = "🟢 Active" if not self.paused else "🟡 Paused"
+        cache = self.speech_output.stats().get("cache")
         services_count = sum(1 for service in self.services.values() if service == ServiceStatus.ENABLED)
+        latency = self.dispatcher.stats()["latency"]
+        info = self.get_system_info()
+        monitor = self.system_monitor.stats() if self.system_monitor else None
         
         message = f"""Beastboy Voice Assistant
         
 Status: {status}
 Services: {services_count} enabled
+TTS cache: {f"{cache['hit_rate']:.0%} hit rate, {cache['bytes_served'] // 1024} KB served" if cache else "off"}
 Uptime: {self.get_uptime()}
-CPU: {psutil.cpu_percent():.1f}%
-Memory: {psutil.virtual_memory().percent:.1f}%
+CPU: {info.cpu_percent:.1f}%
+Memory: {info.memory_percent:.1f}%
+Monitor: {f"{monitor['cpu_overhead_percent']}% of one core, {monitor['mean_sample_ms']} ms per sample" if monitor else "off"}
+Answers: local p50 {latency['local']['p50_ms']} ms, AI p50 {latency['ai']['p50_ms']} ms
 
 Listening for: {', '.join(self.wake_words)}"""
         
@@ -353,16 +783,16 @@ Listening for: {', '.join(self.wake_words)}"""
         self.paused = not self.paused
         status = "paused" if self.paused else "resumed"
         self.logger.info(f"Assistant {status}")
-        self.speak(f"I'm now {status}")
+        self.speak(phrase("now_paused" if self.paused else "now_resumed"))
 
     def test_voice(self, icon=None, item=None):
         """Test voice output"""
-        self.speak("Voice test successful! I'm working properly.")
+        self.speak(phrase("voice_test"))
 
     def show_logs(self, icon=None, item=None):
         """Open log file"""
         try:
-            os.startfile("beastboy.log")
+            os.startfile(self.config["logging"]["path"])
         except Exception as e:
             messagebox.showerror("Error", f"Could not open logs: {e}")
 
@@ -404,31 +834,33 @@ Created with ❤️ by [DRK_ARSIYAN]
         return str(datetime.timedelta(seconds=int(time.time() - self.start_time)))
 
     # Voice processing methods (same as original but with background handling)
-    async def get_weather_async(self, city: str = "London") -> str:
-        """Get weather using free OpenWeather API"""
-        try:
-            url = f"http://api.openweathermap.org/data/2.5/weather?q={city}&units=metric"
-            async with aiohttp.ClientSession() as session:
-                async with session.get(url) as response:
-                    if response.status == 200:
-                        data = await response.json()
-                        temp = data['main']['temp']
-                        description = data['weather'][0]['description']
-                        humidity = data['main']['humidity']
-                        return f"Weather in {city}: {description}, {temp}°C, humidity {humidity}%"
-                    else:
-                        return f"Couldn't get weather for {city}"
-        except Exception as e:
-            self.logger.error(f"Weather API error: {e}")
-            return f"Weather service temporarily unavailable: {str(e)}"
+    async def get_weather_async(self, city: str = "London") -> dict:
+        """Get current conditions from the free OpenWeather API"""
+        url = "http://api.openweathermap.org/data/2.5/weather"
+        data = await self.http.get_json(url, {"q": city, "units": "metric"})
+        return {
+            "temp": data['main']['temp'],
+            "description": data['weather'][0]['description'],
+            "humidity": data['main']['humidity']
+        }
 
     def get_weather(self, city: str = "London") -> str:
-        """Synchronous wrapper for weather"""
+        """Weather for a city, cached for a few minutes"""
         try:
-            loop = asyncio.get_event_loop()
-            return loop.run_until_complete(self.get_weather_async(city))
-        except Exception:
-            return "Weather service not available"
+            # Runs on the pipeline's long-lived event loop
+            weather = self.response_cache.get_or_fetch(
+                "weather", city,
+                lambda: self.pipeline.run_coroutine(self.get_weather_async(city), timeout=15))
+            return phrase("weather", city=city, description=weather['description'],
+                          temperature=weather['temp'], humidity=weather['humidity'])
+        except HttpError as e:
+            if e.status is not None:
+                return phrase("weather_failed", city=city)
+            self.logger.error(f"Weather API error: {e}")
+            return f"Weather service temporarily unavailable: {str(e)}"
+        except Exception as e:
+            self.logger.error(f"Weather API error: {e}")
+            return phrase("weather_unavailable")
 
     def get_stock_price(self, symbol: str) -> str:
         """Get stock price using yfinance"""
@@ -436,68 +868,86 @@ Created with ❤️ by [DRK_ARSIYAN]
             return "Stock service not available. Please install yfinance: pip install yfinance"
         
         try:
-            stock = yf.Ticker(symbol)
-            info = stock.info
-            current_price = info.get('currentPrice', info.get('regularMarketPrice'))
-            company_name = info.get('shortName', symbol)
+            # Ticker.info is slow and heavy, so quotes are cached briefly
+            quote = self.response_cache.get_or_fetch("stock", symbol, lambda: self.fetch_stock_quote(symbol))
+            current_price = quote["price"]
+            company_name = quote["name"]
             
             if current_price:
-                return f"{company_name} stock price is ${current_price:.2f}"
+                return phrase("stock_price", company=company_name, price=f"{current_price:.2f}")
             else:
-                return f"Couldn't get current price for {symbol}"
+                return phrase("stock_no_price", symbol=symbol)
         except Exception as e:
             self.logger.error(f"Stock API error: {e}")
             return f"Couldn't get stock price for {symbol}: {str(e)}"
 
+    def fetch_stock_quote(self, symbol: str) -> dict:
+        """Fetch name and current price for a ticker symbol"""
+        try:
+            stock = yf.Ticker(symbol, session=self.http.requests_session)
+        except Exception:
+            # Newer yfinance only accepts its own curl_cffi sessions
+            stock = yf.Ticker(symbol)
+        info = stock.info
+        return {
+            "price": info.get('currentPrice', info.get('regularMarketPrice')),
+            "name": info.get('shortName', symbol)
+        }
+
+    def fetch_wikipedia_page(self, query: str) -> dict:
+        """Best search hit for a query from the MediaWiki API; empty if nothing matched"""
+        params = {
+            "action": "query", "format": "json", "formatversion": 2, "redirects": 1,
+            "generator": "search", "gsrsearch": query, "gsrlimit": 1,
+            "prop": "extracts|pageprops", "exintro": 1, "explaintext": 1, "exsentences": 2
+        }
+        data = self.http.get_json_sync("https://en.wikipedia.org/w/api.php", params)
+        pages = data.get("query", {}).get("pages", [])
+        if not pages:
+            return {}
+        return {
+            "extract": pages[0].get("extract", ""),
+            "disambiguation": "disambiguation" in pages[0].get("pageprops", {})
+        }
+
     def search_wikipedia(self, query: str) -> str:
         """Search Wikipedia for information"""
-        if not WIKIPEDIA_AVAILABLE:
-            return "Wikipedia service not available. Please install wikipedia: pip install wikipedia"
-        
         try:
-            summary = wikipedia.summary(query, sentences=2)
-            return f"According to Wikipedia: {summary}"
-        except wikipedia.exceptions.DisambiguationError:
-            return f"Multiple results found for {query}. Please be more specific."
-        except wikipedia.exceptions.PageError:
-            return f"No Wikipedia page found for {query}"
+            page = self.response_cache.get_or_fetch("wikipedia", query, lambda: self.fetch_wikipedia_page(query))
+            if not page.get("extract"):
+                return phrase("wikipedia_not_found", query=query)
+            if page["disambiguation"]:
+                return phrase("wikipedia_ambiguous", query=query)
+            return f"According to Wikipedia: {page['extract']}"
         except Exception as e:
             self.logger.error(f"Wikipedia error: {e}")
             return f"Wikipedia search error: {str(e)}"
 
     def calculate_basic_math(self, expression: str) -> str:
-        """Calculate basic mathematical expressions safely"""
-        try:
-            # Clean and validate expression
-            expression = expression.replace('x', '*').replace('÷', '/').replace('^', '**')
-            # Remove non-mathematical characters for safety
-            allowed_chars = set('0123456789+-*/().,** ')
-            if not all(c in allowed_chars for c in expression):
-                return "Invalid mathematical expression"
-            
-            result = eval(expression)
-            return f"The result is {result}"
-        except ZeroDivisionError:
-            return "Cannot divide by zero"
+        """Calculate spoken or written math and unit conversions without eval"""
+        try:
+            return math_engine.answer(expression)
         except Exception as e:
+            self.logger.error(f"Math error: {e}")
             return f"Couldn't calculate: {str(e)}"
 
-    def set_reminder(self, reminder_text: str, minutes: int) -> str:
-        """Set a reminder with improved threading"""
-        def remind():
-            time.sleep(minutes * 60)
-            if self.running:
-                self.speak(f"Reminder: {reminder_text}")
-                self.logger.info(f"Reminder triggered: {reminder_text}")
-        
-        thread = threading.Thread(target=remind, daemon=True)
-        thread.start()
-        return f"Reminder set for {minutes} minutes: {reminder_text}"
+    def set_reminder(self, reminder_text: str, due: float, interval: Optional[float] = None) -> str:
+        """Schedule a reminder; it is kept across restarts"""
+        reminder = self.reminders.add(reminder_text, due, interval)
+        return f"Reminder set {describe_due(reminder.due, time.time(), interval)}: {reminder_text}"
 
     def get_system_info(self) -> SystemInfo:
-        """Get comprehensive system information"""
+        """Latest sample from the system monitor; without one, a quick non-blocking reading"""
+        sample = self.system_monitor.latest() if self.system_monitor else None
+        if sample is not None:
+            return SystemInfo(
+                cpu_percent=sample.cpu_percent,
+                memory_percent=sample.memory_percent,
+                disk_percent=sample.disk_percent,
+                memory_available=round(sample.memory_available_gb, 2)
+            )
         try:
-            cpu_percent = psutil.cpu_percent(interval=1)
+            cpu_percent = psutil.cpu_percent(interval=None)
             memory = psutil.virtual_memory()
             disk = psutil.disk_usage('/')
             
@@ -511,8 +961,8 @@ Created with ❤️ by [DRK_ARSIYAN]
             self.logger.error(f"System info error: {e}")
             return SystemInfo(0, 0, 0, 0)
 
-    def process_command(self, command: str) -> str:
-        """Enhanced command processing with AI assistance"""
+    def process_command(self, command: str) -> Union[str, StreamingReply]:
+        """Enhanced command processing with AI assistance; AI answers may arrive as a stream of chunks"""
         command = command.lower().strip()
         
         # Remove wake words
@@ -521,258 +971,348 @@ Created with ❤️ by [DRK_ARSIYAN]
                 command = command[len(wake_word):].strip()
                 break
         
-        # Try to understand command with AI first
-        if self.openai_enabled:
-            # Check if it's a complex query that would benefit from AI
-            ai_keywords = ["how", "why", "what", "explain", "tell me", "advice", "help me", "should i"]
-            if any(keyword in command for keyword in ai_keywords):
-                ai_response = self.get_ai_response(command)
-                if ai_response:
-                    return ai_response
-        
-        # Weather commands
-        if any(word in command for word in ["weather", "temperature", "forecast"]):
-            city_match = re.search(r"weather (?:in |for )?([a-zA-Z\s]+)", command)
-            city = city_match.group(1).strip() if city_match else "London"
-            return self.get_weather(city)
-        
-        # Math/calculation commands
-        elif any(word in command for word in ["calculate", "math", "compute", "solve"]):
-            math_expr = re.sub(r".*(calculate|math|compute|solve)\s+", "", command)
-            return self.calculate_basic_math(math_expr)
-        
-        # Stock price commands
-        elif "stock" in command and "price" in command:
-            symbol_match = re.search(r"stock (?:price )?(?:of |for )?([A-Z]{1,5})", command.upper())
-            symbol = symbol_match.group(1) if symbol_match else "AAPL"
-            return self.get_stock_price(symbol)
-        
-        # Wikipedia search
-        elif any(phrase in command for phrase in ["wikipedia", "tell me about", "what is", "who is"]):
-            query = re.sub(r".*(wikipedia|tell me about|what is|who is)\s+", "", command)
-            return self.search_wikipedia(query)
-        
-        # Translation commands
-        elif "translate" in command and TRANSLATION_AVAILABLE:
-            translate_match = re.search(r"translate (.+?) to (\w+)", command)
-            if translate_match:
-                text = translate_match.group(1)
-                target_lang = translate_match.group(2)
-                try:
-                    translated = self.translator.translate(text, dest=target_lang)
-                    return f"Translation: {translated.text}"
-                except Exception as e:
-                    return f"Translation failed: {str(e)}"
-            else:
-                return "Please specify: translate text to language"
-        
-        # Reminder commands
-        elif "remind me" in command or "set reminder" in command:
-            reminder_match = re.search(r"remind me (?:to |about )?(.+?) in (\d+) minutes?", command)
-            if reminder_match:
-                reminder_text = reminder_match.group(1)
-                minutes = int(reminder_match.group(2))
-                return self.set_reminder(reminder_text, minutes)
-            else:
-                return "Please specify: remind me about something in X minutes"
-        
-        # Background control commands
-        elif "pause" in command or "stop listening" in command:
-            self.paused = True
-            return "I'm paused. Right-click my tray icon to resume."
-        
-        elif "resume" in command or "start listening" in command:
-            self.paused = False
-            return "I'm now listening again!"
-        
-        elif "status" in command or "how are you" in command:
-            services_count = sum(1 for service in self.services.values() if service == ServiceStatus.ENABLED)
-            return f"I'm running in background mode with {services_count} services enabled. CPU usage: {psutil.cpu_percent():.1f}%"
-        
-        # Basic system commands
-        else:
-            basic_response = self.process_basic_command(command)
-            # If basic command didn't understand and AI is available, try AI
-            if "didn't understand" in basic_response and self.openai_enabled:
-                ai_response = self.get_ai_response(command)
-                return ai_response if ai_response else basic_response
-            return basic_response
-
-    def process_basic_command(self, command: str) -> str:
-        """Process basic system commands with improved functionality"""
-        # Application commands
-        if command.startswith("open "):
-            app_name = command[5:]
-            if self.open_application(app_name):
-                return f"Opening {app_name}"
-            else:
-                return f"Sorry, I couldn't open {app_name}"
-        
-        # Volume controls (Windows-specific)
-        elif any(phrase in command for phrase in ["volume up", "increase volume"]):
-            try:
-                os.system("nircmd.exe changesysvolume 2000")
-                return "Volume increased"
-            except:
-                return "Volume control not available"
+        # Route with the compiled intent registry
+        with self.metrics.stage("route"):
+            route = self.intent_router.route(command)
+        confidence = route.confidence if route else 0.0
+        self.metrics.counter("intents", "Commands routed to each intent", intent=route.name if route else "none").inc()
         
-        elif any(phrase in command for phrase in ["volume down", "decrease volume"]):
-            try:
-                os.system("nircmd.exe changesysvolume -2000")
-                return "Volume decreased"
-            except:
-                return "Volume control not available"
-        
-        # System information
-        elif any(phrase in command for phrase in ["system info", "system status", "performance"]):
-            info = self.get_system_info()
-            return f"System status: CPU {info.cpu_percent:.1f}%, Memory {info.memory_percent:.1f}%, Disk {info.disk_percent:.1f}%"
-        
-        # Time and date
-        elif any(phrase in command for phrase in ["what time", "current time", "time"]):
-            current_time = datetime.datetime.now().strftime("%I:%M %p")
-            return f"The current time is {current_time}"
-        
-        elif any(phrase in command for phrase in ["what date", "today's date", "date"]):
-            current_date = datetime.datetime.now().strftime("%B %d, %Y")
-            return f"Today's date is {current_date}"
-        
-        # Web searches
-        elif any(phrase in command for phrase in ["search for", "google", "look up"]):
-            search_term = re.sub(r".*(search for|google|look up)\s+", "", command)
-            if search_term:
-                webbrowser.open(f"https://www.google.com/search?q={search_term}")
-                return f"Searching for {search_term}"
-            else:
-                return "What would you like me to search for?"
-        
-        # System controls
-        elif "shutdown" in command:
-            os.system("shutdown /s /t 10")
-            return "Shutting down the computer in 10 seconds"
-        
-        elif any(word in command for word in ["restart", "reboot"]):
-            os.system("shutdown /r /t 10")
-            return "Restarting the computer in 10 seconds"
-        
-        elif "lock" in command:
-            os.system("rundll32.exe user32.dll,LockWorkStation")
-            return "Locking the computer"
-        
-        # Help command
-        elif "help" in command or "what can you do" in command:
-            available_features = []
-            if TRANSLATION_AVAILABLE:
-                available_features.append("translations")
-            if WIKIPEDIA_AVAILABLE:
-                available_features.append("Wikipedia searches")
-            if STOCKS_AVAILABLE:
-                available_features.append("stock prices")
-            if self.openai_enabled:
-                available_features.append("AI-powered conversations")
+        local = None
+        if route is not None:
+            handler = self.intent_handlers[route.name]
             
-            features_text = ", ".join(available_features) if available_features else "basic system controls"
-            
-            return f"""I'm running in background mode! I can help you with:
-            • Opening applications and system controls
-            • Volume control and system information
-            • Time, date, and web searches
-            • Math calculations and reminders
-            • {features_text}
-            • Background commands: pause, resume, status
-            Just say Hey BB followed by your command!"""
-        
-        # Exit command
-        elif any(word in command for word in ["goodbye", "exit", "quit", "stop"]):
-            return "Goodbye! I'll keep running in the background. Right-click my tray icon to exit completely."
+            def local():
+                with self.metrics.stage("service"):
+                    return handler(command, route.slots)
         
-        else:
-            return "I didn't understand that command. Say 'help' to see what I can do."
-
-    def open_application(self, app_name: str) -> bool:
-        """Open applications with improved app mapping"""
-        app_mappings = {
-            'notepad': 'notepad.exe',
-            'calculator': 'calc.exe',
-            'paint': 'mspaint.exe',
-            'chrome': 'chrome.exe',
-            'firefox': 'firefox.exe',
-            'edge': 'msedge.exe',
-            'explorer': 'explorer.exe',
-            'file explorer': 'explorer.exe',
-            'cmd': 'cmd.exe',
-            'command prompt': 'cmd.exe',
-            'powershell': 'powershell.exe',
-            'task manager': 'taskmgr.exe',
-            'control panel': 'control.exe',
-            'settings': 'ms-settings:',
-            'word': 'winword.exe',
-            'excel': 'excel.exe',
-            'powerpoint': 'powerpnt.exe',
-            'vscode': 'code.exe',
-            'visual studio code': 'code.exe'
-        }
+        ai = None
+        speculative_ai = False
+        abandoned = threading.Event()
+        if self.openai_enabled:
+            def ai():
+                with self.metrics.stage("ai"):
+                    return self.get_ai_response(command, abandoned)
+            # Race the AI against weak local matches for complex queries that would benefit from it
+            speculative_ai = route is None or (confidence < self.dispatcher.local_confidence
+                                               and self.ai_cues.route(command) is not None)
         
-        app_name = app_name.lower()
-        if app_name in app_mappings:
-            try:
-                if app_name == 'settings':
-                    os.system('start ms-settings:')
-                else:
-                    subprocess.Popen(app_mappings[app_name], shell=True)
+        decision = self.dispatcher.dispatch(local, confidence, ai,
+                                            speculative_local=not (route and route.intent.side_effects),
+                                            speculative_ai=speculative_ai, discard=self.discard_ai_response,
+                                            cancel=abandoned.set,
+                                            on_hold=lambda: self.speak(phrase("still_thinking"), self.current_language))
+        self.logger.info(f"Dispatch: {decision.source or 'nothing'} ({decision.reason}) in {decision.seconds * 1000:.0f} ms")
+        self.metrics.counter("answers", "Answers by the path that produced them",
+                             source=decision.source or "none").inc()
+        if decision.answer is None:
+            return phrase("not_understood")
+        if decision.source == "ai" and isinstance(decision.answer, str):
+            self.conversation.add_turn(command, decision.answer)
+        return decision.answer
+
+    def discard_ai_response(self, answer):
+        """Drop an AI answer that lost the race; a stream is closed without being read"""
+        if isinstance(answer, StreamingReply):
+            answer.close()
+
+    def setup_intent_handlers(self):
+        """Map each routed intent to the method that answers it"""
+        self.intent_router = default_router()
+        # Question words that make a weak local match worth racing against the AI; whole words, like triggers
+        self.ai_cues = IntentRouter([Intent("ai_cue", ["how", "why", "what", "explain", "tell me", "advice",
+                                                       "help me", "should i"])])
+        self.intent_handlers = {
+            "weather": self.handle_weather,
+            "math": self.handle_math,
+            "stock_price": self.handle_stock_price,
+            "wikipedia": self.handle_wikipedia,
+            "translate": self.handle_translate,
+            "reminder": self.handle_reminder,
+            "list_reminders": self.handle_list_reminders,
+            "cancel_reminder": self.handle_cancel_reminder,
+            "pause": self.handle_pause,
+            "resume": self.handle_resume,
+            "status": self.handle_status,
+            "open_app": self.handle_open_app,
+            "volume_up": self.handle_volume_up,
+            "volume_down": self.handle_volume_down,
+            "system_info": self.handle_system_info,
+            "system_metric": self.handle_system_metric,
+            "time": self.handle_time,
+            "date": self.handle_date,
+            "web_search": self.handle_web_search,
+            "shutdown": self.handle_shutdown,
+            "restart": self.handle_restart,
+            "lock": self.handle_lock,
+            "help": self.handle_help,
+            "goodbye": self.handle_goodbye
+        }
+
+    # Intent handlers; returning None means "not handled here"
+    def handle_weather(self, command: str, slots: Dict[str, Any]) -> str:
+        return self.get_weather(slots.get("city", "London"))
+
+    def handle_math(self, command: str, slots: Dict[str, Any]) -> str:
+        return self.calculate_basic_math(slots.get("expression", slots["rest"]))
+
+    def handle_stock_price(self, command: str, slots: Dict[str, Any]) -> Optional[str]:
+        if STOCKS_AVAILABLE and not self.service_enabled('stocks'):
+            return None
+        return self.get_stock_price(slots.get("symbol", "AAPL").upper())
+
+    def handle_wikipedia(self, command: str, slots: Dict[str, Any]) -> Optional[str]:
+        if not self.service_enabled('wikipedia'):
+            return None
+        return self.search_wikipedia(slots.get("query", slots["rest"]))
+
+    def handle_translate(self, command: str, slots: Dict[str, Any]) -> Optional[str]:
+        if not self.service_enabled('translation'):
+            return None
+        if "text" not in slots:
+            return phrase("translate_usage")
+        try:
+            translated = self.translate_text(slots["text"], slots["language"])
+            return f"Translation: {translated}"
+        except Exception as e:
+            return f"Translation failed: {str(e)}"
+
+    def handle_reminder(self, command: str, slots: Dict[str, Any]) -> str:
+        parsed = parse_reminder(command)
+        if parsed is None:
+            return phrase("reminder_when")
+        if not parsed.text:
+            return phrase("reminder_what")
+        return self.set_reminder(parsed.text, parsed.due, parsed.interval)
+
+    def handle_list_reminders(self, command: str, slots: Dict[str, Any]) -> str:
+        pending = self.reminders.pending()
+        if not pending:
+            return phrase("no_reminders")
+        now = time.time()
+        items = [f"{r.text} {describe_due(r.due, now, r.interval)}" for r in pending[:5]]
+        more = f", and {len(pending) - 5} more" if len(pending) > 5 else ""
+        count = f"{len(pending)} reminder{'s' if len(pending) != 1 else ''}"
+        return f"You have {count}: " + "; ".join(items) + more
+
+    def handle_cancel_reminder(self, command: str, slots: Dict[str, Any]) -> str:
+        text = slots.get("text", "")
+        pending = self.reminders.pending()
+        if not pending:
+            return phrase("no_reminders_to_cancel")
+        if not text and " all " not in f" {command} " and len(pending) > 1:
+            return f"You have {len(pending)} reminders. Say cancel all reminders, or cancel the reminder about something."
+        cancelled = self.reminders.cancel_matching(text)
+        if not cancelled:
+            return phrase("reminder_not_found", text=text)
+        if len(cancelled) == 1:
+            return phrase("reminder_cancelled", text=cancelled[0].text)
+        return phrase("reminders_cancelled", count=len(cancelled))
+
+    def handle_pause(self, command: str, slots: Dict[str, Any]) -> str:
+        self.paused = True
+        return phrase("paused_hint")
+
+    def handle_resume(self, command: str, slots: Dict[str, Any]) -> str:
+        self.paused = False
+        return phrase("listening_again")
+
+    def handle_status(self, command: str, slots: Dict[str, Any]) -> str:
+        services_count = sum(1 for service in self.services.values() if service == ServiceStatus.ENABLED)
+        return phrase("status", count=services_count, cpu=f"{self.get_system_info().cpu_percent:.1f}")
+
+    def handle_open_app(self, command: str, slots: Dict[str, Any]) -> str:
+        app_name = slots["rest"]
+        opened = self.open_application(app_name)
+        if opened:
+            return phrase("opening", app=opened)
+        return phrase("open_failed", app=app_name)
+
+    def handle_volume_up(self, command: str, slots: Dict[str, Any]) -> str:
+        # Volume controls (Windows-specific)
+        try:
+            os.system("nircmd.exe changesysvolume 2000")
+            return phrase("volume_up")
+        except:
+            return phrase("volume_unavailable")
+
+    def handle_volume_down(self, command: str, slots: Dict[str, Any]) -> str:
+        try:
+            os.system("nircmd.exe changesysvolume -2000")
+            return phrase("volume_down")
+        except:
+            return phrase("volume_unavailable")
+
+    def handle_system_info(self, command: str, slots: Dict[str, Any]) -> str:
+        info = self.get_system_info()
+        return phrase("system_info", cpu=f"{info.cpu_percent:.1f}", memory=f"{info.memory_percent:.1f}",
+                      disk=f"{info.disk_percent:.1f}")
+
+    def handle_system_metric(self, command: str, slots: Dict[str, Any]) -> str:
+        if self.system_monitor is None:
+            return phrase("metric_unavailable")
+        field, unit = METRICS[slots.get("metric", "cpu")]
+        name = phrase(f"metric_{slots.get('metric', 'cpu')}")
+        if "seconds" not in slots:
+            sample = self.system_monitor.latest()
+            if sample is None:
+                return phrase("metric_no_history")
+            return phrase("metric_now", metric=name, value=f"{getattr(sample, field):.1f}{unit}")
+        trend = self.system_monitor.window(field, slots["seconds"])
+        if trend is None or trend.samples < 2:
+            return phrase("metric_no_history")
+        # With less history than asked for, say how much the answer covers
+        interval = self.system_monitor.config.interval_seconds
+        seconds = slots["seconds"] if trend.seconds + 2 * interval >= slots["seconds"] else trend.seconds
+        return phrase("metric_trend", window=self.describe_window(seconds), metric=name,
+                      mean=f"{trend.mean:.1f}{unit}", low=f"{trend.minimum:.1f}{unit}",
+                      high=f"{trend.maximum:.1f}{unit}")
+
+    def describe_window(self, seconds: float) -> Phrase:
+        """A spoken length of time: the hour, 10 minutes, 30 seconds, ..."""
+        if seconds >= 5400:
+            return phrase("window_hours", count=round(seconds / 3600))
+        if seconds >= 3570:
+            return phrase("window_hour")
+        if seconds >= 90:
+            return phrase("window_minutes", count=round(seconds / 60))
+        if seconds >= 60:
+            return phrase("window_minute")
+        return phrase("window_seconds", count=max(1, round(seconds)))
+
+    def handle_time(self, command: str, slots: Dict[str, Any]) -> str:
+        current_time = datetime.datetime.now().strftime("%I:%M %p")
+        return phrase("time", time=current_time)
+
+    def handle_date(self, command: str, slots: Dict[str, Any]) -> str:
+        current_date = datetime.datetime.now().strftime("%B %d, %Y")
+        return phrase("date", date=current_date)
+
+    def handle_web_search(self, command: str, slots: Dict[str, Any]) -> str:
+        search_term = slots.get("query")
+        if search_term:
+            webbrowser.open(f"https://www.google.com/search?q={search_term}")
+            return phrase("searching", query=search_term)
+        return phrase("search_what")
+
+    def handle_shutdown(self, command: str, slots: Dict[str, Any]) -> str:
+        os.system("shutdown /s /t 10")
+        return phrase("shutdown")
+
+    def handle_restart(self, command: str, slots: Dict[str, Any]) -> str:
+        os.system("shutdown /r /t 10")
+        return phrase("restart")
+
+    def handle_lock(self, command: str, slots: Dict[str, Any]) -> str:
+        os.system("rundll32.exe user32.dll,LockWorkStation")
+        return phrase("lock")
+
+    def handle_help(self, command: str, slots: Dict[str, Any]) -> str:
+        return self.get_help_text()
+
+    def handle_goodbye(self, command: str, slots: Dict[str, Any]) -> str:
+        self.session_active = False
+        self.conversation.reset()
+        return phrase("goodbye")
+
+    def get_help_text(self) -> str:
+        """Describe what the assistant can do with the services that are available"""
+        available_features = []
+        if TRANSLATION_AVAILABLE:
+            available_features.append(phrase("feature_translations"))
+        available_features.append(phrase("feature_wikipedia"))
+        if STOCKS_AVAILABLE:
+            available_features.append(phrase("feature_stocks"))
+        if self.openai_enabled:
+            available_features.append(phrase("feature_ai"))
+
+        return phrase("help", features=available_features or [phrase("feature_basic")])
+
+    def open_application(self, app_name: str) -> Optional[str]:
+        """Launch the installed application that best matches a spoken name; returns its name"""
+        self.app_catalog_ready.wait(timeout=10)
+        if self.app_catalog is None:
+            return None
+        match = self.app_catalog.find(app_name)
+        if match is None:
+            self.logger.info(f"No application matches {app_name!r}")
+            return None
+        self.logger.info(f"Opening {match.app.name} for {app_name!r} (score {match.score}, via {match.alias!r})")
+        try:
+            match.app.launch()
+            return match.app.name
+        except Exception as e:
+            self.logger.error(f"Failed to open {match.app.name}: {e}")
+            return None
+
+    def wait_for_wake_word(self) -> bool:
+        """Feed live frames to the on-device detector until it fires; False if paused or stopping"""
+        while self.running and not self.paused:
+            frame = self.listen_reader.read_bytes(self.vad.frame_bytes, timeout=1)
+            if not frame:
+                continue
+            if self.pending_wake_detector is not None:
+                # A config reload built a new detector; only this thread may touch the shared VAD
+                with self.config_lock:
+                    detector, self.pending_wake_detector = self.pending_wake_detector, None
+                detector.use_vad(self.vad)
+                self.wake_detector = detector
+            event = self.wake_detector.process(frame)
+            if event:
+                self.metrics.counter("wake_words", "Wake-word detections").inc()
+                self.logger.info(f"Wake word detected: {event.word} (score {event.score:.2f})")
                 return True
-            except Exception as e:
-                self.logger.error(f"Failed to open {app_name}: {e}")
-                return False
         return False
 
-    def background_voice_loop(self):
-        """Background voice processing loop"""
-        self.logger.info("Starting background voice processing")
-        
+    def next_command_audio(self) -> Optional[bytes]:
+        """Block until the wake word fires, acknowledge it, and capture the command that follows"""
         while self.running:
+            if self.paused:
+                time.sleep(1)
+                if not self.paused:
+                    # Don't replay the audio buffered while paused into the wake-word detector
+                    self.listen_reader.seek_to_live()
+                    self.wake_detector.reset()
+                continue
+            
+            # Listen for wake word on-device; nothing leaves the machine until it fires
+            if not self.wait_for_wake_word():
+                continue
+            if self.active_reply is not None:
+                # Barge-in also stops an answer that is still being generated
+                self.active_reply.cancel()
+            if self.speech_output.speaking:
+                # Barge-in: the user wants to talk, stop the current answer
+                self.speech_output.interrupt()
+            if not self.session_active or self.conversation.expired:
+                # A new session starts without the previous conversation
+                self.conversation.reset()
+            self.session_active = True
+            self.speak(phrase("ack"), self.current_language)
+            
+            # Let the acknowledgement finish and don't capture our own voice
+            self.speech_output.wait_until_idle(timeout=5)
+            self.listen_reader.seek_to_live()
+            self.listening = True
             try:
-                if self.paused:
-                    time.sleep(1)
-                    continue
-                
-                # Listen for wake word
-                if not self.listening:
-                    text = self.listen(timeout=1)
-                    if any(wake_word in text for wake_word in self.wake_words):
-                        self.listening = True
-                        self.session_active = True
-                        self.speak("Yes, how can I help you?", self.current_language)
-                        continue
-                
-                # Listen for command after wake word
-                if self.listening:
-                    command = self.listen(timeout=5)
-                    if command:
-                        response = self.process_command(command)
-                        if "Goodbye!" in response:
-                            self.speak(response, self.current_language)
-                            # Don't exit, just reset listening state
-                            self.listening = False
-                        else:
-                            self.speak(response, self.current_language)
-                    
-                    # Reset listening state
-                    self.listening = False
-                    self.current_language = 'en'
-                    
-            except Exception as e:
-                self.logger.error(f"Error in background voice loop: {e}")
-                time.sleep(1)  # Prevent rapid error loops
+                audio = self.capture_utterance(timeout=5)
+            finally:
+                # Reset listening state
+                self.listening = False
+                self.wake_detector.reset()
+            if audio:
+                return audio
+        return None
 
     def run_background(self):
         """Run the assistant in background mode"""
         self.start_time = time.time()
         self.logger.info("Starting Enhanced Beastboy in background mode")
         
-        # Start voice processing in a separate thread
-        voice_thread = threading.Thread(target=self.background_voice_loop, daemon=True)
-        voice_thread.start()
+        # Start the listen -> recognize -> route -> speak pipeline
+        self.logger.info("Starting background voice processing")
+        self.pipeline.start()
+        self.startup.mark("listener_live")
+        self.config_watcher.start()
         
         # Setup signal handlers for graceful shutdown
         signal.signal(signal.SIGINT, self.signal_handler)
@@ -781,11 +1321,13 @@ Created with ❤️ by [DRK_ARSIYAN]
         try:
             if self.tray_icon:
                 # Run system tray (this blocks until exit)
-                self.tray_icon.run()
+                self.tray_icon.run(setup=self.on_tray_ready)
             else:
                 # Fallback: run in console mode
                 print("🤖 Beastboy is running in background (console mode)")
                 print("Press Ctrl+C to exit")
+                self.startup.mark("console_ready")
+                self.log_startup_timings()
                 while self.running:
                     time.sleep(1)
                     
@@ -796,6 +1338,21 @@ Created with ❤️ by [DRK_ARSIYAN]
         finally:
             self.cleanup()
 
+    def on_tray_ready(self, icon):
+        """Called by pystray on its own thread once the tray loop is running"""
+        icon.visible = True
+        self.startup.mark("tray_visible")
+        self.log_startup_timings()
+
+    def log_startup_timings(self):
+        """Log per-phase startup timings and warn when startup missed its budget"""
+        report = self.startup.report()
+        self.logger.info(f"Startup timings: {report}")
+        budget_ms = self.config.get("startup", {}).get("budget_ms", 1500)
+        slowest = max(report["marks_ms"].values(), default=0)
+        if slowest > budget_ms:
+            self.logger.warning(f"Startup took {slowest:.0f} ms, over the {budget_ms} ms budget")
+
     def signal_handler(self, signum, frame):
         """Handle system signals for graceful shutdown"""
         self.logger.info(f"Received signal {signum}")
@@ -808,7 +1365,57 @@ Created with ❤️ by [DRK_ARSIYAN]
         self.logger.info("Cleaning up Enhanced Beastboy")
         self.running = False
         try:
-            self.engine.stop()
+            # Close pooled connections while the pipeline loop still runs
+            self.http.close()
+            self.response_cache.close()
+        except:
+            pass
+        
+        try:
+            self.pipeline.stop()
+        except:
+            pass
+        
+        try:
+            self.logger.info(f"Dispatch stats: {self.dispatcher.stats()}")
+            self.dispatcher.close()
+        except:
+            pass
+        
+        try:
+            self.speech_output.stop()
+        except:
+            pass
+        
+        try:
+            self.reminders.stop()
+        except:
+            pass
+        
+        try:
+            if self.system_monitor:
+                self.system_monitor.stop()
+                self.logger.info(f"System monitor stats: {self.system_monitor.stats()}")
+        except:
+            pass
+        
+        try:
+            self.config_watcher.stop()
+        except:
+            pass
+        
+        try:
+            dump_path = self.config.get("metrics", {}).get("dump_path")
+            if dump_path:
+                self.metrics.dump_json(dump_path)
+            if self.metrics_server:
+                self.metrics_server.shutdown()
+        except:
+            pass
+        
+        try:
+            self.capture.stop()
+            self.asr_backend.close()
         except:
             pass
         
@@ -817,6 +1424,12 @@ Created with ❤️ by [DRK_ARSIYAN]
                 self.tray_icon.stop()
             except:
                 pass
+        
+        try:
+            # Last, so every record logged during cleanup reaches the file
+            log_pipeline.shutdown_logging()
+        except:
+            pass
 
 if __name__ == "__main__":
     # Hide console window for background operation
@@ -839,7 +1452,7 @@ if __name__ == "__main__":
     
     print("🚀 Starting Enhanced Beastboy Assistant in Background Mode...")
     print("📋 Core requirements: speechrecognition, pyttsx3, psutil, pyaudio, pystray, pillow")
-    print("📋 Optional features: googletrans, wikipedia, yfinance, aiohttp, openai")
+    print("📋 Optional features: googletrans, yfinance, aiohttp, openai")
     print("🎤 Make sure your microphone is working!")
     print("🔑 Add your OpenAI API key to config.json for AI features")
     print("🖥️ Assistant will minimize to system tray...")
@@ -847,9 +1460,6 @@ if __name__ == "__main__":
     
     try:
         assistant = EnhancedBeastboy()
-        
-        # Hide console after 3 seconds
-        time.sleep(3)
         hide_console()
         
         # Run in background
@@ -860,7 +1470,7 @@ if __name__ == "__main__":
         print(f"❌ Missing required package: {e}")
         print("📦 Please install required packages:")
         print("pip install speechrecognition pyttsx3 psutil pyaudio pystray pillow")
-        print("pip install openai googletrans wikipedia yfinance aiohttp  # For optional features")
+        print("pip install openai googletrans yfinance aiohttp  # For optional features")
         input("Press Enter to exit...")
     except Exception as e:
         show_console()
@@ -0,0 +1,222 @@
+"""Conversation memory for Beastboy's AI answers.
+
+Recent question/answer turns are kept in a small ring so follow-up
+questions ("and how tall is it?") reach the model with their context. The
+prompt is trimmed against a token budget: the oldest turns are dropped, or
+folded into a running summary when a summarizer is supplied. Every message
+is tokenized once when it is stored and the history total is kept up to
+date, so building a prompt never re-tokenizes old turns. Memory expires
+after ``session_timeout`` seconds without a turn.
+"""
+
+import argparse
+import math
+import random
+import sys
+import time
+from collections import deque
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Callable, Deque, Dict, List, Optional
+
+try:
+    import tiktoken
+    TIKTOKEN_AVAILABLE = True
+except ImportError:
+    TIKTOKEN_AVAILABLE = False
+
+MESSAGE_OVERHEAD = 4  # role and separators per chat message
+
+
+@lru_cache(maxsize=1)
+def _encoding():
+    return tiktoken.get_encoding("cl100k_base")
+
+
+@lru_cache(maxsize=1024)
+def count_tokens(text: str) -> int:
+    """Token count with tiktoken when installed, else about four characters per token"""
+    if TIKTOKEN_AVAILABLE:
+        return len(_encoding().encode(text))
+    return max(1, math.ceil(len(text) / 4))
+
+
+@dataclass
+class Message:
+    role: str
+    content: str
+    tokens: int
+
+    @classmethod
+    def create(cls, role: str, content: str) -> "Message":
+        return cls(role, content, count_tokens(content) + MESSAGE_OVERHEAD)
+
+    def as_dict(self) -> Dict[str, str]:
+        return {"role": self.role, "content": self.content}
+
+
+@dataclass
+class Turn:
+    user: Message
+    assistant: Message
+
+    @property
+    def tokens(self) -> int:
+        return self.user.tokens + self.assistant.tokens
+
+
+class ConversationMemory:
+    """Ring of recent turns trimmed to a token budget and forgotten after a timeout"""
+
+    def __init__(self, system_prompt: str, token_budget: int = 1200, max_turns: int = 16,
+                 session_timeout: float = 300, clock: Callable[[], float] = time.monotonic,
+                 summarize: Optional[Callable[[str, List[Turn]], str]] = None):
+        self.system = Message.create("system", system_prompt)
+        self.token_budget = token_budget
+        self.session_timeout = session_timeout
+        self.clock = clock
+        self.summarize = summarize
+        self.turns: Deque[Turn] = deque(maxlen=max_turns)
+        self.summary: Optional[Message] = None
+        self.history_tokens = 0
+        self.last_activity: Optional[float] = None
+        self.last_prompt_tokens = 0
+        self.trimmed = 0
+        self.sessions = 0
+
+    @property
+    def expired(self) -> bool:
+        return self.last_activity is not None and self.clock() - self.last_activity > self.session_timeout
+
+    def reset(self):
+        """Forget the conversation, e.g. when the session times out or the user says goodbye"""
+        self.turns.clear()
+        self.summary = None
+        self.history_tokens = 0
+        self.last_activity = None
+
+    def _drop_oldest(self) -> Turn:
+        turn = self.turns.popleft()
+        self.history_tokens -= turn.tokens
+        self.trimmed += 1
+        return turn
+
+    def _fold(self, dropped: List[Turn]):
+        previous = self.summary.content if self.summary else ""
+        self.summary = Message.create("system", f"Earlier in this conversation: {self.summarize(previous, dropped)}")
+
+    def build_messages(self, query: str) -> List[Dict[str, str]]:
+        """Chat messages for ``query``: system prompt, summary, as many recent turns as fit, then the query"""
+        if self.expired:
+            self.reset()
+        question = Message.create("user", query)
+        fixed = self.system.tokens + question.tokens
+        dropped = []
+        while self.turns and fixed + self.history_tokens + (self.summary.tokens if self.summary else 0) > self.token_budget:
+            dropped.append(self._drop_oldest())
+        if dropped and self.summarize is not None:
+            self._fold(dropped)
+            # A summary that alone breaks the budget is not worth sending
+            if fixed + self.history_tokens + self.summary.tokens > self.token_budget:
+                self.summary = None
+
+        messages = [self.system]
+        if self.summary is not None:
+            messages.append(self.summary)
+        for turn in self.turns:
+            messages.extend((turn.user, turn.assistant))
+        messages.append(question)
+        self.last_prompt_tokens = sum(message.tokens for message in messages)
+        return [message.as_dict() for message in messages]
+
+    def add_turn(self, query: str, answer: str):
+        """Remember a completed exchange"""
+        if self.expired:
+            self.reset()
+        if self.last_activity is None:
+            self.sessions += 1
+        if len(self.turns) == self.turns.maxlen:
+            dropped = self._drop_oldest()
+            if self.summarize is not None:
+                self._fold([dropped])
+        turn = Turn(Message.create("user", query), Message.create("assistant", answer))
+        self.turns.append(turn)
+        self.history_tokens += turn.tokens
+        self.last_activity = self.clock()
+
+    def memory_bytes(self) -> int:
+        """Approximate bytes held by stored message text"""
+        messages = [self.system] + ([self.summary] if self.summary else [])
+        for turn in self.turns:
+            messages.extend((turn.user, turn.assistant))
+        return sum(sys.getsizeof(message.content) for message in messages)
+
+    def stats(self) -> dict:
+        return {
+            "turns": len(self.turns),
+            "history_tokens": self.history_tokens,
+            "last_prompt_tokens": self.last_prompt_tokens,
+            "token_budget": self.token_budget,
+            "trimmed_turns": self.trimmed,
+            "summarized": self.summary is not None,
+            "memory_bytes": self.memory_bytes(),
+        }
+
+
+def truncating_summary(previous: str, turns: List[Turn], max_chars: int = 300) -> str:
+    """Cheap local summarizer: keeps the most recent questions that fit in ``max_chars``"""
+    questions = [previous] if previous else []
+    questions += [turn.user.content for turn in turns]
+    return "; ".join(questions)[-max_chars:]
+
+
+class MockLLM:
+    """Deterministic chat backend that records the size of every prompt it receives"""
+
+    def __init__(self, words: int = 40, seed: int = 1):
+        self.words = words
+        self.rng = random.Random(seed)
+        self.prompt_tokens: List[int] = []
+
+    def __call__(self, messages: List[Dict[str, str]]) -> str:
+        self.prompt_tokens.append(sum(count_tokens(m["content"]) + MESSAGE_OVERHEAD for m in messages))
+        vocabulary = ["the", "tower", "was", "built", "in", "paris", "and", "it", "is", "tall",
+                      "visitors", "climb", "stairs", "every", "day", "metres", "history", "iron"]
+        return " ".join(self.rng.choice(vocabulary) for _ in range(self.words)) + "."
+
+
+def demo(turns: int = 200, budget: int = 1200, summarize: bool = False) -> dict:
+    """Run a long conversation through the memory and a mock LLM"""
+    clock_now = [0.0]
+    memory = ConversationMemory("You are Beastboy, a helpful voice assistant.", token_budget=budget,
+                                clock=lambda: clock_now[0],
+                                summarize=truncating_summary if summarize else None)
+    llm = MockLLM()
+    build_seconds = 0.0
+    for i in range(turns):
+        query = f"follow up question number {i} about the tower and its history"
+        started = time.perf_counter()
+        messages = memory.build_messages(query)
+        build_seconds += time.perf_counter() - started
+        memory.add_turn(query, llm(messages))
+        clock_now[0] += 10
+    report = memory.stats()
+    report.update({
+        "requests": turns,
+        "max_prompt_tokens": max(llm.prompt_tokens),
+        "mean_prompt_tokens": round(sum(llm.prompt_tokens) / turns, 1),
+        "us_per_build": round(build_seconds / turns * 1e6, 1),
+    })
+    clock_now[0] += memory.session_timeout + 1
+    memory.build_messages("a new question after a long pause")
+    report["turns_after_timeout"] = len(memory.turns)
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Exercise Beastboy conversation memory with a mock LLM")
+    parser.add_argument("--turns", type=int, default=200)
+    parser.add_argument("--budget", type=int, default=1200)
+    parser.add_argument("--summarize", action="store_true")
+    args = parser.parse_args()
+    print(demo(args.turns, args.budget, args.summarize))
@@ -0,0 +1,222 @@
+"""Speculative dispatch between local intent handlers and the AI.
+
+When a command could go either way, the local handler and the AI request
+start at the same time instead of one after the other. A confident local
+match wins as soon as it answers; otherwise the AI answer wins if it
+arrives before the deadline, and the local answer is the fallback. When
+neither has answered by then, the caller is told (to say a holding phrase)
+and the AI is awaited after all. A losing path that has not started is
+cancelled; one that is running gets the caller's cancel hook, and its
+answer is discarded whenever it arrives (a streamed AI reply is closed).
+Handlers with side effects (launching apps, shutting down) never run
+speculatively: they only run once the AI has lost. Every path's latency is
+recorded in a histogram so the confidence threshold and deadline can be
+tuned.
+"""
+
+import argparse
+import contextvars
+import logging
+import random
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Optional
+
+from metrics import LatencyHistogram
+
+logger = logging.getLogger(__name__)
+
+@dataclass
+class Decision:
+    source: Optional[str]  # "local", "ai" or None when nothing answered
+    answer: Any
+    reason: str
+    seconds: float
+
+
+class SpeculativeDispatcher:
+    """Races a local handler against the AI and keeps the better answer"""
+
+    def __init__(self, deadline: float = 4.0, local_confidence: float = 0.75, max_workers: int = 4):
+        self.deadline = deadline
+        self.local_confidence = local_confidence
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="beastboy-dispatch")
+        self.histograms: Dict[str, LatencyHistogram] = {
+            "local": LatencyHistogram(), "ai": LatencyHistogram(), "dispatch": LatencyHistogram()}
+        self.outcomes: Dict[str, int] = {}
+
+    def _submit(self, path: str, func: Callable[[], Any]) -> Future:
+        def timed():
+            started = time.perf_counter()
+            try:
+                return func()
+            finally:
+                self.histograms[path].record(time.perf_counter() - started)
+        # Carry context variables (such as the current trace) into the worker thread
+        return self.executor.submit(contextvars.copy_context().run, timed)
+
+    @staticmethod
+    def _result(future: Optional[Future], timeout: Optional[float]) -> Any:
+        """Result of ``future`` within ``timeout``; None on timeout or error"""
+        if future is None:
+            return None
+        done, _ = wait([future], timeout=None if timeout is None else max(0.0, timeout))
+        if not done:
+            return None
+        try:
+            return future.result()
+        except Exception as e:
+            logger.error(f"Dispatch path failed: {e}")
+            return None
+
+    def _drop(self, future: Optional[Future], cancel: Optional[Callable[[], None]] = None,
+              discard: Optional[Callable[[Any], None]] = None):
+        """Cancel the loser if it is still queued; otherwise stop it and throw its answer away"""
+        if future is None:
+            return
+        if future.cancel():
+            self.outcomes["cancelled"] = self.outcomes.get("cancelled", 0) + 1
+            return
+        if cancel is not None and not future.done():
+            cancel()
+        if discard is None:
+            return
+
+        def on_done(done: Future):
+            try:
+                answer = done.result()
+            except Exception:
+                return
+            if answer is not None:
+                discard(answer)
+        future.add_done_callback(on_done)
+
+    def _decide(self, source: Optional[str], answer: Any, reason: str, started: float) -> Decision:
+        seconds = time.perf_counter() - started
+        self.histograms["dispatch"].record(seconds)
+        key = f"{source or 'none'}:{reason}"
+        self.outcomes[key] = self.outcomes.get(key, 0) + 1
+        return Decision(source, answer, reason, seconds)
+
+    def dispatch(self, local: Optional[Callable[[], Any]] = None, confidence: float = 0.0,
+                 ai: Optional[Callable[[], Any]] = None, speculative_local: bool = True,
+                 speculative_ai: bool = True, discard: Callable[[Any], None] = lambda answer: None,
+                 cancel: Callable[[], None] = lambda: None, on_hold: Callable[[], None] = lambda: None) -> Decision:
+        """Run ``local`` (answer or None) and ``ai`` (answer or None) and pick one.
+
+        ``confidence`` is the router's score for the local match.
+        ``speculative_local=False`` holds a side-effecting handler back until
+        the AI has lost; ``speculative_ai=False`` only asks the AI once the
+        local handler had no answer. ``discard`` receives a losing AI answer,
+        ``cancel`` is called when the AI loses while still running, and
+        ``on_hold`` when the deadline passed with no answer and the AI is
+        still awaited.
+        """
+        started = time.perf_counter()
+        deadline_at = started + self.deadline
+        ai_future = self._submit("ai", ai) if ai is not None and speculative_ai else None
+        local_future = None
+        if local is not None and (speculative_local or ai_future is None):
+            local_future = self._submit("local", local)
+
+        if local_future is not None and (confidence >= self.local_confidence or ai_future is None):
+            answer = self._result(local_future, None)
+            if answer is not None:
+                self._drop(ai_future, cancel, discard)
+                reason = "confident" if confidence >= self.local_confidence else "local_first"
+                return self._decide("local", answer, reason, started)
+            if ai_future is None and ai is not None:
+                ai_future = self._submit("ai", ai)
+
+        if ai_future is not None:
+            answer = self._result(ai_future, deadline_at - time.perf_counter())
+            if answer is not None:
+                self._drop(local_future)
+                return self._decide("ai", answer, "answered", started)
+            reason = "deadline" if not ai_future.done() else "ai_failed"
+        else:
+            reason = "local_only"
+
+        if local is not None:
+            if local_future is None:
+                local_future = self._submit("local", local)
+            answer = self._result(local_future, None)
+            if answer is not None:
+                self._drop(ai_future, cancel, discard)
+                return self._decide("local", answer, reason, started)
+
+        if ai_future is not None and reason == "deadline":
+            # Nothing else to say, so a late AI answer still beats giving up
+            if not ai_future.done():
+                on_hold()
+            answer = self._result(ai_future, None)
+            if answer is not None:
+                return self._decide("ai", answer, "late", started)
+            reason = "ai_failed"
+        return self._decide(None, None, reason, started)
+
+    def stats(self) -> dict:
+        return {
+            "deadline_s": self.deadline,
+            "local_confidence": self.local_confidence,
+            "outcomes": dict(self.outcomes),
+            "latency": {path: histogram.snapshot() for path, histogram in self.histograms.items()},
+        }
+
+    def close(self):
+        self.executor.shutdown(wait=False)
+
+
+def simulate(commands: int = 200, deadline: float = 1.5, seed: int = 1) -> dict:
+    """Compare sequential and speculative end-to-end latency with simulated handler and AI timings"""
+    rng = random.Random(seed)
+    scenarios = []
+    for _ in range(commands):
+        local_seconds = rng.choice([0.002, 0.01, 0.3])      # system call, lookup, web service
+        ai_seconds = rng.lognormvariate(-0.7, 0.5)           # median ~0.5 s
+        ai_answers = rng.random() < 0.9
+        if not ai_answers:
+            ai_seconds = 3.0                                  # upstream timeout
+        local_answers = rng.random() < 0.6
+        confidence = rng.choice([0.4, 0.6, 0.9, 1.0])
+        scenarios.append((local_seconds, ai_seconds, ai_answers, local_answers, confidence))
+
+    def sleeper(seconds: float, answer: Any) -> Callable[[], Any]:
+        def run():
+            time.sleep(seconds)
+            return answer
+        return run
+
+    sequential = LatencyHistogram()
+    for local_seconds, ai_seconds, ai_answers, local_answers, confidence in scenarios:
+        # Old policy: AI first for low-confidence matches, local first otherwise
+        if confidence < 0.75:
+            sequential.record(ai_seconds + (0 if ai_answers else local_seconds))
+        else:
+            sequential.record(local_seconds + (0 if local_answers else ai_seconds))
+
+    dispatcher = SpeculativeDispatcher(deadline=deadline)
+    started = time.perf_counter()
+    for local_seconds, ai_seconds, ai_answers, local_answers, confidence in scenarios:
+        dispatcher.dispatch(sleeper(local_seconds, "local" if local_answers else None), confidence,
+                            sleeper(ai_seconds, "ai" if ai_answers else None))
+    wall = time.perf_counter() - started
+    report = dispatcher.stats()
+    dispatcher.close()
+    report["sequential_model"] = sequential.snapshot()
+    report["wall_seconds"] = round(wall, 2)
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Simulate speculative local/AI dispatch")
+    parser.add_argument("--commands", type=int, default=200)
+    parser.add_argument("--deadline", type=float, default=1.5)
+    args = parser.parse_args()
+
+    report = simulate(args.commands, args.deadline)
+    print(f"outcomes: {report['outcomes']}")
+    for name, snapshot in list(report["latency"].items()) + [("sequential", report["sequential_model"])]:
+        print(f"{name:>10}: n={snapshot['count']} mean={snapshot['mean_ms']}ms "
+              f"p50={snapshot['p50_ms']}ms p95={snapshot['p95_ms']}ms")
@@ -0,0 +1,257 @@
+"""Shared HTTP client for Beastboy's network services.
+
+One pooled aiohttp session (for coroutines on the pipeline loop) and one
+pooled requests session (for libraries that make blocking calls) are created
+on first use and kept for the life of the assistant, so consecutive queries
+to the same host reuse a warm TCP/TLS connection instead of paying the
+handshake every time. Both share the same timeouts and retry policy: failed
+connections, timeouts, 429 and 5xx responses are retried with full-jitter
+exponential backoff.
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import random
+import threading
+import time
+from dataclasses import dataclass, fields
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from startup import lazy_import, module_available
+
+# aiohttp is only imported when the first async request is made
+AIOHTTP_AVAILABLE = module_available("aiohttp")
+aiohttp = lazy_import("aiohttp")
+
+logger = logging.getLogger(__name__)
+
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+USER_AGENT = "Beastboy/1.0 (voice assistant)"
+
+
+class HttpError(Exception):
+    """A request failed after all retries; ``status`` is None for connection errors"""
+
+    def __init__(self, message: str, status: Optional[int] = None):
+        super().__init__(message)
+        self.status = status
+
+
+@dataclass
+class HttpClientConfig:
+    limit: int = 20                # open connections across all hosts
+    limit_per_host: int = 4
+    keepalive_seconds: float = 30.0
+    dns_cache_seconds: int = 300
+    connect_timeout: float = 3.0
+    total_timeout: float = 10.0
+    retries: int = 2               # extra attempts after the first
+    backoff_base: float = 0.25
+    backoff_max: float = 2.0
+
+    @classmethod
+    def from_dict(cls, values: Dict[str, Any]) -> "HttpClientConfig":
+        known = {f.name for f in fields(cls)}
+        return cls(**{k: v for k, v in values.items() if k in known})
+
+
+def backoff_delay(attempt: int, base: float, cap: float, rng: random.Random = random) -> float:
+    """Full-jitter exponential backoff: uniform in [0, min(cap, base * 2**attempt)]"""
+    return rng.uniform(0, min(cap, base * (2 ** attempt)))
+
+
+class HttpClient:
+    """Pooled sync and async HTTP sessions shared by every service integration"""
+
+    def __init__(self, config: Optional[HttpClientConfig] = None):
+        self.config = config or HttpClientConfig()
+        self.requests = 0
+        self.retries = 0
+        self._session = None
+        self._session_loop: Optional[asyncio.AbstractEventLoop] = None
+        self._requests_session: Optional[requests.Session] = None
+        self._lock = threading.Lock()
+
+    @property
+    def session(self) -> "aiohttp.ClientSession":
+        """The pooled aiohttp session, bound to the running event loop on first use"""
+        if not AIOHTTP_AVAILABLE:
+            raise HttpError("aiohttp is not installed")
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(limit=self.config.limit,
+                                             limit_per_host=self.config.limit_per_host,
+                                             ttl_dns_cache=self.config.dns_cache_seconds,
+                                             keepalive_timeout=self.config.keepalive_seconds)
+            timeout = aiohttp.ClientTimeout(total=self.config.total_timeout,
+                                            sock_connect=self.config.connect_timeout)
+            self._session = aiohttp.ClientSession(connector=connector, timeout=timeout,
+                                                  headers={"User-Agent": USER_AGENT})
+            self._session_loop = asyncio.get_running_loop()
+        return self._session
+
+    @property
+    def requests_session(self) -> requests.Session:
+        """The pooled requests session for blocking callers and third-party libraries"""
+        with self._lock:
+            if self._requests_session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=self.config.limit,
+                                      pool_maxsize=self.config.limit_per_host)
+                session.mount("http://", adapter)
+                session.mount("https://", adapter)
+                session.headers["User-Agent"] = USER_AGENT
+                self._requests_session = session
+            return self._requests_session
+
+    async def get_json(self, url: str, params: Optional[Dict[str, Any]] = None) -> Any:
+        """GET ``url`` on the pooled aiohttp session and decode JSON, retrying transient failures"""
+        session = self.session
+        for attempt in range(self.config.retries + 1):
+            self.requests += 1
+            try:
+                async with session.get(url, params=params) as response:
+                    if response.status < 400:
+                        return await response.json(content_type=None)
+                    error = HttpError(f"HTTP {response.status} from {url}", response.status)
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                error = HttpError(f"{type(e).__name__} for {url}: {e}")
+            if error.status is not None and error.status not in RETRY_STATUSES:
+                raise error
+            if attempt == self.config.retries:
+                raise error
+            self.retries += 1
+            await asyncio.sleep(backoff_delay(attempt, self.config.backoff_base, self.config.backoff_max))
+
+    def get_json_sync(self, url: str, params: Optional[Dict[str, Any]] = None) -> Any:
+        """Blocking counterpart of ``get_json`` on the pooled requests session"""
+        session = self.requests_session
+        timeout = (self.config.connect_timeout, self.config.total_timeout)
+        for attempt in range(self.config.retries + 1):
+            self.requests += 1
+            try:
+                response = session.get(url, params=params, timeout=timeout)
+                if response.status_code < 400:
+                    return response.json()
+                error = HttpError(f"HTTP {response.status_code} from {url}", response.status_code)
+            except requests.RequestException as e:
+                error = HttpError(f"{type(e).__name__} for {url}: {e}")
+            if error.status is not None and error.status not in RETRY_STATUSES:
+                raise error
+            if attempt == self.config.retries:
+                raise error
+            self.retries += 1
+            time.sleep(backoff_delay(attempt, self.config.backoff_base, self.config.backoff_max))
+
+    async def aclose(self):
+        """Close the aiohttp session; call on the loop that created it"""
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+    def close(self, timeout: float = 5.0):
+        """Close both sessions from any thread"""
+        session, loop = self._session, self._session_loop
+        if session is not None and not session.closed:
+            if loop is not None and loop.is_running():
+                try:
+                    asyncio.run_coroutine_threadsafe(self.aclose(), loop).result(timeout)
+                except Exception as e:
+                    logger.warning(f"Failed to close HTTP session: {e}")
+            elif loop is not None and not loop.is_closed():
+                loop.run_until_complete(self.aclose())
+        with self._lock:
+            if self._requests_session is not None:
+                self._requests_session.close()
+                self._requests_session = None
+
+    def stats(self) -> dict:
+        return {"requests": self.requests, "retries": self.retries}
+
+
+class _StubHandler(BaseHTTPRequestHandler):
+    """JSON stub that counts TCP connections; ``/flaky`` fails every other request with 503"""
+
+    protocol_version = "HTTP/1.1"  # keep-alive
+
+    def setup(self):
+        super().setup()
+        with self.server.lock:
+            self.server.connections += 1
+
+    def do_GET(self):
+        with self.server.lock:
+            self.server.hits += 1
+            fail = self.path.startswith("/flaky") and self.server.hits % 2 == 1
+        status = 503 if fail else 200
+        body = json.dumps({"ok": not fail, "path": self.path}).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_stub_server() -> ThreadingHTTPServer:
+    """Serve ``_StubHandler`` on a free localhost port in a daemon thread"""
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _StubHandler)
+    server.daemon_threads = True
+    server.lock = threading.Lock()
+    server.connections = 0
+    server.hits = 0
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def demo(queries: int = 10) -> dict:
+    """Run consecutive queries against a local stub and count the TCP connections it saw"""
+    server = start_stub_server()
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+    results = {}
+    try:
+        client = HttpClient(HttpClientConfig(backoff_base=0.01))
+        started = time.perf_counter()
+        for i in range(queries):
+            client.get_json_sync(f"{base}/weather", {"q": i})
+        results["sync"] = {"queries": queries, "connections": server.connections,
+                           "ms_per_query": round((time.perf_counter() - started) / queries * 1000, 2)}
+
+        client.get_json_sync(f"{base}/flaky")
+        results["sync_retry"] = client.stats()
+
+        if AIOHTTP_AVAILABLE:
+            async def run_async():
+                before = server.connections
+                started = time.perf_counter()
+                for i in range(queries):
+                    await client.get_json(f"{base}/weather", {"q": i})
+                elapsed = time.perf_counter() - started
+                await client.aclose()
+                return {"queries": queries, "connections": server.connections - before,
+                        "ms_per_query": round(elapsed / queries * 1000, 2)}
+            results["async"] = asyncio.run(run_async())
+        client.close()
+    finally:
+        server.shutdown()
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Show connection reuse against a local stub HTTP server")
+    parser.add_argument("--queries", type=int, default=10)
+    args = parser.parse_args()
+
+    report = demo(args.queries)
+    for name, row in report.items():
+        print(f"{name}: {row}")
+    reused = all(row.get("connections", 1) == 1 for row in report.values())
+    print(f"Connection reuse: {'OK' if reused else 'FAILED'}")
+    raise SystemExit(0 if reused else 1)
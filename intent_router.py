@@ -0,0 +1,363 @@
+"""Declarative intent routing for Beastboy.
+
+Every intent lists its trigger phrases with a weight, plus an optional regex
+that extracts slots. All triggers are compiled into one word-level
+Aho-Corasick automaton, so a command is scanned once no matter how many
+intents exist, and matching happens on whole words ("lock" never matches
+"clock"). The highest-weighted trigger wins; ties go to the earliest match.
+Generic single words can be held to the command position (after fillers
+such as "please"), so "stop" ends the session but "I want to stop the
+music" does not, or can require a context word elsewhere in the command,
+so "memory" is a system metric only next to words like "my" or "usage".
+"""
+
+import argparse
+import json
+import random
+import re
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple, Union
+
+from reminders import NUMBER_PATTERN, UNIT_SECONDS, parse_number, parse_reminder
+
+TOKEN_RE = re.compile(r"[a-z0-9]+(?:'[a-z]+)?")
+# Words that may come before the command itself: "please stop", "okay so open chrome"
+LEADING_FILLERS = {"please", "hey", "okay", "ok", "so", "now", "just"}
+
+TriggerSpec = Union[str, Tuple[str, float]]
+
+
+@dataclass
+class Intent:
+    name: str
+    triggers: Sequence[TriggerSpec]
+    pattern: Optional[str] = None      # regex with named groups, searched in the command
+    anchored: bool = False             # triggers only count at the start of the command
+    anchored_triggers: Sequence[str] = ()   # just these triggers only count at the start
+    context_triggers: Sequence[str] = ()    # these triggers also need a context word in the command
+    context: Sequence[str] = ()             # e.g. "usage" for "memory"
+    extractor: Optional[Callable[[str, "RouteResult"], Dict[str, Any]]] = None
+    side_effects: bool = False         # acts on the system, so never run speculatively
+    compiled: Optional[re.Pattern] = field(default=None, init=False, repr=False)
+
+    def __post_init__(self):
+        if self.pattern:
+            self.compiled = re.compile(self.pattern)
+
+
+@dataclass
+class Trigger:
+    intent: Intent
+    phrase: str
+    weight: float
+    length: int  # in tokens
+    anchored: bool = False
+    context: frozenset = frozenset()
+
+
+@dataclass
+class RouteResult:
+    intent: Intent
+    trigger: Trigger
+    confidence: float
+    start: int           # character offsets of the matched trigger
+    end: int
+    slots: Dict[str, Any] = field(default_factory=dict)
+
+    @property
+    def name(self) -> str:
+        return self.intent.name
+
+
+def tokenize(text: str) -> List[Tuple[str, int, int]]:
+    """Lowercase word tokens with their character spans"""
+    return [(m.group(), m.start(), m.end()) for m in TOKEN_RE.finditer(text.lower())]
+
+
+def default_weight(phrase: str) -> float:
+    """Longer, more specific phrases outrank single words"""
+    return min(1.0, 0.5 + 0.25 * (len(tokenize(phrase)) - 1))
+
+
+class _TokenAutomaton:
+    """Aho-Corasick automaton whose alphabet is whole words"""
+
+    def __init__(self):
+        self.transitions: List[Dict[str, int]] = [{}]
+        self.failure: List[int] = [0]
+        self.outputs: List[List[Trigger]] = [[]]
+
+    def add(self, tokens: Sequence[str], trigger: Trigger):
+        state = 0
+        for token in tokens:
+            nxt = self.transitions[state].get(token)
+            if nxt is None:
+                nxt = len(self.transitions)
+                self.transitions[state][token] = nxt
+                self.transitions.append({})
+                self.failure.append(0)
+                self.outputs.append([])
+            state = nxt
+        self.outputs[state].append(trigger)
+
+    def build(self):
+        pending = deque(self.transitions[0].values())
+        while pending:
+            state = pending.popleft()
+            for token, nxt in self.transitions[state].items():
+                pending.append(nxt)
+                fallback = self.failure[state]
+                while fallback and token not in self.transitions[fallback]:
+                    fallback = self.failure[fallback]
+                target = self.transitions[fallback].get(token, 0)
+                self.failure[nxt] = target if target != nxt else 0
+                self.outputs[nxt] = self.outputs[nxt] + self.outputs[self.failure[nxt]]
+
+    def search(self, tokens: Sequence[str]) -> Iterator[Tuple[int, Trigger]]:
+        """Yield (index of last token, trigger) for every occurrence"""
+        state = 0
+        transitions, failure, outputs = self.transitions, self.failure, self.outputs
+        for index, token in enumerate(tokens):
+            while state and token not in transitions[state]:
+                state = failure[state]
+            state = transitions[state].get(token, 0)
+            for trigger in outputs[state]:
+                yield index, trigger
+
+
+class IntentRouter:
+    """Picks the best intent for a command in one pass over its words"""
+
+    def __init__(self, intents: Sequence[Intent] = ()):
+        self.intents: List[Intent] = []
+        self._automaton = _TokenAutomaton()
+        for intent in intents:
+            self.register(intent, build=False)
+        self._automaton.build()
+
+    def register(self, intent: Intent, build: bool = True):
+        """Add an intent; rebuilds the automaton unless told otherwise"""
+        self.intents.append(intent)
+        for spec in intent.triggers:
+            phrase, weight = (spec, default_weight(spec)) if isinstance(spec, str) else spec
+            tokens = [t for t, _, _ in tokenize(phrase)]
+            anchored = intent.anchored or phrase in intent.anchored_triggers
+            context = frozenset(intent.context) if phrase in intent.context_triggers else frozenset()
+            self._automaton.add(tokens, Trigger(intent, phrase, weight, len(tokens), anchored, context))
+        if build:
+            self._automaton.build()
+
+    def route(self, command: str) -> Optional[RouteResult]:
+        """Best-matching intent with its slots, or None if no trigger matched"""
+        spans = tokenize(command)
+        words = [t for t, _, _ in spans]
+        command_start = next((i for i, word in enumerate(words) if word not in LEADING_FILLERS), 0)
+        best = None
+        best_key = None
+        for end_index, trigger in self._automaton.search(words):
+            start_index = end_index - trigger.length + 1
+            if trigger.anchored and start_index != command_start:
+                continue
+            if trigger.context and trigger.context.isdisjoint(words):
+                continue
+            key = (trigger.weight, -start_index)
+            if best_key is None or key > best_key:
+                best_key = key
+                best = (trigger, spans[start_index][1], spans[end_index][2])
+        if best is None:
+            return None
+
+        trigger, start, end = best
+        text = command.lower()
+        result = RouteResult(trigger.intent, trigger, trigger.weight, start, end)
+        result.slots["rest"] = text[end:].strip()
+        if trigger.intent.compiled is not None:
+            match = trigger.intent.compiled.search(text)
+            if match:
+                result.slots.update({k: v.strip() for k, v in match.groupdict().items() if v is not None})
+        if trigger.intent.extractor is not None:
+            result.slots.update(trigger.intent.extractor(text, result))
+        return result
+
+
+# Words around a weather trigger that are not part of a city name
+WEATHER_FILLERS = {"the", "what", "what's", "whats", "how", "how's", "is", "will", "it", "be", "going", "to",
+                   "tell", "me", "about", "show", "give", "get", "check", "current", "today's", "like", "in",
+                   "for", "at", "of", "please", "thanks", "today", "tomorrow", "tonight", "now", "right", "this",
+                   "week", "my", "a"}
+
+
+def _weather_slots(text: str, result: RouteResult) -> Dict[str, Any]:
+    # The city follows the trigger ("weather in paris") or comes right before it ("paris weather")
+    after = [t for t, _, _ in tokenize(text[result.end:])]
+    while after and after[0] in WEATHER_FILLERS:
+        after.pop(0)
+    city = []
+    for word in after:
+        if word in WEATHER_FILLERS:
+            break
+        city.append(word)
+    if not city:
+        for word in reversed([t for t, _, _ in tokenize(text[:result.start])]):
+            if word in WEATHER_FILLERS:
+                break
+            city.insert(0, word)
+    return {"city": " ".join(city)} if city else {}
+
+
+def _reminder_slots(text: str, result: RouteResult) -> Dict[str, Any]:
+    parsed = parse_reminder(text)
+    return {"text": parsed.text, "when": parsed.when} if parsed else {}
+
+
+METRIC_WORDS = {"cpu": "cpu", "processor": "cpu", "memory": "memory", "ram": "memory", "disk": "disk",
+                "network": "network", "bandwidth": "network", "download": "network", "upload": "network"}
+WINDOW_RE = re.compile(rf"\b(?:last|past) (?:({NUMBER_PATTERN}) )?(second|minute|hour|day)s?\b")
+
+
+def _system_metric_slots(text: str, result: RouteResult) -> Dict[str, Any]:
+    # No window means "right now"; "the last hour" is one hour
+    slots = {"metric": next((METRIC_WORDS[t] for t, _, _ in tokenize(text) if t in METRIC_WORDS), "cpu")}
+    match = WINDOW_RE.search(text)
+    if match:
+        amount = match.group(1) or "1"
+        slots["seconds"] = parse_number(amount) * UNIT_SECONDS[match.group(2)]
+    return slots
+
+
+def _math_slots(text: str, result: RouteResult) -> Dict[str, Any]:
+    # Command words start the expression; spoken operators keep the whole question
+    if result.trigger.phrase in ("calculate", "compute", "solve", "math"):
+        return {"expression": text[result.end:].strip()}
+    if result.trigger.phrase == "convert":
+        return {"expression": text[result.start:].strip()}
+    return {"expression": text.strip()}
+
+
+DEFAULT_INTENTS = [
+    Intent("weather", [("weather", 0.9), ("temperature", 0.8), ("forecast", 0.9)], extractor=_weather_slots),
+    Intent("math", [("calculate", 0.9), ("compute", 0.9), ("solve", 0.9), ("math", 0.8), ("convert", 0.9),
+                    ("square root", 0.9), ("cube root", 0.9), ("to the power of", 0.9), ("factorial", 0.8),
+                    ("percent of", 0.8), ("times", 0.6), ("multiplied by", 0.8), ("divided by", 0.8),
+                    ("plus", 0.6), ("minus", 0.6)],
+           extractor=_math_slots),
+    Intent("stock_price", [("stock price", 1.0), ("share price", 1.0), ("stock", 0.6)],
+           pattern=r"(?:stock|share)s? (?:price )?(?:of |for )?(?P<symbol>[a-z]{1,5})\b"),
+    Intent("wikipedia", [("wikipedia", 0.9), ("tell me about", 0.7), ("who is", 0.6), ("what is", 0.4)],
+           pattern=r"(?:wikipedia(?: search)?(?: for)?|tell me about|who is|what is)\s+(?P<query>.+)"),
+    Intent("translate", [("translate", 0.9)],
+           pattern=r"translate (?P<text>.+?) (?:to|into) (?P<language>\w+)"),
+    Intent("reminder", [("remind me", 1.0), ("set reminder", 1.0), ("set a reminder", 1.0)],
+           extractor=_reminder_slots, side_effects=True),
+    Intent("list_reminders", [("list reminders", 1.0), ("list my reminders", 1.0), ("my reminders", 1.0),
+                              ("show reminders", 1.0), ("what reminders", 1.0), ("pending reminders", 1.0)]),
+    Intent("cancel_reminder", [("cancel reminder", 1.0), ("cancel the reminder", 1.0), ("cancel my reminder", 1.0),
+                               ("cancel reminders", 1.0), ("cancel all reminders", 1.0), ("cancel my reminders", 1.0),
+                               ("delete reminder", 1.0), ("delete the reminder", 1.0), ("remove reminder", 1.0)],
+           pattern=r"(?:cancel|delete|remove) (?:the |my |all |all my )?reminders?(?: (?:to|about|for))?\s*(?P<text>.*)",
+           side_effects=True),
+    Intent("pause", [("pause", 0.8), ("stop listening", 1.0)], side_effects=True),
+    Intent("resume", [("resume", 0.8), ("start listening", 1.0)], side_effects=True),
+    Intent("status", [("status", 0.6), ("how are you", 0.9)]),
+    Intent("open_app", [("open", 0.9), ("launch", 0.9), ("start", 0.7)], anchored=True, side_effects=True),
+    Intent("volume_up", [("volume up", 1.0), ("increase volume", 1.0), ("increase the volume", 1.0),
+                         ("turn up the volume", 1.0), ("louder", 0.8)], side_effects=True),
+    Intent("volume_down", [("volume down", 1.0), ("decrease volume", 1.0), ("decrease the volume", 1.0),
+                           ("turn down the volume", 1.0), ("quieter", 0.8)], side_effects=True),
+    Intent("system_info", [("system info", 1.0), ("system information", 1.0), ("system status", 1.0),
+                           ("performance", 0.7)]),
+    Intent("system_metric", [("cpu", 0.8), ("processor", 0.8), ("memory", 0.7), ("ram", 0.7),
+                             ("memory usage", 0.9), ("disk usage", 0.9), ("disk space", 0.9),
+                             ("network usage", 0.9), ("network traffic", 0.9), ("bandwidth", 0.8)],
+           context_triggers=("memory", "ram"),
+           context=("my", "usage", "use", "used", "using", "load", "free", "available", "left", "last", "past",
+                    "percent", "percentage", "current", "check", "level"),
+           extractor=_system_metric_slots),
+    Intent("time", [("what time", 1.0), ("current time", 1.0), ("time", 0.6)]),
+    Intent("date", [("what date", 1.0), ("today's date", 1.0), ("what day", 0.9), ("date", 0.6)]),
+    Intent("web_search", [("search for", 0.8), ("google", 0.7), ("look up", 0.8), ("search", 0.6)],
+           pattern=r"(?:search for|google|look up|search)\s+(?P<query>.+)", side_effects=True),
+    Intent("shutdown", [("shutdown", 0.9), ("shut down", 0.9)], side_effects=True),
+    Intent("restart", [("restart", 0.9), ("reboot", 0.9)], side_effects=True),
+    Intent("lock", [("lock", 0.8), ("lock the computer", 1.0)], side_effects=True),
+    Intent("help", [("help", 0.6), ("what can you do", 1.0)]),
+    Intent("goodbye", [("goodbye", 0.8), ("exit", 0.7), ("quit", 0.7), ("stop", 0.5)],
+           anchored_triggers=("exit", "quit", "stop"), side_effects=True),
+]
+
+
+def default_router() -> IntentRouter:
+    return IntentRouter(DEFAULT_INTENTS)
+
+
+def check_golden(router: IntentRouter, path: str) -> List[str]:
+    """Compare routing against a golden JSON file; returns human-readable mismatches"""
+    with open(path, 'r', encoding='utf-8') as f:
+        cases = json.load(f)
+    failures = []
+    for case in cases:
+        result = router.route(case["utterance"])
+        intent = result.name if result else None
+        if intent != case["intent"]:
+            failures.append(f"{case['utterance']!r}: expected {case['intent']}, got {intent}")
+            continue
+        for slot, expected in case.get("slots", {}).items():
+            if result.slots.get(slot) != expected:
+                failures.append(f"{case['utterance']!r}: slot {slot} expected {expected!r}, "
+                                f"got {result.slots.get(slot)!r}")
+    return failures
+
+
+def build_corpus(golden_path: str, size: int = 5000, seed: int = 1) -> List[str]:
+    """Expand the golden utterances with fillers into a benchmark corpus"""
+    with open(golden_path, 'r', encoding='utf-8') as f:
+        utterances = [case["utterance"] for case in json.load(f)]
+    prefixes = ["", "", "please ", "could you ", "hey ", "okay so "]
+    suffixes = ["", "", " please", " right now", " for me", " thanks"]
+    rng = random.Random(seed)
+    return [rng.choice(prefixes) + rng.choice(utterances) + rng.choice(suffixes) for _ in range(size)]
+
+
+def benchmark(corpus: List[str], extra_intents: Sequence[int] = (0, 100, 1000)) -> List[dict]:
+    """Time routing over ``corpus`` as the registry grows with dummy intents"""
+    rows = []
+    for extra in extra_intents:
+        dummies = [Intent(f"dummy_{i}", [f"zq{i} alpha", f"xv{i}"]) for i in range(extra)]
+        router = IntentRouter(DEFAULT_INTENTS + dummies)
+        started = time.perf_counter()
+        for utterance in corpus:
+            router.route(utterance)
+        elapsed = time.perf_counter() - started
+        rows.append({
+            "intents": len(router.intents),
+            "utterances": len(corpus),
+            "us_per_utterance": round(elapsed / len(corpus) * 1e6, 2),
+        })
+    return rows
+
+
+if __name__ == "__main__":
+    golden_default = str(Path(__file__).with_name("data") / "intent_golden.json")
+    parser = argparse.ArgumentParser(description="Check and benchmark Beastboy intent routing")
+    parser.add_argument("--golden", default=golden_default)
+    parser.add_argument("--corpus-size", type=int, default=5000)
+    parser.add_argument("--route", help="route a single utterance and print the result")
+    args = parser.parse_args()
+
+    router = default_router()
+    if args.route:
+        result = router.route(args.route)
+        print(None if result is None else {"intent": result.name, "confidence": result.confidence,
+                                           "trigger": result.trigger.phrase, "slots": result.slots})
+        raise SystemExit(0)
+
+    failures = check_golden(router, args.golden)
+    for failure in failures:
+        print(f"FAIL  {failure}")
+    print(f"Golden routing: {'OK' if not failures else f'{len(failures)} mismatches'}")
+    for row in benchmark(build_corpus(args.golden, args.corpus_size)):
+        print(row)
+    raise SystemExit(1 if failures else 0)
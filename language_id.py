@@ -0,0 +1,228 @@
+"""Offline language identification for recognized commands.
+
+Replaces the googletrans ``detect`` round trip that ran on every utterance.
+Scripts other than Latin (Cyrillic, Devanagari, Arabic, Hangul, kana, Han,
+...) identify the language directly from their Unicode ranges. Latin text
+is scored with a naive Bayes model over character 2- and 3-grams. The
+profiles for that model are built ahead of time from
+``data/language_corpus.json`` into ``data/language_profiles.json``. Snippets
+shorter than ``min_chars`` letters are not scored. A non-default language
+must also win by ``min_margin`` per n-gram. Without both, the default
+language is kept and nothing is translated. ``python language_id.py`` reports
+accuracy and latency on the held-out part of the corpus;
+``python language_id.py build`` rebuilds the profiles.
+"""
+
+import argparse
+import json
+import math
+import re
+import time
+import unicodedata
+from collections import Counter
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+DATA_DIR = Path(__file__).with_name("data")
+CORPUS_PATH = DATA_DIR / "language_corpus.json"
+PROFILES_PATH = DATA_DIR / "language_profiles.json"
+GOLDEN_PATH = DATA_DIR / "intent_golden.json"
+
+ORDERS = (2, 3)
+PROFILE_SIZE = 1000
+SMOOTHING = 0.5
+
+# (first code point, last code point, googletrans language code)
+SCRIPTS = (
+    (0x0370, 0x03FF, "el"),
+    (0x0400, 0x04FF, "ru"),
+    (0x0590, 0x05FF, "iw"),
+    (0x0600, 0x06FF, "ar"),
+    (0x0900, 0x097F, "hi"),
+    (0x0E00, 0x0E7F, "th"),
+    (0x1100, 0x11FF, "ko"),
+    (0x3040, 0x30FF, "ja"),
+    (0x4E00, 0x9FFF, "zh-cn"),
+    (0xAC00, 0xD7AF, "ko"),
+)
+
+
+@dataclass(frozen=True)
+class Detection:
+    language: str
+    confidence: float  # per-n-gram log-probability margin over the default language; 1.0 if not needed
+    method: str        # "script", "ngram", "short" or "uncertain"
+
+
+def script_language(text: str) -> Optional[str]:
+    """Language implied by a non-Latin script, if most letters use one"""
+    if text.isascii():
+        return None
+    counts: Dict[str, int] = Counter()
+    latin = 0
+    for char in text:
+        code = ord(char)
+        if code < 0x0250:
+            latin += char.isalpha()
+            continue
+        for first, last, language in SCRIPTS:
+            if first <= code <= last:
+                counts[language] += 1
+                break
+    if not counts or sum(counts.values()) < latin:
+        return None
+    if counts.get("ja"):
+        return "ja"  # Japanese mixes kana with Han characters
+    return counts.most_common(1)[0][0]
+
+
+WORD_RE = re.compile(r"[^\W\d_]+")
+
+
+def normalize(text: str) -> List[str]:
+    """Lowercased words, accents kept; digits and punctuation removed"""
+    return WORD_RE.findall(unicodedata.normalize("NFC", text.lower()))
+
+
+def ngrams(words: List[str]) -> Iterator[str]:
+    for word in words:
+        padded = f" {word} "
+        for order in ORDERS:
+            for start in range(len(padded) - order + 1):
+                gram = padded[start:start + order]
+                if gram != " ":
+                    yield gram
+
+
+def build_profiles(corpus: Dict[str, Dict[str, List[str]]], size: int = PROFILE_SIZE) -> dict:
+    """The ``size`` most frequent n-grams of each language's training text, with counts"""
+    languages = {}
+    for language, split in corpus.items():
+        if not split.get("train"):
+            continue
+        counts = Counter(gram for sentence in split["train"] for gram in ngrams(normalize(sentence)))
+        languages[language] = {"total": sum(counts.values()), "ngrams": dict(counts.most_common(size))}
+    return {"orders": list(ORDERS), "smoothing": SMOOTHING, "languages": languages}
+
+
+class LanguageIdentifier:
+    """Character n-gram naive Bayes classifier with a Unicode-script shortcut"""
+
+    def __init__(self, profiles: dict, default: str = "en", min_chars: int = 10, min_margin: float = 0.1):
+        self.default = default
+        self.min_chars = min_chars
+        self.min_margin = min_margin
+        self.languages: Tuple[str, ...] = tuple(profiles["languages"])
+        smoothing = profiles.get("smoothing", SMOOTHING)
+        vocabulary = set()
+        for profile in profiles["languages"].values():
+            vocabulary.update(profile["ngrams"])
+        # Every table covers the whole vocabulary, so scoring is a plain sum(map(...)) per language
+        self.vocabulary = frozenset(vocabulary)
+        self.tables: List[Dict[str, float]] = []
+        for language in self.languages:
+            profile = profiles["languages"][language]
+            denominator = profile["total"] + smoothing * len(vocabulary)
+            counts = profile["ngrams"]
+            self.tables.append({gram: math.log((counts.get(gram, 0) + smoothing) / denominator)
+                                for gram in vocabulary})
+
+    @classmethod
+    def load(cls, path=PROFILES_PATH, **options) -> "LanguageIdentifier":
+        with open(path, 'r', encoding='utf-8') as f:
+            return cls(json.load(f), **options)
+
+    def scores(self, words: List[str]) -> Tuple[Dict[str, float], int]:
+        """Summed log-probability per language, and how many n-grams were scored"""
+        known = [gram for gram in ngrams(words) if gram in self.vocabulary]
+        return {language: sum(map(table.__getitem__, known))
+                for language, table in zip(self.languages, self.tables)}, len(known)
+
+    def detect(self, text: str) -> Detection:
+        script = script_language(text)
+        if script:
+            return Detection(script, 1.0, "script")
+        words = normalize(text)
+        if sum(map(len, words)) < self.min_chars:
+            return Detection(self.default, 0.0, "short")
+        scores, scored = self.scores(words)
+        if not scored:
+            return Detection(self.default, 0.0, "uncertain")
+        best = max(scores, key=scores.get)
+        if best == self.default or self.default not in scores:
+            return Detection(best, 1.0, "ngram")
+        # Translating costs a network call, so another language must clearly beat the default
+        margin = (scores[best] - scores[self.default]) / scored
+        if margin < self.min_margin:
+            return Detection(self.default, margin, "uncertain")
+        return Detection(best, margin, "ngram")
+
+
+def load_corpus(path=CORPUS_PATH) -> Dict[str, Dict[str, List[str]]]:
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def benchmark(identifier: LanguageIdentifier, corpus: Dict[str, Dict[str, List[str]]],
+              english_commands: List[str] = (), rounds: int = 20) -> dict:
+    """Accuracy per language on the test sentences, detection latency, and English commands kept as English.
+
+    The last number matters most: every English command misread as another
+    language costs two translation round trips and usually a wrong answer.
+    """
+    per_language = {}
+    mistakes = []
+    durations = []
+    for language, split in corpus.items():
+        cases = split.get("test", [])
+        correct = 0
+        for text in cases:
+            result = identifier.detect(text)
+            if result.language == language:
+                correct += 1
+            else:
+                mistakes.append((language, text, result.language, result.method))
+            for _ in range(rounds):
+                started = time.perf_counter()
+                identifier.detect(text)
+                durations.append(time.perf_counter() - started)
+        per_language[language] = f"{correct}/{len(cases)}"
+    durations.sort()
+    total = sum(len(split.get("test", [])) for split in corpus.values())
+    return {
+        "accuracy": round(1 - len(mistakes) / total, 3) if total else None,
+        "per_language": per_language,
+        "mistakes": mistakes,
+        "english_commands_kept": f"{sum(identifier.detect(text).language == 'en' for text in english_commands)}"
+                                 f"/{len(english_commands)}",
+        "mean_us": round(sum(durations) / len(durations) * 1e6, 1),
+        "p99_us": round(durations[int(len(durations) * 0.99)] * 1e6, 1),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Offline language identification for Beastboy")
+    parser.add_argument("command", nargs="?", choices=("benchmark", "build", "detect"), default="benchmark")
+    parser.add_argument("text", nargs="*", help="text for 'detect'")
+    parser.add_argument("--corpus", default=str(CORPUS_PATH))
+    parser.add_argument("--profiles", default=str(PROFILES_PATH))
+    parser.add_argument("--min-chars", type=int, default=10)
+    parser.add_argument("--min-margin", type=float, default=0.1)
+    args = parser.parse_args()
+
+    if args.command == "build":
+        profiles = build_profiles(load_corpus(args.corpus))
+        with open(args.profiles, 'w', encoding='utf-8') as f:
+            json.dump(profiles, f, ensure_ascii=False, separators=(",", ":"))
+        print(f"Wrote {len(profiles['languages'])} language profiles to {args.profiles}")
+    else:
+        started = time.perf_counter()
+        identifier = LanguageIdentifier.load(args.profiles, min_chars=args.min_chars, min_margin=args.min_margin)
+        print(f"Loaded profiles in {(time.perf_counter() - started) * 1000:.1f} ms")
+        if args.command == "detect":
+            print(identifier.detect(" ".join(args.text)))
+        else:
+            with open(GOLDEN_PATH, 'r', encoding='utf-8') as f:
+                commands = [case["utterance"] for case in json.load(f)]
+            print(benchmark(identifier, load_corpus(args.corpus), commands))
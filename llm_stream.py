@@ -0,0 +1,293 @@
+"""Streaming chat completions for Beastboy.
+
+Instead of waiting for the whole answer, the reply is requested with
+``stream=True`` from any OpenAI-compatible ``/chat/completions`` endpoint
+and its server-sent events are parsed as they arrive. ``SentenceChunker``
+cuts the token stream at sentence and clause boundaries so the first
+sentence can be spoken while the rest is still being generated. A reply
+can be cancelled (barge-in), which closes the HTTP stream. Time to first
+token and time to first audio are recorded per reply.
+"""
+
+import argparse
+import json
+import logging
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional
+
+logger = logging.getLogger(__name__)
+
+SENTENCE_END = re.compile(r"[.!?…]+[\"')\]]*\s")
+CLAUSE_END = re.compile(r"[,;:—]\s")
+
+
+class SentenceChunker:
+    """Splits streamed text into speakable pieces.
+
+    A chunk ends at sentence punctuation followed by whitespace; once the
+    buffer holds ``clause_chars`` it may also end at a comma, semicolon or
+    colon, and beyond ``max_chars`` it is cut at the last space.
+    """
+
+    def __init__(self, min_chars: int = 12, clause_chars: int = 60, max_chars: int = 200):
+        self.min_chars = min_chars
+        self.clause_chars = clause_chars
+        self.max_chars = max_chars
+        self._buffer = ""
+
+    def feed(self, delta: str) -> List[str]:
+        self._buffer += delta
+        chunks = []
+        while True:
+            cut = self._find_cut()
+            if cut is None:
+                break
+            chunk, self._buffer = self._buffer[:cut].strip(), self._buffer[cut:].lstrip()
+            if chunk:
+                chunks.append(chunk)
+        return chunks
+
+    def _find_cut(self) -> Optional[int]:
+        for match in SENTENCE_END.finditer(self._buffer):
+            if match.end() >= self.min_chars:
+                return match.end()
+        if len(self._buffer) >= self.clause_chars:
+            for match in CLAUSE_END.finditer(self._buffer, self.min_chars):
+                return match.end()
+        if len(self._buffer) >= self.max_chars:
+            space = self._buffer.rfind(" ", 0, self.max_chars)
+            return space if space > 0 else self.max_chars
+        return None
+
+    def flush(self) -> Optional[str]:
+        chunk, self._buffer = self._buffer.strip(), ""
+        return chunk or None
+
+
+def iter_sse_data(lines: Iterable) -> Iterator[str]:
+    """Yield the payload of each ``data:`` event from server-sent event lines"""
+    data = []
+    for line in lines:
+        if isinstance(line, bytes):
+            line = line.decode('utf-8')
+        line = line.rstrip("\r\n")
+        if not line:
+            if data:
+                yield "\n".join(data)
+                data = []
+        elif line.startswith("data:"):
+            data.append(line[5:].lstrip())
+    if data:
+        yield "\n".join(data)
+
+
+def iter_chat_deltas(lines: Iterable) -> Iterator[str]:
+    """Content deltas from a streamed chat completion, until ``[DONE]``"""
+    for payload in iter_sse_data(lines):
+        if payload == "[DONE]":
+            return
+        try:
+            event = json.loads(payload)
+        except ValueError:
+            logger.warning(f"Skipping malformed stream event: {payload[:80]}")
+            continue
+        for choice in event.get("choices", []):
+            content = choice.get("delta", {}).get("content")
+            if content:
+                yield content
+
+
+class StreamingReply:
+    """An in-flight streamed completion, iterated as speakable chunks"""
+
+    def __init__(self, response, chunker: Optional[SentenceChunker] = None,
+                 started_at: Optional[float] = None):
+        self.response = response
+        self.chunker = chunker or SentenceChunker()
+        self.started_at = started_at if started_at is not None else time.perf_counter()
+        self.first_token_at: Optional[float] = None
+        self.first_chunk_at: Optional[float] = None
+        self.first_audio_at: Optional[float] = None
+        self.first_utterance = None
+        self.on_done: Optional[Callable[["StreamingReply"], None]] = None
+        self.chunks = 0
+        self.text = ""
+        self._cancelled = threading.Event()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled.is_set()
+
+    def cancel(self):
+        """Stop generating; the HTTP stream is closed by the iterating thread"""
+        self._cancelled.set()
+
+    def close(self):
+        """Cancel without reading the rest, e.g. when a local answer won"""
+        self.cancel()
+        self.response.close()
+
+    def mark_audio(self, at: Optional[float] = None):
+        if self.first_audio_at is None:
+            self.first_audio_at = at if at is not None else time.perf_counter()
+
+    def _emit(self, chunk: str) -> str:
+        if self.first_chunk_at is None:
+            self.first_chunk_at = time.perf_counter()
+        self.chunks += 1
+        return chunk
+
+    def __iter__(self) -> Iterator[str]:
+        try:
+            # The default chunk_size=512 waits for 512 bytes, holding back several events at a time
+            for delta in iter_chat_deltas(self.response.iter_lines(chunk_size=1)):
+                if self.cancelled:
+                    break
+                if self.first_token_at is None:
+                    self.first_token_at = time.perf_counter()
+                self.text += delta
+                for chunk in self.chunker.feed(delta):
+                    yield self._emit(chunk)
+            if not self.cancelled:
+                tail = self.chunker.flush()
+                if tail:
+                    yield self._emit(tail)
+        finally:
+            self.response.close()
+            if self.on_done is not None:
+                self.on_done(self)
+
+    def metrics(self) -> Dict[str, Any]:
+        def ms(at: Optional[float]) -> Optional[float]:
+            return None if at is None else round((at - self.started_at) * 1000, 1)
+        return {
+            "ttft_ms": ms(self.first_token_at),
+            "first_chunk_ms": ms(self.first_chunk_at),
+            "ttfa_ms": ms(self.first_audio_at),
+            "chunks": self.chunks,
+            "chars": len(self.text),
+            "cancelled": self.cancelled,
+        }
+
+
+def open_chat_stream(session, api_base: str, api_key: str, messages: List[Dict[str, str]],
+                     model: str = "gpt-3.5-turbo", timeout: float = 10.0, **params) -> StreamingReply:
+    """POST a streaming chat completion and return once the response headers arrive.
+
+    Connection and HTTP errors raise here, so callers can fall back before
+    anything has been spoken.
+    """
+    started_at = time.perf_counter()
+    body = {"model": model, "messages": messages, "stream": True}
+    body.update(params)
+    response = session.post(f"{api_base.rstrip('/')}/chat/completions", json=body, stream=True,
+                            timeout=timeout, headers={"Authorization": f"Bearer {api_key}"})
+    if response.status_code >= 400:
+        response.close()
+        raise RuntimeError(f"Chat completion failed with HTTP {response.status_code}")
+    return StreamingReply(response, started_at=started_at)
+
+
+class _StubChatHandler(BaseHTTPRequestHandler):
+    """OpenAI-compatible ``/chat/completions`` that streams a canned answer word by word"""
+
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        request = json.loads(self.rfile.read(length) or b"{}")
+        words = self.server.answer.split(" ")
+        time.sleep(self.server.first_token_delay)
+        if not request.get("stream"):
+            time.sleep(self.server.token_delay * len(words))
+            body = json.dumps({"choices": [{"message": {"role": "assistant", "content": self.server.answer}}]})
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body.encode())
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        try:
+            for i, word in enumerate(words):
+                delta = {"choices": [{"index": 0, "delta": {"content": word if i == 0 else " " + word}}]}
+                self.wfile.write(f"data: {json.dumps(delta)}\n\n".encode())
+                self.wfile.flush()
+                time.sleep(self.server.token_delay)
+            self.wfile.write(b"data: [DONE]\n\n")
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # client cancelled
+        self.close_connection = True
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_stub_server(answer: str, first_token_delay: float = 0.3, token_delay: float = 0.03) -> ThreadingHTTPServer:
+    """Serve the stub chat endpoint on a free localhost port; api_base is ``http://host:port/v1``"""
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _StubChatHandler)
+    server.daemon_threads = True
+    server.answer = answer
+    server.first_token_delay = first_token_delay
+    server.token_delay = token_delay
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def demo(answer: str, first_token_delay: float, token_delay: float, cancel_after: int = 0) -> Dict[str, Any]:
+    """Compare time to first audio for blocking and streamed answers through a headless SpeechOutput"""
+    import requests
+    from speech_output import NullEngine, SpeechOutput
+
+    server = start_stub_server(answer, first_token_delay, token_delay)
+    api_base = f"http://127.0.0.1:{server.server_address[1]}/v1"
+    session = requests.Session()
+    speech = SpeechOutput(engine_factory=NullEngine)
+    speech.start()
+    messages = [{"role": "user", "content": "tell me something"}]
+    report = {}
+    try:
+        started = time.perf_counter()
+        response = session.post(f"{api_base}/chat/completions", json={"messages": messages}, timeout=30)
+        text = response.json()["choices"][0]["message"]["content"]
+        utterance = speech.say(text, created_at=started)
+        speech.wait_until_idle(30)
+        report["blocking"] = {"ttfa_ms": round(utterance.latency * 1000, 1)}
+
+        reply = open_chat_stream(session, api_base, "stub-key", messages, timeout=30)
+        for chunk in reply:
+            utterance = speech.say(chunk)
+            if reply.first_utterance is None:
+                reply.first_utterance = utterance
+            if cancel_after and reply.chunks >= cancel_after:
+                reply.cancel()
+                speech.interrupt()
+        speech.wait_until_idle(30)
+        reply.mark_audio(reply.first_utterance.started_at if reply.first_utterance else None)
+        report["streaming"] = reply.metrics()
+    finally:
+        speech.stop()
+        session.close()
+        server.shutdown()
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure streamed answers against a local OpenAI-compatible stub")
+    parser.add_argument("--answer", default="Sure. The Eiffel Tower is in Paris, France, and it was finished "
+                                            "in 1889 for the World's Fair. It is about 330 metres tall, and "
+                                            "you can take the stairs or a lift to the top.")
+    parser.add_argument("--first-token-delay", type=float, default=0.3)
+    parser.add_argument("--token-delay", type=float, default=0.03)
+    parser.add_argument("--cancel-after", type=int, default=0, help="barge in after this many chunks")
+    args = parser.parse_args()
+
+    for name, row in demo(args.answer, args.first_token_delay, args.token_delay, args.cancel_after).items():
+        print(f"{name}: {row}")
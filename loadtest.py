@@ -0,0 +1,452 @@
+"""Offline replay and load test for the Beastboy command pipeline.
+
+Utterances from a manifest are replayed through the real pipeline: audio
+capture, VAD, wake-word detection, recognition, routing, dispatch, service
+handlers and speech output, all on the assistant's own methods. Only the
+edges are replaced. The microphone becomes a ``GeneratorSource`` and
+speakers become ``NullEngine``. Web services and the chat endpoint become
+stub HTTP servers with configurable latency. Handlers that act on the
+computer are recorded instead of run. Synthetic utterances are tones with
+one frequency per phrase, which ``ToneBackend`` maps back to the phrase;
+recorded WAV clips need a real engine (``--asr vosk``).
+
+Many virtual sessions can run at once. The report gives end-to-end latency
+percentiles, throughput and routing accuracy per intent, so the same run
+can be repeated before and after a performance change.
+"""
+
+import argparse
+import array
+import contextlib
+import io
+import json
+import logging
+import math
+import os
+import threading
+import time
+from collections import defaultdict
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+from urllib.parse import urlsplit
+
+from asr_backends import RecognizerBackend, create_backend, read_wav
+from audio_capture import DEFAULT_CHUNK, DEFAULT_SAMPLE_RATE, AudioCapture, GeneratorSource, pcm_samples
+from http_client import HttpClient, HttpClientConfig
+from llm_stream import start_stub_server
+from metrics import MetricsRegistry
+from phrases import PhraseBook
+from settings import Settings, validate
+from speech_output import NullEngine, SpeechOutput
+from voice_pipeline import VoicePipeline
+
+logger = logging.getLogger(__name__)
+
+WAKE_FREQUENCY = 250.0
+BASE_FREQUENCY = 400.0
+FREQUENCY_STEP = 25.0
+SAMPLE_WIDTH = 2
+
+
+@dataclass
+class ReplayCase:
+    text: str
+    intent: Optional[str]      # expected route; None means the AI (or nothing) should answer
+    wav: Optional[str] = None  # recorded clip instead of a synthetic tone
+    frequency: float = 0.0
+
+
+def load_manifest(path: str) -> List[ReplayCase]:
+    """Cases from a JSON list of {"text" or "utterance", "intent", optional "wav"}"""
+    with open(path, 'r', encoding='utf-8') as f:
+        entries = json.load(f)
+    base = Path(path).parent
+    cases = []
+    for index, entry in enumerate(entries):
+        wav = entry.get("wav")
+        cases.append(ReplayCase(entry.get("text", entry.get("utterance", "")).lower(), entry.get("intent"),
+                                str(base / wav) if wav else None, BASE_FREQUENCY + FREQUENCY_STEP * index))
+    return cases
+
+
+def tone(frequency: float, seconds: float, amplitude: int = 8000) -> bytes:
+    count = int(seconds * DEFAULT_SAMPLE_RATE)
+    step = 2 * math.pi * frequency / DEFAULT_SAMPLE_RATE
+    return array.array('h', (int(amplitude * math.sin(step * i)) for i in range(count))).tobytes()
+
+
+def silence(seconds: float) -> bytes:
+    return b'\0' * (int(seconds * DEFAULT_SAMPLE_RATE) * SAMPLE_WIDTH)
+
+
+def dominant_frequency(audio: bytes, sample_rate: int = DEFAULT_SAMPLE_RATE) -> Optional[float]:
+    """Frequency of a pure tone from its zero crossings, ignoring silence around it"""
+    samples = pcm_samples(audio)
+    crossings = [i for i in range(1, len(samples))
+                 if (samples[i - 1] < 0 <= samples[i]) or (samples[i - 1] >= 0 > samples[i])]
+    if len(crossings) < 4:
+        return None
+    return (len(crossings) - 1) / 2 / ((crossings[-1] - crossings[0]) / sample_rate)
+
+
+class ToneBackend(RecognizerBackend):
+    """Offline engine for synthetic replays: each registered phrase is a tone of its own frequency"""
+
+    name = "tone"
+    offline = True
+
+    def __init__(self, tolerance: float = FREQUENCY_STEP / 3):
+        self.phrases: Dict[float, str] = {}
+        self.tolerance = tolerance
+
+    def register(self, frequency: float, text: str):
+        self.phrases[frequency] = text
+
+    def transcribe(self, audio: bytes, sample_rate: int, sample_width: int = 2,
+                   language: str = 'en-US') -> str:
+        frequency = dominant_frequency(audio, sample_rate)
+        if frequency is None or not self.phrases:
+            return ""
+        nearest = min(self.phrases, key=lambda known: abs(known - frequency))
+        return self.phrases[nearest] if abs(nearest - frequency) <= self.tolerance else ""
+
+
+def session_audio(cases: List[ReplayCase], finished: threading.Event, gap: float = 2.0) -> Iterator[bytes]:
+    """Wake word, pause, command, pause for every case; then silence until the session stops.
+
+    The pause after the wake word covers the acknowledgement and the
+    capture buffer, so skipping to live audio never skips the command.
+    ``finished`` is set once the last case has been played.
+    """
+    yield silence(0.5)
+    for case in cases:
+        if case.wav:
+            command, _, _ = read_wav(case.wav)
+        else:
+            command = tone(case.frequency, 0.8)
+        for block in (tone(WAKE_FREQUENCY, 0.5), silence(gap), command, silence(1.0)):
+            for start in range(0, len(block), DEFAULT_CHUNK * SAMPLE_WIDTH):
+                yield block[start:start + DEFAULT_CHUNK * SAMPLE_WIDTH]
+    finished.set()
+    chunk = silence(DEFAULT_CHUNK / DEFAULT_SAMPLE_RATE)
+    while True:
+        yield chunk
+
+
+def paced(frames: Iterator[bytes], speed: float, stop: threading.Event) -> Iterator[bytes]:
+    """Deliver audio at ``speed`` times real time"""
+    bytes_per_second = DEFAULT_SAMPLE_RATE * SAMPLE_WIDTH
+    started = time.perf_counter()
+    delivered = 0.0
+    for frame in frames:
+        if stop.is_set():
+            return
+        delivered += len(frame) / bytes_per_second / speed
+        delay = started + delivered - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+        yield frame
+
+
+class _StubServiceHandler(BaseHTTPRequestHandler):
+    """Answers the weather and MediaWiki requests the assistant makes"""
+
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        time.sleep(self.server.latency)
+        path = urlsplit(self.path).path
+        if path.endswith("/weather"):
+            body = {"main": {"temp": 18.5, "humidity": 60}, "weather": [{"description": "light rain"}]}
+        elif path.endswith("/api.php"):
+            body = {"query": {"pages": [{"title": "Stub", "extract": "A stub article used for replay tests.",
+                                         "pageprops": {}}]}}
+        else:
+            self.send_error(404)
+            return
+        data = json.dumps(body).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_service_stub(latency: float) -> ThreadingHTTPServer:
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _StubServiceHandler)
+    server.daemon_threads = True
+    server.latency = latency
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+class StubRoutingHttpClient(HttpClient):
+    """HttpClient that sends every request to the stub server, keeping the path and query"""
+
+    def __init__(self, config: HttpClientConfig, stub_base: str):
+        super().__init__(config)
+        self.stub_base = stub_base.rstrip("/")
+
+    def _redirect(self, url: str) -> str:
+        parts = urlsplit(url)
+        return f"{self.stub_base}{parts.path}" + (f"?{parts.query}" if parts.query else "")
+
+    async def get_json(self, url: str, params=None):
+        return await super().get_json(self._redirect(url), params)
+
+    def get_json_sync(self, url: str, params=None):
+        return super().get_json_sync(self._redirect(url), params)
+
+
+class PassthroughTranslator:
+    """Stands in for googletrans: everything is English"""
+
+    class _Result:
+        def __init__(self, text: str):
+            self.text = text
+            self.lang = 'en'
+
+    def detect(self, text: str):
+        return self._Result(text)
+
+    def translate(self, text: str, dest: str = 'en'):
+        return self._Result(text)
+
+
+class ReplaySession:
+    """One virtual assistant replaying a list of cases through its own pipeline"""
+
+    def __init__(self, index: int, cases: List[ReplayCase], backend: RecognizerBackend,
+                 metrics: MetricsRegistry, service_base: str, chat_base: Optional[str], speed: float):
+        from beastboy import EnhancedBeastboy
+        from intent_router import DEFAULT_INTENTS
+
+        self.cases = cases
+        self.routed: Dict[str, Optional[str]] = {}
+        self.recorded_actions: List[str] = []
+        self.processed = 0
+        self.done = threading.Event()
+        self.played = threading.Event()
+        self._stop_audio = threading.Event()
+
+        overrides = {
+            "api_keys": {"openai_api_key": "stub-key" if chat_base else ""},
+            "ai": {"api_base": chat_base or "http://127.0.0.1:9/v1", "stream": True},
+            "features": {"advanced_ai_enabled": bool(chat_base)},
+            "system": {"wake_word_detector": "transcript"},
+            "cache": {"path": None},
+            "reminders": {"journal": None},
+        }
+        data, errors, _ = validate(overrides)
+        if errors:
+            raise ValueError(f"Invalid replay config: {errors}")
+
+        # A bare assistant: the same methods, with every device and network edge replaced
+        bot = EnhancedBeastboy.__new__(EnhancedBeastboy)
+        bot.logger = logging.getLogger(f"replay.session{index}")
+        bot.settings = Settings.from_dict(data)
+        bot.config = data
+        bot.config_lock = threading.Lock()
+        bot.metrics = metrics
+        bot.speech_output = SpeechOutput(engine_factory=NullEngine)
+        bot.speech_output.start()
+        bot.speech_output.on_started.append(bot.record_speech_latency)
+        bot._translator = PassthroughTranslator()
+        bot.asr_backend = backend
+        frames = paced(session_audio(cases, self.played), speed, self._stop_audio)
+        bot.capture = AudioCapture(GeneratorSource(frames), buffer_seconds=1.0)
+        bot.listen_reader = bot.capture.reader()
+        bot.capture.pace_with(bot.listen_reader)
+        bot.http = StubRoutingHttpClient(HttpClientConfig.from_dict(data["http"]), service_base)
+        bot.setup_response_cache()
+        bot.setup_dispatcher()
+        bot.setup_reminders()
+        bot.system_monitor = None
+        bot.setup_services()
+        bot.setup_language_id()
+        bot.phrase_book = PhraseBook()
+        bot.setup_intent_handlers()
+        bot.setup_rescorer()
+        bot.wake_words = list(bot.settings.system.wake_words)
+        bot.setup_voice_activity_detection()
+        bot.setup_wake_word_detector()
+        bot.current_language = 'en'
+        bot.session_active = False
+        bot.listening = False
+        bot.running = True
+        bot.paused = False
+        bot.fixed_phrases = set()
+        bot.start_time = time.time()
+        bot.pipeline = VoicePipeline(bot, metrics=metrics)
+        self.bot = bot
+
+        # Record what would have acted on the computer instead of doing it
+        side_effects = {intent.name for intent in DEFAULT_INTENTS if intent.side_effects}
+        for name in side_effects & set(bot.intent_handlers):
+            bot.intent_handlers[name] = self._recorder(name)
+
+        router = bot.intent_router
+        route = router.route
+
+        def recording_route(command: str):
+            result = route(command)
+            self.routed[command] = result.name if result else None
+            return result
+        router.route = recording_route
+
+        process_command = bot.process_command
+
+        def counting_process_command(command: str):
+            try:
+                return process_command(command)
+            finally:
+                self.processed += 1
+                if self.processed >= len(self.cases):
+                    self.done.set()
+        bot.process_command = counting_process_command
+
+    def _recorder(self, name: str):
+        def handler(command, slots):
+            self.recorded_actions.append(name)
+            return f"Done: {name}"
+        return handler
+
+    def start(self):
+        self.bot.capture.start()
+        self.bot.pipeline.start()
+
+    def wait(self, timeout: float, grace: float = 5.0) -> bool:
+        """Wait until every case was handled, or ``grace`` seconds after the audio ran out"""
+        deadline = time.monotonic() + timeout
+        if not self.played.wait(timeout):
+            return False
+        return self.done.wait(max(0.0, min(grace, deadline - time.monotonic())))
+
+    def drain(self, timeout: float = 10.0):
+        """Wait for the last routed answer to reach the speech queue and be spoken"""
+        pipeline = self.bot.pipeline
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline and not (pipeline.route_queue.empty() and pipeline.speak_queue.empty()):
+            time.sleep(0.05)
+        time.sleep(0.1)  # the speak stage may still be handing over its last turn
+        self.bot.speech_output.wait_until_idle(timeout=max(0.0, deadline - time.monotonic()))
+
+    def stop(self):
+        bot = self.bot
+        bot.running = False
+        self._stop_audio.set()
+        for step in (bot.http.close, bot.pipeline.stop, bot.capture.stop, bot.speech_output.stop,
+                     bot.reminders.stop, bot.dispatcher.close, bot.response_cache.close):
+            try:
+                step()
+            except Exception as e:
+                logger.warning(f"Replay cleanup: {e}")
+
+
+def run(cases: List[ReplayCase], sessions: int = 4, speed: float = 10.0, service_latency: float = 0.05,
+        ai: bool = True, asr: str = "tone", timeout: float = 600.0) -> dict:
+    """Replay ``cases`` in ``sessions`` concurrent virtual sessions and summarise the results"""
+    if asr == "tone":
+        backend = ToneBackend()
+        backend.register(WAKE_FREQUENCY, "hey bb")
+        for case in cases:
+            if not case.wav:
+                backend.register(case.frequency, case.text)
+    else:
+        backend = create_backend(asr)
+
+    service_stub = start_service_stub(service_latency)
+    chat_stub = start_stub_server("Here is a short stubbed answer. It has two sentences.",
+                                  first_token_delay=0.3, token_delay=0.01) if ai else None
+    service_base = f"http://127.0.0.1:{service_stub.server_address[1]}"
+    chat_base = f"http://127.0.0.1:{chat_stub.server_address[1]}/v1" if chat_stub else None
+    metrics = MetricsRegistry()
+    replay = []
+    started = time.perf_counter()
+    try:
+        # The assistant prints every answer; keep the report readable
+        with contextlib.redirect_stdout(io.StringIO()):
+            replay = [ReplaySession(i, cases, backend, metrics, service_base, chat_base, speed)
+                      for i in range(sessions)]
+            for session in replay:
+                session.start()
+            deadline = time.monotonic() + timeout
+            for session in replay:
+                session.wait(max(0.0, deadline - time.monotonic()))
+            for session in replay:
+                session.drain()
+            wall = time.perf_counter() - started
+            for session in replay:
+                session.stop()
+    finally:
+        service_stub.shutdown()
+        if chat_stub:
+            chat_stub.shutdown()
+
+    by_intent = defaultdict(lambda: {"cases": 0, "correct": 0})
+    misheard = 0
+    processed = 0
+    for session in replay:
+        processed += session.processed
+        for case in session.cases:
+            expected = case.intent or "none"
+            row = by_intent[expected]
+            row["cases"] += 1
+            if case.text not in session.routed:
+                misheard += 1
+            elif (session.routed[case.text] or "none") == expected:
+                row["correct"] += 1
+    for row in by_intent.values():
+        row["accuracy"] = round(row["correct"] / row["cases"], 3)
+    total = sum(row["cases"] for row in by_intent.values())
+    correct = sum(row["correct"] for row in by_intent.values())
+    snapshot = metrics.snapshot()
+    return {
+        "sessions": sessions,
+        "commands": processed,
+        "expected": total,
+        "wall_seconds": round(wall, 2),
+        "throughput_per_second": round(processed / wall, 2) if wall else None,
+        "turn_latency": snapshot["histograms"].get("stage_seconds{stage=turn}"),
+        "stages": {key[len("stage_seconds{stage="):-1]: value for key, value in snapshot["histograms"].items()
+                   if key.startswith("stage_seconds{")},
+        "routing_accuracy": round(correct / total, 3) if total else None,
+        "not_routed": misheard,
+        "by_intent": dict(sorted(by_intent.items())),
+    }
+
+
+if __name__ == "__main__":
+    os.environ.setdefault("PYSTRAY_BACKEND", "dummy")  # no tray is shown during a replay
+    golden_default = str(Path(__file__).with_name("data") / "intent_golden.json")
+    parser = argparse.ArgumentParser(description="Replay utterances through the Beastboy pipeline under load")
+    parser.add_argument("--manifest", default=golden_default,
+                        help="JSON list of {text|utterance, intent, wav?} (default: the routing golden file)")
+    parser.add_argument("--sessions", type=int, default=4)
+    parser.add_argument("--speed", type=float, default=10.0, help="audio replay speed, times real time")
+    parser.add_argument("--service-latency", type=float, default=0.05, help="stub web service delay in seconds")
+    parser.add_argument("--no-ai", action="store_true", help="disable the stub chat endpoint")
+    parser.add_argument("--asr", default="tone", help="'tone' for synthetic cases, or a real engine name")
+    parser.add_argument("--timeout", type=float, default=600.0)
+    parser.add_argument("--json", help="also write the report to this file")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    report = run(load_manifest(args.manifest), args.sessions, args.speed, args.service_latency,
+                 not args.no_ai, args.asr, args.timeout)
+    for key in ("sessions", "commands", "expected", "wall_seconds", "throughput_per_second",
+                "routing_accuracy", "not_routed", "turn_latency"):
+        print(f"{key}: {report[key]}")
+    for stage, snapshot in report["stages"].items():
+        print(f"  {stage:>16}: n={snapshot['count']} p50={snapshot['p50_ms']}ms "
+              f"p95={snapshot['p95_ms']}ms p99={snapshot['p99_ms']}ms")
+    for intent, row in report["by_intent"].items():
+        print(f"  {intent:>16}: {row['correct']}/{row['cases']}")
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
@@ -0,0 +1,359 @@
+"""Asynchronous, rotating, structured logging for Beastboy.
+
+Loggers only put records on a queue, so the audio and pipeline threads
+never wait on the disk. A ``QueueListener`` thread does the formatting and
+writing. The log file rotates by size and by age, and rotated files are
+gzipped. Every file record is one JSON object. Records carry the
+correlation ID of the utterance being handled, so grepping one ID gives the
+whole story of a command across threads. ``RateLimitFilter`` caps repeated
+records from one call site, so an error loop that spins cannot fill the
+disk. ``python log_pipeline.py`` measures the cost of a log call on the
+calling thread, with and without the queue, on a disk that stalls.
+"""
+
+import argparse
+import contextvars
+import gzip
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import shutil
+import tempfile
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from dataclasses import dataclass, fields
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+CONSOLE_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - [%(correlation_id)s] %(message)s'
+NO_CORRELATION = "-"
+
+correlation_id: contextvars.ContextVar[str] = contextvars.ContextVar("correlation_id", default=NO_CORRELATION)
+
+
+def new_correlation_id() -> str:
+    return uuid.uuid4().hex[:12]
+
+
+@contextmanager
+def correlation(value: Optional[str] = None) -> Iterator[str]:
+    """Tag every record logged in this block, including on threads that copy the context"""
+    value = value or new_correlation_id()
+    token = correlation_id.set(value)
+    try:
+        yield value
+    finally:
+        correlation_id.reset(token)
+
+
+@dataclass
+class LogConfig:
+    path: str = "beastboy.log"
+    level: str = "INFO"
+    json: bool = True
+    console: bool = True
+    max_mb: float = 10
+    rotate_hours: float = 24
+    backups: int = 7
+    compress: bool = True
+    queue_size: int = 10000
+    rate_limit_burst: int = 5
+    rate_limit_seconds: float = 60
+
+    @classmethod
+    def from_dict(cls, values: Dict[str, Any]) -> "LogConfig":
+        known = {f.name for f in fields(cls)}
+        return cls(**{k: v for k, v in values.items() if k in known})
+
+
+class CorrelationFilter(logging.Filter):
+    """Stamps records with the current correlation ID; runs on the thread that logs, before the queue"""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.correlation_id = correlation_id.get()
+        return True
+
+
+class RateLimitFilter(logging.Filter):
+    """Lets at most ``burst`` warnings or errors from one call site through per ``window`` seconds.
+
+    Call sites are keyed by logger, file and line rather than message text,
+    because messages are f-strings that differ with every exception. The
+    first record after a quiet window reports how many were suppressed.
+    """
+
+    def __init__(self, burst: int = 5, window: float = 60.0, level: int = logging.WARNING,
+                 clock=time.monotonic):
+        super().__init__()
+        self.burst = burst
+        self.window = window
+        self.level = level
+        self.clock = clock
+        self.suppressed = 0
+        self._sites: Dict[Tuple[str, str, int], list] = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno < self.level or self.burst <= 0:
+            return True
+        key = (record.name, record.pathname, record.lineno)
+        now = self.clock()
+        with self._lock:
+            site = self._sites.get(key)
+            if site is None or now - site[0] >= self.window:
+                dropped = site[2] if site else 0
+                self._sites[key] = [now, 1, 0]
+                if dropped:
+                    record.msg = f"{record.msg} (suppressed {dropped} similar messages)"
+                return True
+            if site[1] < self.burst:
+                site[1] += 1
+                return True
+            site[2] += 1
+            self.suppressed += 1
+            return False
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": self.formatTime(record, "%Y-%m-%dT%H:%M:%S") + f".{int(record.msecs):03d}",
+            "level": record.levelname,
+            "logger": record.name,
+            "thread": record.threadName,
+            "correlation_id": getattr(record, "correlation_id", NO_CORRELATION),
+            "message": record.getMessage(),
+        }
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exception"] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False)
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that drops records instead of blocking when the queue is full"""
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Resolve the message on this thread but keep the traceback separate for the JSON file
+        record = logging.makeLogRecord(record.__dict__)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class CompressingRotatingFileHandler(logging.handlers.RotatingFileHandler):
+    """Rotates when the file exceeds ``max_bytes`` and every ``interval`` seconds, gzipping old files"""
+
+    def __init__(self, filename: str, max_bytes: int, interval: float, backups: int, compress: bool = True):
+        super().__init__(filename, maxBytes=max_bytes, backupCount=backups, encoding="utf-8", delay=True)
+        self.interval = interval
+        self.rollover_at = time.time() + interval if interval > 0 else None
+        if compress:
+            self.namer = lambda name: name + ".gz"
+            self.rotator = self._compress
+
+    @staticmethod
+    def _compress(source: str, destination: str):
+        with open(source, 'rb') as src, gzip.open(destination, 'wb') as dst:
+            shutil.copyfileobj(src, dst)
+        os.remove(source)
+
+    def shouldRollover(self, record: logging.LogRecord) -> int:
+        if self.rollover_at is not None and time.time() >= self.rollover_at:
+            return 1
+        return super().shouldRollover(record)
+
+    def doRollover(self):
+        if os.path.exists(self.baseFilename) and os.path.getsize(self.baseFilename):
+            super().doRollover()
+        if self.rollover_at is not None:
+            self.rollover_at = time.time() + self.interval
+
+
+class LogPipeline:
+    """The queue handler installed on the root logger and the listener thread behind it"""
+
+    def __init__(self, config: LogConfig, handlers: Optional[List[logging.Handler]] = None):
+        self.config = config
+        self.queue: queue.Queue = queue.Queue(config.queue_size)
+        self.rate_limit = RateLimitFilter(config.rate_limit_burst, config.rate_limit_seconds)
+        self.handler = DroppingQueueHandler(self.queue)
+        self.handler.addFilter(CorrelationFilter())
+        self.handler.addFilter(self.rate_limit)
+
+        if handlers is None:
+            handlers = self._default_handlers(config)
+        self.handlers = handlers
+        self.listener = logging.handlers.QueueListener(self.queue, *handlers, respect_handler_level=True)
+
+    @staticmethod
+    def _default_handlers(config: LogConfig) -> List[logging.Handler]:
+        handlers = []
+        if config.path:
+            file_handler = CompressingRotatingFileHandler(config.path, int(config.max_mb * 1024 * 1024),
+                                                          config.rotate_hours * 3600, config.backups,
+                                                          config.compress)
+            file_handler.setFormatter(JsonFormatter() if config.json else logging.Formatter(CONSOLE_FORMAT))
+            handlers.append(file_handler)
+        if config.console:
+            console = logging.StreamHandler()
+            console.setFormatter(logging.Formatter(CONSOLE_FORMAT))
+            handlers.append(console)
+        return handlers
+
+    def start(self):
+        root = logging.getLogger()
+        for handler in list(root.handlers):
+            root.removeHandler(handler)
+        root.addHandler(self.handler)
+        root.setLevel(self.config.level)
+        self.listener.start()
+
+    def stop(self):
+        """Flush everything queued so far and close the files"""
+        logging.getLogger().removeHandler(self.handler)
+        self.listener.stop()
+        for handler in self.handlers:
+            handler.close()
+
+    def stats(self) -> dict:
+        return {"queued": self.queue.qsize(), "dropped": self.handler.dropped,
+                "rate_limited": self.rate_limit.suppressed}
+
+
+_active: Optional[LogPipeline] = None
+_active_lock = threading.Lock()
+
+
+def setup_logging(values: Optional[Dict[str, Any]] = None) -> LogPipeline:
+    """Install the pipeline on the root logger, replacing one installed earlier"""
+    global _active
+    pipeline = LogPipeline(LogConfig.from_dict(values or {}))
+    with _active_lock:
+        previous, _active = _active, pipeline
+        if previous is not None:
+            previous.stop()
+        pipeline.start()
+    return pipeline
+
+
+def shutdown_logging():
+    global _active
+    with _active_lock:
+        if _active is not None:
+            _active.stop()
+            _active = None
+
+
+class _SlowFileHandler(logging.FileHandler):
+    """File handler with a fixed stall per write, standing in for a busy or sleeping disk"""
+
+    def __init__(self, filename: str, stall: float):
+        super().__init__(filename, encoding="utf-8")
+        self.stall = stall
+
+    def emit(self, record: logging.LogRecord):
+        time.sleep(self.stall)
+        super().emit(record)
+
+
+def _time_calls(target: logging.Logger, records: int) -> dict:
+    durations = []
+    for i in range(records):
+        started = time.perf_counter()
+        target.info(f"Voice input: command number {i}")
+        durations.append(time.perf_counter() - started)
+    durations.sort()
+    return {"mean_us": round(sum(durations) / records * 1e6, 1),
+            "p99_us": round(durations[int(records * 0.99)] * 1e6, 1),
+            "max_us": round(durations[-1] * 1e6, 1)}
+
+
+def benchmark(records: int = 2000, stall_ms: float = 2.0) -> dict:
+    """Caller-side cost of one log call, writing directly versus through the queue, on a disk that stalls"""
+    directory = tempfile.mkdtemp(prefix="beastboy-logs-")
+    bench = logging.getLogger("log_pipeline.bench")
+    root = logging.getLogger()
+    saved_handlers, saved_level = list(root.handlers), root.level
+    for handler in saved_handlers:
+        root.removeHandler(handler)
+    root.setLevel(logging.INFO)
+    try:
+        direct = _SlowFileHandler(os.path.join(directory, "direct.log"), stall_ms / 1000)
+        root.addHandler(direct)
+        direct_timing = _time_calls(bench, records)
+        root.removeHandler(direct)
+        direct.close()
+
+        pipeline = LogPipeline(LogConfig(queue_size=records * 2),
+                               [_SlowFileHandler(os.path.join(directory, "queued.log"), stall_ms / 1000)])
+        pipeline.start()
+        with correlation():
+            queued_timing = _time_calls(bench, records)
+        flush_started = time.perf_counter()
+        pipeline.stop()
+        flush_seconds = time.perf_counter() - flush_started
+
+        limited = LogPipeline(LogConfig(path=os.path.join(directory, "limited.log"), console=False,
+                                        rate_limit_burst=5, rate_limit_seconds=60))
+        limited.start()
+        for _ in range(1000):
+            bench.error("Error in listen stage: device unavailable")
+        suppressed = limited.stats()["rate_limited"]
+        limited.stop()
+        return {"records": records, "disk_stall_ms": stall_ms, "direct": direct_timing, "queued": queued_timing,
+                "queued_flush_seconds": round(flush_seconds, 2),
+                "error_burst": 1000, "error_burst_suppressed": suppressed}
+    finally:
+        for handler in saved_handlers:
+            root.addHandler(handler)
+        root.setLevel(saved_level)
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+def rotation_demo(records: int = 5000) -> dict:
+    """Write past a tiny size limit and list the compressed backups"""
+    directory = tempfile.mkdtemp(prefix="beastboy-logs-")
+    try:
+        pipeline = setup_logging({"path": os.path.join(directory, "beastboy.log"), "console": False,
+                                  "max_mb": 0.05, "backups": 3})
+        demo_logger = logging.getLogger("log_pipeline.demo")
+        for i in range(records):
+            with correlation():
+                demo_logger.info(f"Voice input: command number {i}")
+        shutdown_logging()
+        files = sorted(os.listdir(directory))
+        with open(os.path.join(directory, "beastboy.log"), encoding="utf-8") as f:
+            last = json.loads(f.readlines()[-1])
+        return {"files": files, "dropped": pipeline.handler.dropped, "last_record": last}
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure Beastboy's logging pipeline")
+    parser.add_argument("--records", type=int, default=2000)
+    parser.add_argument("--stall-ms", type=float, default=2.0, help="simulated time per disk write")
+    args = parser.parse_args()
+
+    print(benchmark(args.records, args.stall_ms))
+    print(rotation_demo())
@@ -0,0 +1,473 @@
+"""Spoken math for Beastboy without ``eval``.
+
+A spoken question ("what is five times twelve", "square root of 16",
+"20 percent of 80", "convert 5 miles to kilometers") is normalized into
+a small arithmetic expression, parsed with ``ast`` and evaluated by walking
+a whitelist of node types. Exponents, result size and expression size are
+capped so something like ``9 ** 9 ** 9`` is refused instead of freezing the
+assistant. Parsed expressions are cached, so repeated questions skip the
+normalizing and parsing. Trigonometric functions work in degrees.
+"""
+
+import argparse
+import ast
+import json
+import math
+import operator
+import random
+import re
+import time
+from fractions import Fraction
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple, Union
+
+Number = Union[int, float]
+
+MAX_EXPONENT = 1000
+MAX_DIGITS = 300          # integer results longer than this are refused
+MAX_NODES = 200           # AST size limit per expression
+MAX_FACTORIAL = 300
+
+SMALL_NUMBERS = {
+    "zero": 0, "oh": 0, "one": 1, "two": 2, "three": 3, "four": 4, "five": 5, "six": 6, "seven": 7,
+    "eight": 8, "nine": 9, "ten": 10, "eleven": 11, "twelve": 12, "thirteen": 13, "fourteen": 14,
+    "fifteen": 15, "sixteen": 16, "seventeen": 17, "eighteen": 18, "nineteen": 19,
+}
+TENS = {"twenty": 20, "thirty": 30, "forty": 40, "fifty": 50, "sixty": 60, "seventy": 70,
+        "eighty": 80, "ninety": 90}
+SCALES = {"hundred": 100, "thousand": 1000, "million": 10 ** 6, "billion": 10 ** 9, "trillion": 10 ** 12}
+# Denominators after a spoken number: "one third", "two fifths"; "second" is left to units of time
+FRACTIONS = {"half": 2, "halves": 2, "third": 3, "thirds": 3, "quarter": 4, "quarters": 4, "fourth": 4,
+             "fourths": 4, "fifth": 5, "fifths": 5, "sixth": 6, "sixths": 6, "eighth": 8, "eighths": 8,
+             "tenth": 10, "tenths": 10}
+
+# Spoken phrases rewritten before parsing, longest first
+PHRASES = [
+    (r"\b(?:raised )?to the power of\b|\braised to\b", " ** "),
+    (r"\bsquared\b", " ** 2 "),
+    (r"\bcubed\b", " ** 3 "),
+    (r"\bmultiplied by\b|\btimes\b|(?<=\d)\s*x\s*(?=[\d(-])|×", " * "),
+    (r"\bdivided by\b|\bover\b|÷", " / "),
+    (r"\bplus\b|\badded to\b", " + "),
+    (r"\bminus\b|\btake away\b", " - "),
+    (r"\bnegative\s*", " -"),
+    (r"\bmod(?:ulo)?\b", " % "),
+    (r"\bcube root(?: of)?\b", " cbrt "),
+    (r"\bsquare root(?: of)?\b|\broot of\b", " sqrt "),
+    (r"\bnatural log(?:arithm)?(?: of)?\b", " ln "),
+    (r"\blog(?:arithm)?(?: base 10)?(?: of)?\b", " log "),
+    (r"\bsine(?: of)?\b|\bsin of\b", " sin "),
+    (r"\bcosine(?: of)?\b|\bcos of\b", " cos "),
+    (r"\btangent(?: of)?\b|\btan of\b", " tan "),
+    (r"\babsolute value(?: of)?\b", " abs "),
+    (r"\bfactorial of\b", " factorial "),
+    (r"\bround(?:ed)?(?: of)?\b", " round "),
+    (r"\bhalf of\b", " 0.5 * "),
+    (r"\ba quarter of\b|\bquarter of\b", " 0.25 * "),
+    (r"\bopen (?:paren|bracket)\b", " ( "),
+    (r"\bclose (?:paren|bracket)\b", " ) "),
+]
+PHRASES = [(re.compile(pattern), replacement) for pattern, replacement in PHRASES]
+FILLER_RE = re.compile(r"\b(?:what(?:'s| is)|how much is|calculate|compute|solve|math|equals?|is|(?<!to )the"
+                       r"|please)\b|[?=]")
+# "%" is a percentage only before "of" or at the end; "5 % 3" is modulo
+PERCENT_RE = re.compile(r"(\d+(?:\.\d+)?)\s*(?:percent\b|%(?=\s*(?:of\b|$)))(\s*of\b)?")
+POSTFIX_FACTORIAL_RE = re.compile(r"(\d+)\s*(?:factorial\b|!)")
+
+# A written number, scientific notation included: "2.5e3" is one number, not 2.5 times e times 3
+_NUMBER = r"\d+(?:\.\d+)?(?:e[+-]?\d+)?"
+# A minus straight after a function name is the argument's sign: "sqrt - 16" is sqrt(-16)
+_OPERAND = (rf"(?:-\s*)?(?:{_NUMBER}|\b(?:pi|e)\b|\((?:[^()]|\([^()]*\))*\)"
+            r"|[a-z]+\((?:[^()]|\([^()]*\))*\))")
+FUNCTION_CALL_RE = re.compile(rf"\b(sqrt|cbrt|ln|log|sin|cos|tan|abs|factorial|round)\s+({_OPERAND})")
+
+
+class MathError(ValueError):
+    """The question is not valid math or is too expensive to evaluate"""
+
+
+def _factorial(n: Number) -> int:
+    if n != int(n) or n < 0:
+        raise MathError("Factorial needs a whole number")
+    if n > MAX_FACTORIAL:
+        raise MathError("That factorial is too large")
+    return math.factorial(int(n))
+
+
+def _domain(func, check, message):
+    def wrapped(x):
+        if not check(x):
+            raise MathError(message)
+        return func(x)
+    return wrapped
+
+
+FUNCTIONS = {
+    "sqrt": _domain(math.sqrt, lambda x: x >= 0, "Cannot take the square root of a negative number"),
+    "cbrt": lambda x: math.copysign(abs(x) ** (1 / 3), x),
+    "ln": _domain(math.log, lambda x: x > 0, "Logarithm needs a positive number"),
+    "log": _domain(math.log10, lambda x: x > 0, "Logarithm needs a positive number"),
+    "sin": lambda x: math.sin(math.radians(x)),
+    "cos": lambda x: math.cos(math.radians(x)),
+    "tan": lambda x: math.tan(math.radians(x)),
+    "abs": abs,
+    "factorial": _factorial,
+    "round": round,
+}
+CONSTANTS = {"pi": math.pi, "e": math.e}
+
+BINARY_OPERATORS = {
+    ast.Add: operator.add, ast.Sub: operator.sub, ast.Mult: operator.mul,
+    ast.Div: operator.truediv, ast.Mod: operator.mod, ast.Pow: operator.pow,
+}
+UNARY_OPERATORS = {ast.UAdd: operator.pos, ast.USub: operator.neg}
+
+# Unit: (dimension, factor to the base unit); temperature is handled separately
+UNITS: Dict[str, Tuple[str, float]] = {}
+_UNIT_NAMES = {
+    ("length", 1.0): ["meter", "meters", "metre", "metres", "m"],
+    ("length", 1000.0): ["kilometer", "kilometers", "kilometre", "kilometres", "km"],
+    ("length", 0.01): ["centimeter", "centimeters", "centimetre", "centimetres", "cm"],
+    ("length", 0.001): ["millimeter", "millimeters", "millimetre", "millimetres", "mm"],
+    ("length", 1609.344): ["mile", "miles", "mi"],
+    ("length", 0.9144): ["yard", "yards", "yd"],
+    ("length", 0.3048): ["foot", "feet", "ft"],
+    ("length", 0.0254): ["inch", "inches", "in"],
+    ("mass", 1.0): ["kilogram", "kilograms", "kg", "kilo", "kilos"],
+    ("mass", 0.001): ["gram", "grams", "g"],
+    ("mass", 0.45359237): ["pound", "pounds", "lb", "lbs"],
+    ("mass", 0.028349523125): ["ounce", "ounces", "oz"],
+    ("volume", 1.0): ["liter", "liters", "litre", "litres", "l"],
+    ("volume", 0.001): ["milliliter", "milliliters", "millilitre", "millilitres", "ml"],
+    ("volume", 3.785411784): ["gallon", "gallons", "gal"],
+    ("volume", 0.2365882365): ["cup", "cups"],
+    ("time", 1.0): ["second", "seconds", "sec", "secs"],
+    ("time", 60.0): ["minute", "minutes", "min", "mins"],
+    ("time", 3600.0): ["hour", "hours", "hr", "hrs"],
+    ("time", 86400.0): ["day", "days"],
+    ("time", 604800.0): ["week", "weeks"],
+    ("speed", 1.0): ["meters per second", "metres per second", "m/s"],
+    ("speed", 1000 / 3600): ["kilometers per hour", "kilometres per hour", "km/h", "kph"],
+    ("speed", 1609.344 / 3600): ["miles per hour", "mph"],
+    ("data", 1.0): ["byte", "bytes"],
+    ("data", 1024.0): ["kilobyte", "kilobytes", "kb"],
+    ("data", 1024.0 ** 2): ["megabyte", "megabytes", "mb"],
+    ("data", 1024.0 ** 3): ["gigabyte", "gigabytes", "gb"],
+    ("temperature", 0.0): ["celsius", "centigrade", "degrees celsius", "c",
+                           "fahrenheit", "degrees fahrenheit", "f", "kelvin", "k"],
+}
+for (dimension, factor), names in _UNIT_NAMES.items():
+    for name in names:
+        UNITS[name] = (dimension, factor)
+_UNIT_ALTERNATION = "|".join(re.escape(n) for n in sorted(UNITS, key=len, reverse=True))
+CONVERSION_RE = re.compile(rf"^(?:convert\s+)?(?P<amount>.+?)\s*(?:degrees\s+)?(?P<source>{_UNIT_ALTERNATION})"
+                           rf"\s+(?:to|in|into|as)\s+(?:degrees\s+)?(?P<target>{_UNIT_ALTERNATION})$")
+
+
+def _temperature_scale(name: str) -> str:
+    return {"c": "celsius", "centigrade": "celsius", "degrees celsius": "celsius",
+            "f": "fahrenheit", "degrees fahrenheit": "fahrenheit", "k": "kelvin"}.get(name, name)
+
+
+def _convert_temperature(value: float, source: str, target: str) -> float:
+    source, target = _temperature_scale(source), _temperature_scale(target)
+    kelvin = {"celsius": value + 273.15, "fahrenheit": (value - 32) * 5 / 9 + 273.15, "kelvin": value}[source]
+    return {"celsius": kelvin - 273.15, "fahrenheit": (kelvin - 273.15) * 9 / 5 + 32, "kelvin": kelvin}[target]
+
+
+def words_to_numbers(text: str) -> str:
+    """Replace spoken numbers ("two hundred and five point five") with digits; MathError if one is too large"""
+    text = re.sub(r"(?<=\d),(?=\d{3}\b)", "", text.lower())  # 1,000
+    # Split off minus signs, except an exponent's sign as in "2e-3"
+    tokens = re.findall(rf"{_NUMBER}|[a-z]+(?:'[a-z]+)?|\*\*|\S", re.sub(r"(?<!\de)-", " - ", text))
+    output: List[str] = []
+    i = 0
+    while i < len(tokens):
+        token = tokens[i]
+        is_number_word = token in SMALL_NUMBERS or token in TENS or (
+            token in SCALES and (output and re.fullmatch(_NUMBER, output[-1]) is None))
+        if token == "a" and i + 1 < len(tokens) and (tokens[i + 1] in SCALES or tokens[i + 1] in FRACTIONS):
+            is_number_word, token = True, "one"
+        if token == "oh" and not (output and output[-1] == "point"):
+            is_number_word = False
+        if not is_number_word and not (re.fullmatch(_NUMBER, token) and i + 1 < len(tokens)
+                                       and tokens[i + 1] in SCALES):
+            output.append(tokens[i])
+            i += 1
+            continue
+
+        total, current = 0.0, 0.0
+        while i < len(tokens):
+            token = tokens[i]
+            if token == "a" and i + 1 < len(tokens) and (tokens[i + 1] in SCALES or tokens[i + 1] in FRACTIONS):
+                token = "one"
+            if re.fullmatch(_NUMBER, token) and current == 0:
+                current = float(token)
+            elif token in SMALL_NUMBERS:
+                current += SMALL_NUMBERS[token]
+            elif token in TENS:
+                current += TENS[token]
+            elif token == "hundred":
+                current = (current or 1) * 100
+            elif token in SCALES:
+                total += (current or 1) * SCALES[token]
+                current = 0
+            elif token == "and" and i + 1 < len(tokens) and (tokens[i + 1] in SMALL_NUMBERS or tokens[i + 1] in TENS) \
+                    and current and current % 100 == 0:
+                pass  # "one hundred and five"
+            else:
+                break
+            i += 1
+        value = total + current
+        if i + 1 < len(tokens) and tokens[i] == "point" and tokens[i + 1] in SMALL_NUMBERS:
+            digits = []
+            i += 1
+            while i < len(tokens) and tokens[i] in SMALL_NUMBERS and SMALL_NUMBERS[tokens[i]] < 10:
+                digits.append(str(SMALL_NUMBERS[tokens[i]]))
+                i += 1
+            value += float("0." + "".join(digits))
+        if not math.isfinite(value) or value >= 10 ** MAX_DIGITS:
+            raise MathError("That number is too large")  # "one hundred hundred hundred ..."
+        number = str(int(value)) if value == int(value) else repr(value)
+        if i < len(tokens) and tokens[i] in FRACTIONS:
+            # Parenthesized, so "to the power of one third" stays a single exponent
+            number = f"({number} / {FRACTIONS[tokens[i]]})"
+            i += 1
+            if i < len(tokens) and tokens[i] == "of":
+                number += " *"
+                i += 1
+        output.append(number)
+    return " ".join(output)
+
+
+def normalize(text: str) -> str:
+    """Turn a spoken math question into a Python arithmetic expression string"""
+    expression = words_to_numbers(text)
+    expression = FILLER_RE.sub(" ", expression)
+    expression = PERCENT_RE.sub(lambda m: f"({m.group(1)} / 100)" + (" * " if m.group(2) else ""), expression)
+    expression = POSTFIX_FACTORIAL_RE.sub(r" factorial \1", expression)
+    expression = expression.replace("^", " ** ")
+    for pattern, replacement in PHRASES:
+        expression = pattern.sub(replacement, expression)
+    expression = " ".join(expression.split())
+    # Apply spoken functions to the operand that follows; repeat for nesting
+    while True:
+        rewritten = FUNCTION_CALL_RE.sub(r"\1(\2)", expression)
+        if rewritten == expression:
+            break
+        expression = rewritten
+    return expression
+
+
+@lru_cache(maxsize=512)
+def parse(text: str) -> ast.Expression:
+    """Normalize and parse a spoken expression; cached per distinct question"""
+    expression = normalize(text)
+    if not expression:
+        raise MathError("No expression found")
+    try:
+        tree = ast.parse(expression, mode="eval")
+    except SyntaxError:
+        raise MathError(f"I couldn't read '{expression}' as math") from None
+    if sum(1 for _ in ast.walk(tree)) > MAX_NODES:
+        raise MathError("That expression is too long")
+    return tree
+
+
+def _check_size(value: Number) -> Number:
+    if isinstance(value, int) and value.bit_length() > MAX_DIGITS * 3.33:
+        raise MathError("The result is too large")
+    if isinstance(value, float) and not math.isfinite(value):
+        raise MathError("The result is too large")
+    return value
+
+
+def _power(base: Number, exponent: Number) -> Number:
+    if abs(exponent) > MAX_EXPONENT:
+        raise MathError("That exponent is too large")
+    if base not in (0, 1, -1) and exponent > 0 and exponent * math.log10(abs(base)) > MAX_DIGITS:
+        raise MathError("The result is too large")
+    try:
+        result = operator.pow(base, exponent)
+    except OverflowError:
+        raise MathError("The result is too large") from None
+    if isinstance(result, complex):
+        # A negative base to a fractional power: real only for an odd denominator, as in (-8) ** (1/3)
+        fraction = Fraction(exponent).limit_denominator(1000)
+        if fraction.denominator % 2 == 0 or not math.isclose(fraction, exponent, rel_tol=1e-12):
+            raise MathError("That power has no real result")
+        result = (-1) ** fraction.numerator * abs(base) ** exponent
+    return result
+
+
+def _evaluate(node: ast.AST) -> Number:
+    if isinstance(node, ast.Expression):
+        return _evaluate(node.body)
+    if isinstance(node, ast.Constant) and type(node.value) in (int, float):
+        return _check_size(node.value)  # "1e999" parses as inf
+    if isinstance(node, ast.Name) and node.id in CONSTANTS:
+        return CONSTANTS[node.id]
+    if isinstance(node, ast.UnaryOp) and type(node.op) in UNARY_OPERATORS:
+        return UNARY_OPERATORS[type(node.op)](_evaluate(node.operand))
+    if isinstance(node, ast.BinOp) and type(node.op) in BINARY_OPERATORS:
+        left, right = _evaluate(node.left), _evaluate(node.right)
+        if isinstance(node.op, ast.Pow):
+            return _check_size(_power(left, right))
+        if isinstance(node.op, ast.Mult) and isinstance(left, int) and isinstance(right, int) \
+                and left.bit_length() + right.bit_length() > MAX_DIGITS * 3.33:
+            raise MathError("The result is too large")
+        try:
+            return _check_size(BINARY_OPERATORS[type(node.op)](left, right))
+        except OverflowError:
+            raise MathError("The result is too large") from None
+    if isinstance(node, ast.Call) and isinstance(node.func, ast.Name) and node.func.id in FUNCTIONS \
+            and len(node.args) == 1 and not node.keywords:
+        try:
+            return _check_size(FUNCTIONS[node.func.id](_evaluate(node.args[0])))
+        except (OverflowError, ValueError) as e:
+            raise MathError(str(e) if isinstance(e, MathError) else "The result is too large") from None
+    raise MathError("Only numbers, arithmetic and basic functions are supported")
+
+
+def evaluate(text: str) -> Number:
+    """Value of a spoken or written expression; raises MathError or ZeroDivisionError"""
+    return _evaluate(parse(text))
+
+
+def format_number(value: Number) -> str:
+    """Readable result: integers exactly (at most MAX_DIGITS long), floats to ten significant digits"""
+    if isinstance(value, float) and value.is_integer() and abs(value) < 1e15:
+        value = int(value)
+    if isinstance(value, int):
+        return str(value)
+    return f"{value:.10g}"
+
+
+def convert_units(text: str) -> Optional[Tuple[float, str, str, float]]:
+    """(amount, source unit, target unit, converted) for "5 miles to km", or None if not a conversion"""
+    match = CONVERSION_RE.match(FILLER_RE.sub(" ", words_to_numbers(text)).strip())
+    if not match:
+        return None
+    source, target = match.group("source"), match.group("target")
+    (source_dimension, source_factor), (target_dimension, target_factor) = UNITS[source], UNITS[target]
+    if source_dimension != target_dimension:
+        raise MathError(f"Cannot convert {source} to {target}")
+    amount = float(evaluate(match.group("amount")))
+    if source_dimension == "temperature":
+        return amount, source, target, _convert_temperature(amount, source, target)
+    return amount, source, target, amount * source_factor / target_factor
+
+
+def answer(text: str) -> str:
+    """Spoken answer for a math question or unit conversion"""
+    try:
+        conversion = convert_units(text)
+        if conversion is not None:
+            amount, source, target, converted = conversion
+            return f"{format_number(amount)} {source} is {format_number(round(converted, 4))} {target}"
+        return f"The result is {format_number(evaluate(text))}"
+    except ZeroDivisionError:
+        return "Cannot divide by zero"
+    except MathError as e:
+        return f"Couldn't calculate: {e}"
+
+
+def check_corpus(path: str) -> List[str]:
+    """Compare answers against a JSON corpus of {"utterance", "expected"}; returns mismatches"""
+    with open(path, 'r', encoding='utf-8') as f:
+        cases = json.load(f)
+    failures = []
+    for case in cases:
+        try:
+            conversion = convert_units(case["utterance"])
+            value = conversion[3] if conversion else evaluate(case["utterance"])
+        except (MathError, ZeroDivisionError) as e:
+            value = type(e).__name__
+        expected = case["expected"]
+        if isinstance(expected, str) or isinstance(value, str):
+            ok = value == expected
+        else:
+            ok = math.isclose(value, expected, rel_tol=1e-6, abs_tol=1e-9)
+        if not ok:
+            failures.append(f"{case['utterance']!r}: expected {expected!r}, got {value!r}")
+    return failures
+
+
+def benchmark(path: str, rounds: int = 20) -> dict:
+    """Per-question cost with a cold and a warm parse cache"""
+    with open(path, 'r', encoding='utf-8') as f:
+        utterances = [case["utterance"] for case in json.load(f)]
+
+    def run_all():
+        for utterance in utterances:
+            answer(utterance)
+
+    parse.cache_clear()
+    started = time.perf_counter()
+    run_all()
+    cold = (time.perf_counter() - started) / len(utterances)
+    started = time.perf_counter()
+    for _ in range(rounds):
+        run_all()
+    warm = (time.perf_counter() - started) / (len(utterances) * rounds)
+    return {"utterances": len(utterances), "cold_us": round(cold * 1e6, 1), "warm_us": round(warm * 1e6, 1),
+            "cache": parse.cache_info()._asdict()}
+
+
+FUZZ_WORDS = ["one", "two", "twelve", "hundred", "hundred hundred hundred hundred hundred hundred",
+              "thousand", "million", "point", "five", "plus", "minus", "1e308", "2.5e-3", "times",
+              "divided by", "over", "to the power of", "squared", "cubed", "square root of", "factorial",
+              "percent of", "log of", "sine of", "mod", "(", ")", "9", "99", "0", "**", "^", "-", "*", "/",
+              "e", "pi", "miles", "to", "km", "celsius", "fahrenheit", "x", "and", "of", "__import__", "os",
+              "lambda", "[", "]", "'", ".", ",", "9**9**9"]
+
+
+def fuzz(iterations: int = 20000, seed: int = 1, budget_ms: float = 50.0) -> dict:
+    """Random word salad and hostile expressions: only MathError or ZeroDivisionError may escape"""
+    rng = random.Random(seed)
+    outcomes = {"ok": 0, "MathError": 0, "ZeroDivisionError": 0}
+    slowest = (0.0, "")
+    crashes = []
+    hostile = ["9**9**9", "9 ^ 9 ^ 9", "10 ** 1000000", "factorial of 100000", "(2**64)**(2**64)",
+               "__import__('os').system('echo hi')", "().__class__", "1e308 * 10", "sqrt of -1",
+               "1 / 0", "ten to the power of ten to the power of ten", "one " + "hundred " * 200]
+    samples = hostile + [" ".join(rng.choice(FUZZ_WORDS) for _ in range(rng.randint(1, 12)))
+                         for _ in range(iterations)]
+    for text in samples:
+        started = time.perf_counter()
+        try:
+            answer(text)
+            outcomes["ok"] += 1
+        except Exception as e:
+            crashes.append(f"{text!r}: {type(e).__name__}: {e}")
+        elapsed = (time.perf_counter() - started) * 1000
+        if elapsed > slowest[0]:
+            slowest = (elapsed, text)
+    return {"samples": len(samples), "crashes": crashes[:10], "crash_count": len(crashes),
+            "slowest_ms": round(slowest[0], 2), "slowest": slowest[1], "within_budget": slowest[0] < budget_ms}
+
+
+if __name__ == "__main__":
+    corpus_default = str(Path(__file__).with_name("data") / "math_corpus.json")
+    parser = argparse.ArgumentParser(description="Check, benchmark and fuzz the Beastboy math engine")
+    parser.add_argument("--corpus", default=corpus_default)
+    parser.add_argument("--fuzz", type=int, default=20000)
+    parser.add_argument("--ask", help="answer a single question")
+    args = parser.parse_args()
+
+    if args.ask:
+        try:
+            print(f"{normalize(args.ask)!r} -> {answer(args.ask)}")
+        except MathError as e:
+            print(f"Couldn't read: {e}")
+        raise SystemExit(0)
+
+    failures = check_corpus(args.corpus)
+    for failure in failures:
+        print(f"FAIL  {failure}")
+    print(f"Corpus: {'OK' if not failures else f'{len(failures)} mismatches'}")
+    print(benchmark(args.corpus))
+    report = fuzz(args.fuzz)
+    print(report)
+    raise SystemExit(1 if failures or report["crash_count"] or not report["within_budget"] else 0)
@@ -0,0 +1,371 @@
+"""Latency histograms, counters and traces for Beastboy.
+
+Each pipeline stage (capture, VAD, ASR, language detection, routing,
+service calls, TTS) records its duration into an HDR-style histogram:
+log-linear buckets with a bounded relative error, so one histogram covers
+microseconds to minutes without choosing bucket bounds up front. Counters
+track events such as wake words and recognition failures. Everything can be
+read as Prometheus text from a localhost endpoint or dumped as JSON.
+Per-utterance traces are optional; the trace for the current utterance
+travels in a context variable, so code deep inside a stage can add spans
+without passing it around.
+"""
+
+import argparse
+import contextvars
+import json
+import logging
+import threading
+import time
+import urllib.request
+from collections import deque
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Deque, Dict, Iterator, List, Optional, Tuple, Union
+
+logger = logging.getLogger(__name__)
+
+# Upper bucket bounds in milliseconds used when exporting to Prometheus
+LATENCY_BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+INF_LABEL = 'le="+Inf"'
+
+SUB_BUCKET_BITS = 7            # 64 linear steps per power of two: under 1.6% relative error
+MAX_TRACKABLE_US = 3600 * 10 ** 6
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+current_trace: contextvars.ContextVar[Optional["Trace"]] = contextvars.ContextVar("current_trace", default=None)
+
+
+class LatencyHistogram:
+    """HDR-style histogram of durations in microseconds; cheap to record into from any thread"""
+
+    def __init__(self, sub_bucket_bits: int = SUB_BUCKET_BITS, max_us: int = MAX_TRACKABLE_US):
+        self.sub_count = 1 << sub_bucket_bits
+        self.half = self.sub_count // 2
+        self.sub_bits = sub_bucket_bits
+        self.max_us = max_us
+        self.counts = [0] * (self._index(max_us) + 1)
+        self.total = 0
+        self.sum_us = 0
+        self.max_seen_us = 0
+        self._lock = threading.Lock()
+
+    def _index(self, value: int) -> int:
+        if value < self.sub_count:
+            return value
+        shift = value.bit_length() - self.sub_bits
+        return self.sub_count + (shift - 1) * self.half + ((value >> shift) - self.half)
+
+    def _bounds(self, index: int) -> Tuple[int, int]:
+        """Lowest and highest microsecond value stored in bucket ``index``"""
+        if index < self.sub_count:
+            return index, index
+        shift = (index - self.sub_count) // self.half + 1
+        mantissa = (index - self.sub_count) % self.half + self.half
+        return mantissa << shift, ((mantissa + 1) << shift) - 1
+
+    def record(self, seconds: float):
+        us = min(max(int(seconds * 1e6), 0), self.max_us)
+        index = self._index(us)
+        with self._lock:
+            self.counts[index] += 1
+            self.total += 1
+            self.sum_us += us
+            if us > self.max_seen_us:
+                self.max_seen_us = us
+
+    def percentile(self, q: float) -> Optional[float]:
+        """Value in milliseconds at the ``q``-th percentile, within the bucket's relative error"""
+        if not self.total:
+            return None
+        rank = max(1, q / 100 * self.total)
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if count and seen >= rank:
+                low, high = self._bounds(index)
+                return round(min((low + high) / 2, self.max_seen_us) / 1000, 3)
+        return round(self.max_seen_us / 1000, 3)
+
+    def cumulative(self, bounds_ms=LATENCY_BUCKETS_MS) -> List[int]:
+        """Counts at or below each bound, for Prometheus ``le`` buckets"""
+        limits = [bound * 1000 for bound in bounds_ms]
+        result = [0] * len(limits)
+        for index, count in enumerate(self.counts):
+            if not count:
+                continue
+            low, _ = self._bounds(index)
+            for position, limit in enumerate(limits):
+                if low <= limit:
+                    result[position] += count
+        return result
+
+    def snapshot(self) -> dict:
+        return {
+            "count": self.total,
+            "mean_ms": round(self.sum_us / self.total / 1000, 1) if self.total else None,
+            "p50_ms": self.percentile(50),
+            "p90_ms": self.percentile(90),
+            "p95_ms": self.percentile(95),
+            "p99_ms": self.percentile(99),
+            "max_ms": round(self.max_seen_us / 1000, 3) if self.total else None,
+        }
+
+
+class Counter:
+    """Monotonic event counter"""
+
+    def __init__(self):
+        self.value = 0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: int = 1):
+        with self._lock:
+            self.value += amount
+
+
+class CallbackCounter:
+    """Exports a running total kept by another component, read each time metrics are rendered"""
+
+    def __init__(self, read: Callable[[], int]):
+        self._read = read
+
+    @property
+    def value(self) -> int:
+        return self._read()
+
+
+class Trace:
+    """Spans of one utterance, as offsets from the moment it was captured"""
+
+    def __init__(self, name: str, started: Optional[float] = None):
+        self.name = name
+        self.started = started if started is not None else time.perf_counter()
+        self.wall_time = time.time()
+        self.spans: List[Tuple[str, float, float]] = []
+
+    def add_span(self, name: str, started: float, seconds: float):
+        self.spans.append((name, started - self.started, seconds))
+
+    def as_dict(self) -> dict:
+        return {
+            "name": self.name,
+            "time": self.wall_time,
+            "spans": [{"name": name, "start_ms": round(offset * 1000, 2), "duration_ms": round(seconds * 1000, 2)}
+                      for name, offset, seconds in self.spans],
+        }
+
+
+class MetricsRegistry:
+    """Named, labelled histograms and counters plus a ring of recent traces"""
+
+    def __init__(self, tracing: bool = False, max_traces: int = 100, namespace: str = "beastboy"):
+        self.namespace = namespace
+        self.tracing = tracing
+        self.histograms: Dict[Tuple[str, LabelKey], LatencyHistogram] = {}
+        self.counters: Dict[Tuple[str, LabelKey], Union[Counter, CallbackCounter]] = {}
+        self.help: Dict[str, str] = {}
+        self.traces: Deque[Trace] = deque(maxlen=max_traces)
+        self._stages: Dict[str, LatencyHistogram] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(name: str, labels: Dict[str, str]) -> Tuple[str, LabelKey]:
+        return name, tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+    def histogram(self, name: str, help: str = "", **labels) -> LatencyHistogram:
+        key = self._key(name, labels)
+        histogram = self.histograms.get(key)
+        if histogram is None:
+            with self._lock:
+                histogram = self.histograms.setdefault(key, LatencyHistogram())
+                self.help.setdefault(name, help)
+        return histogram
+
+    def counter(self, name: str, help: str = "", **labels) -> Counter:
+        key = self._key(name, labels)
+        counter = self.counters.get(key)
+        if counter is None:
+            with self._lock:
+                counter = self.counters.setdefault(key, Counter())
+                self.help.setdefault(name, help)
+        return counter
+
+    def counter_from(self, name: str, read: Callable[[], int], help: str = "", **labels) -> CallbackCounter:
+        """Export a total counted elsewhere, e.g. a cache's hits; replaces an earlier one of the same name"""
+        counter = CallbackCounter(read)
+        with self._lock:
+            self.counters[self._key(name, labels)] = counter
+            self.help.setdefault(name, help)
+        return counter
+
+    def observe(self, stage: str, seconds: float, started: Optional[float] = None):
+        """Record a stage duration, and a span on the current trace if there is one"""
+        histogram = self._stages.get(stage)
+        if histogram is None:
+            histogram = self._stages[stage] = self.histogram(
+                "stage_seconds", "Time spent in each voice pipeline stage", stage=stage)
+        histogram.record(seconds)
+        trace = current_trace.get()
+        if trace is not None:
+            trace.add_span(stage, started if started is not None else time.perf_counter() - seconds, seconds)
+
+    @contextmanager
+    def stage(self, stage: str) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - started, started)
+
+    def start_trace(self, name: str = "utterance", started: Optional[float] = None) -> Optional[Trace]:
+        """A new trace kept in the recent-traces ring, or None when tracing is off"""
+        if not self.tracing:
+            return None
+        trace = Trace(name, started)
+        self.traces.append(trace)
+        return trace
+
+    def snapshot(self) -> dict:
+        def label_text(labels: LabelKey) -> str:
+            return ",".join(f"{k}={v}" for k, v in labels)
+        return {
+            "histograms": {f"{name}{{{label_text(labels)}}}": histogram.snapshot()
+                           for (name, labels), histogram in sorted(self.histograms.items())},
+            "counters": {f"{name}{{{label_text(labels)}}}": counter.value
+                         for (name, labels), counter in sorted(self.counters.items())},
+        }
+
+    def dump_json(self, path: Optional[str] = None, traces: bool = True) -> str:
+        data = self.snapshot()
+        if traces:
+            data["traces"] = [trace.as_dict() for trace in list(self.traces)]
+        text = json.dumps(data, indent=2)
+        if path:
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write(text)
+        return text
+
+    def render_prometheus(self) -> str:
+        """Prometheus text exposition format (version 0.0.4)"""
+        def labels_text(labels: LabelKey, extra: str = "") -> str:
+            parts = [f'{k}="{v}"' for k, v in labels] + ([extra] if extra else [])
+            return "{" + ",".join(parts) + "}" if parts else ""
+
+        lines = []
+        for name in sorted({name for name, _ in self.histograms}):
+            metric = f"{self.namespace}_{name}"
+            lines.append(f"# HELP {metric} {self.help.get(name, '')}")
+            lines.append(f"# TYPE {metric} histogram")
+            for (other, labels), histogram in sorted(self.histograms.items()):
+                if other != name:
+                    continue
+                for bound, count in zip(LATENCY_BUCKETS_MS, histogram.cumulative()):
+                    le = f'le="{bound / 1000}"'
+                    lines.append(f"{metric}_bucket{labels_text(labels, le)} {count}")
+                lines.append(f"{metric}_bucket{labels_text(labels, INF_LABEL)} {histogram.total}")
+                lines.append(f"{metric}_sum{labels_text(labels)} {histogram.sum_us / 1e6}")
+                lines.append(f"{metric}_count{labels_text(labels)} {histogram.total}")
+        for name in sorted({name for name, _ in self.counters}):
+            metric = f"{self.namespace}_{name}_total"
+            lines.append(f"# HELP {metric} {self.help.get(name, '')}")
+            lines.append(f"# TYPE {metric} counter")
+            for (other, labels), counter in sorted(self.counters.items()):
+                if other == name:
+                    lines.append(f"{metric}{labels_text(labels)} {counter.value}")
+        return "\n".join(lines) + "\n"
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        registry = self.server.registry
+        if self.path == "/metrics":
+            body, content_type = registry.render_prometheus(), "text/plain; version=0.0.4"
+        elif self.path == "/metrics.json":
+            body, content_type = registry.dump_json(), "application/json"
+        else:
+            self.send_error(404)
+            return
+        data = body.encode('utf-8')
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_metrics_server(registry: MetricsRegistry, port: int = 9464, host: str = "127.0.0.1") -> ThreadingHTTPServer:
+    """Serve ``/metrics`` (Prometheus text) and ``/metrics.json`` on localhost"""
+    server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    server.daemon_threads = True
+    server.registry = registry
+    threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+    logger.info(f"Metrics at http://{host}:{server.server_address[1]}/metrics")
+    return server
+
+
+def measure_overhead(iterations: int = 200000) -> dict:
+    """Nanoseconds added by recording a stage, with and without tracing"""
+    def per_call(func) -> float:
+        started = time.perf_counter()
+        for _ in range(iterations):
+            func()
+        return (time.perf_counter() - started) / iterations * 1e9
+
+    registry = MetricsRegistry()
+    baseline = per_call(lambda: None)
+
+    def timed():
+        with registry.stage("asr"):
+            pass
+    untraced = per_call(timed) - baseline
+    registry.counter("utterances")
+    counted = per_call(registry.counter("utterances").inc) - baseline
+
+    traced_registry = MetricsRegistry(tracing=True)
+    token = current_trace.set(traced_registry.start_trace())
+
+    def traced():
+        with traced_registry.stage("asr"):
+            pass
+    traced_ns = per_call(traced) - baseline
+    current_trace.reset(token)
+    return {"stage_ns": round(untraced), "stage_traced_ns": round(traced_ns), "counter_ns": round(counted),
+            "per_utterance_us": round((untraced * 8 + counted * 3) / 1000, 2)}
+
+
+def demo(port: int = 0) -> dict:
+    """Record a few simulated utterances, then read them back over HTTP"""
+    registry = MetricsRegistry(tracing=True)
+    server = start_metrics_server(registry, port)
+    try:
+        for i in range(20):
+            trace = registry.start_trace()
+            token = current_trace.set(trace)
+            for stage, seconds in (("capture", 1.2), ("vad", 0.004), ("asr", 0.6 + i * 0.01),
+                                   ("language_detect", 0.15), ("route", 0.0002), ("service", 0.3), ("tts", 0.25)):
+                registry.observe(stage, seconds)
+            registry.counter("utterances", "Utterances captured after a wake word").inc()
+            current_trace.reset(token)
+        url = f"http://127.0.0.1:{server.server_address[1]}"
+        prometheus = urllib.request.urlopen(f"{url}/metrics", timeout=5).read().decode()
+        dump = json.loads(urllib.request.urlopen(f"{url}/metrics.json", timeout=5).read())
+    finally:
+        server.shutdown()
+    return {"prometheus_lines": len(prometheus.splitlines()), "prometheus_head": prometheus.splitlines()[:4],
+            "asr": dump["histograms"]["stage_seconds{stage=asr}"], "traces": len(dump["traces"])}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Exercise Beastboy metrics and measure their overhead")
+    parser.add_argument("--iterations", type=int, default=200000)
+    args = parser.parse_args()
+
+    for key, value in demo().items():
+        print(f"{key}: {value}")
+    print(f"overhead: {measure_overhead(args.iterations)}")
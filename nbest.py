@@ -0,0 +1,502 @@
+"""N-best re-scoring of speech recognition hypotheses.
+
+The recognizer's first transcript is often a near miss: "bee bee" for the
+wake word "bb", "whether" for "weather", "micro soft" for a ticker. Its
+other hypotheses often contain the right words. ``HypothesisRescorer``
+scores every alternative in one pass against what the assistant can act
+on, and picks the best one:
+
+- wake words, at the start of the text
+- intent triggers, only when a hypothesis routes nowhere without them
+- entity vocabularies (applications, tickers, cities), inside the intent
+  that takes them
+
+Words are matched exactly or through a precomputed phonetic index (a
+simplified Double Metaphone) that also checks syllable counts. Phonetic
+matches are written back as the canonical term. Every hypothesis starts from
+its ASR rank, then gains the router's confidence and the vocabulary it
+matched. ``python nbest.py`` replays the n-best lists in
+``data/nbest_corpus.json`` and compares routing with and without
+re-scoring. ``python nbest.py record clips/`` captures such lists from
+WAV files.
+"""
+
+import argparse
+import json
+import re
+import time
+from dataclasses import dataclass, field
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from asr_backends import Hypothesis
+from intent_router import IntentRouter, RouteResult, default_router, tokenize
+
+DATA_DIR = Path(__file__).with_name("data")
+ENTITIES_PATH = DATA_DIR / "entities.json"
+CORPUS_PATH = DATA_DIR / "nbest_corpus.json"
+
+MAX_SPAN = 4                 # longest vocabulary phrase, in words
+RANK_PENALTY = 0.1           # per place below the recognizer's first choice
+CONFIDENCE_WEIGHT = 0.1      # the engine's own confidence, where it gives one
+VOCABULARY_BONUS = 0.3       # per wake word or entity matched exactly
+PHONETIC_FACTOR = 0.8        # share of the bonus for a phonetic match
+TRIGGER_PENALTY = 0.15       # a hypothesis that only routes after correcting a trigger word
+MIN_TRIGGER_KEY = 3          # "lock"/"look" and "time"/"team" are too close to correct
+
+# Entity vocabulary consulted for each intent
+ENTITY_INTENTS = {"open_app": "app", "stock_price": "ticker", "weather": "city"}
+# Never the start or end of a phonetic match: "in video" must not become "nvidia"
+FUNCTION_WORDS = {"a", "an", "the", "of", "for", "in", "on", "at", "to", "is", "it", "my", "me",
+                  "and", "or", "what", "what's", "whats", "please", "up", "some"}
+VOWEL_GROUP_RE = re.compile(r"[aeiouy]+")
+SILENT_E_RE = re.compile(r"[^aeiouyl]e[ds]?$")
+
+
+def _letters(text: str) -> str:
+    return "".join(ch for ch in text.lower() if "a" <= ch <= "z")
+
+
+@lru_cache(maxsize=4096)
+def phonetic_keys(text: str) -> Tuple[str, str]:
+    """Primary and alternate code of a simplified Double Metaphone, over the letters of ``text``.
+
+    Vowels only count at the start, similar consonants share a code, and
+    repeated codes collapse, so "bee bee" and "bb" both encode as "P".
+    """
+    word = _letters(text)
+    if not word:
+        return "", ""
+    primary: List[str] = []
+    alternate: List[str] = []
+
+    def add(code: str, other: Optional[str] = None):
+        primary.append(code)
+        alternate.append(code if other is None else other)
+
+    def at(index: int) -> str:
+        return word[index] if 0 <= index < len(word) else ""
+
+    i = 0
+    if word[:2] in ("kn", "gn", "pn", "wr", "ps"):
+        i = 1
+    elif word[0] == "x":
+        add("S")
+        i = 1
+    elif word[:2] == "wh":
+        add("W")
+        i = 2
+    while i < len(word):
+        c, nxt, after = word[i], at(i + 1), at(i + 2)
+        step = 1
+        if c == at(i - 1) and c != "c":
+            pass
+        elif c in "aeiou":
+            if i == 0:
+                add("A")
+        elif c == "b":
+            if not (at(i - 1) == "m" and i == len(word) - 1):  # climb
+                add("P")
+        elif c == "c":
+            if nxt == "h":
+                add("X", "K")
+                step = 2
+            elif nxt == "i" and after == "a":
+                add("X")
+            elif nxt and nxt in "eiy":
+                add("S")
+            elif nxt == "k":
+                add("K")
+                step = 2
+            else:
+                add("K")
+        elif c == "d":
+            if nxt == "g" and after and after in "eiy":
+                add("J")
+                step = 3
+            else:
+                add("T")
+        elif c == "g":
+            if nxt == "h":
+                if i == 0 or (after and after in "aeiou"):
+                    add("K")
+                step = 2  # silent in "night" and "high"
+            elif nxt == "n" and (i + 2 == len(word) or word[i + 2:i + 4] == "ed"):
+                pass
+            elif nxt and nxt in "eiy":
+                add("J", "K")
+            else:
+                add("K")
+        elif c == "h":
+            if nxt and nxt in "aeiou":
+                add("H")
+        elif c == "j":
+            add("J", "H")
+        elif c in "kq":
+            add("K")
+        elif c in "lmnr":
+            add(c.upper())
+        elif c == "p":
+            if nxt == "h":
+                add("F")
+                step = 2
+            else:
+                add("P")
+        elif c == "s":
+            if nxt == "h":
+                add("X")
+                step = 2
+            elif nxt == "i" and after in ("o", "a"):
+                add("X", "S")
+            elif nxt == "c" and after == "h":
+                add("S")
+                add("K")
+                step = 3
+            else:
+                add("S")
+        elif c == "t":
+            if nxt == "h":
+                add("0", "T")
+                step = 2
+            elif nxt == "i" and after in ("o", "a"):
+                add("X")
+            elif nxt == "c" and after == "h":
+                pass  # "tch" sounds as "ch"
+            else:
+                add("T")
+        elif c in "fv":
+            add("F")
+        elif c == "w":
+            if nxt and nxt in "aeiou":
+                add("W")
+        elif c == "x":
+            add("K")
+            add("S")
+        elif c == "y":
+            if i == 0:
+                add("Y" if nxt and nxt in "aeiou" else "A")
+        elif c == "z":
+            add("S")
+        i += step
+    return _collapse(primary), _collapse(alternate)
+
+
+def _collapse(codes: List[str]) -> str:
+    return "".join(code for i, code in enumerate(codes) if i == 0 or code != codes[i - 1])
+
+
+def syllables(words: Iterable[str]) -> int:
+    """Vowel groups per word; a word without vowels is spelled out, one syllable per letter"""
+    total = 0
+    for word in words:
+        letters = _letters(word)
+        groups = len(VOWEL_GROUP_RE.findall(letters))
+        if groups > 1 and SILENT_E_RE.search(letters):
+            groups -= 1  # "buzzed" and "code" have one syllable
+        total += groups or len(letters)
+    return total
+
+
+@dataclass(frozen=True)
+class Term:
+    phrase: str      # canonical text written into the transcript
+    kind: str        # "wake", "trigger", "app", "ticker" or "city"
+    syllables: int
+
+
+class PhoneticIndex:
+    """Spoken forms of one vocabulary, by exact letters and by phonetic key"""
+
+    def __init__(self, kind: str, min_key: int = 2, min_phrase_key: int = 1):
+        self.kind = kind
+        self.min_key = min_key                  # shortest phonetic key a single word may match
+        self.min_phrase_key = min_phrase_key    # the same for spans of several words
+        self.exact: Dict[str, Term] = {}
+        self.keys: Dict[str, List[Term]] = {}
+
+    def add(self, spoken: str, canonical: Optional[str] = None):
+        spoken_words = [token for token, _, _ in tokenize(spoken)]
+        letters = _letters(spoken)
+        if not letters or len(spoken_words) > MAX_SPAN:
+            return
+        term = Term(canonical or " ".join(spoken_words), self.kind, syllables(spoken_words))
+        self.exact.setdefault(letters, term)
+        for key in set(phonetic_keys(letters)):
+            terms = self.keys.setdefault(key, [])
+            if term not in terms:
+                terms.append(term)
+
+    def __len__(self) -> int:
+        return len(self.exact)
+
+    def match(self, words: Sequence[str]) -> Optional[Tuple[Term, bool]]:
+        """(term, exact) for a span of words, or None"""
+        letters = _letters("".join(words))
+        term = self.exact.get(letters)
+        if term is not None:
+            return term, True
+        if len(letters) < 3 or words[0] in FUNCTION_WORDS or words[-1] in FUNCTION_WORDS:
+            return None
+        count = syllables(words)
+        shortest = self.min_phrase_key if len(words) > 1 else self.min_key
+        for key in phonetic_keys(letters):
+            # "bee bee" may become "bb" on its one-code key, but "be" may not
+            if len(key) < shortest:
+                continue
+            for term in self.keys.get(key, ()):
+                if term.syllables == count:
+                    return term, False
+        return None
+
+
+@dataclass
+class Rescored:
+    text: str                    # the chosen hypothesis with corrections applied
+    original: str
+    rank: int
+    score: float
+    intent: Optional[str]
+    corrections: List[Tuple[str, str]] = field(default_factory=list)
+
+
+def _correct(text: str, index: PhoneticIndex, protected: Tuple[int, int] = (0, 0),
+             leading: bool = False) -> Tuple[str, int, int, list]:
+    """Rewrite vocabulary spans of ``text``: (new text, exact hits, phonetic hits, corrections).
+
+    Characters inside ``protected`` (the matched trigger) are left alone;
+    ``leading`` only looks at the start of the text.
+    """
+    spans = tokenize(text)
+    pieces, corrections = [], []
+    exact = phonetic = 0
+    position = i = 0
+    while i < len(spans) and not (leading and i):
+        for n in range(min(MAX_SPAN, len(spans) - i), 0, -1):
+            start, end = spans[i][1], spans[i + n - 1][2]
+            if start < protected[1] and end > protected[0]:
+                continue
+            hit = index.match([token for token, _, _ in spans[i:i + n]])
+            if hit is None:
+                continue
+            term, is_exact = hit
+            if is_exact:
+                exact += 1
+            else:
+                phonetic += 1
+            spoken = text[start:end]
+            if term.phrase != spoken.lower():
+                pieces.append(text[position:start] + term.phrase)
+                position = end
+                corrections.append((spoken, term.phrase))
+            i += n
+            break
+        else:
+            i += 1
+    if not corrections:
+        return text, exact, phonetic, corrections
+    return "".join(pieces) + text[position:], exact, phonetic, corrections
+
+
+class HypothesisRescorer:
+    """Picks the n-best hypothesis that best fits the wake words, intents and known entities"""
+
+    def __init__(self, router: Optional[IntentRouter] = None, wake_words: Sequence[str] = (),
+                 entities: Optional[dict] = None):
+        self.router = router or default_router()
+        self.indexes: Dict[str, PhoneticIndex] = {}
+        self.set_wake_words(wake_words)
+        triggers = {}
+        for intent in self.router.intents:
+            for spec in intent.triggers:
+                phrase = spec if isinstance(spec, str) else spec[0]
+                triggers[phrase] = phrase
+        self.set_vocabulary("trigger", triggers, MIN_TRIGGER_KEY, MIN_TRIGGER_KEY)
+        if entities:
+            self.set_entities(entities)
+
+    def set_vocabulary(self, kind: str, spoken: Dict[str, str], min_key: int = 2, min_phrase_key: int = 1):
+        """Replace one vocabulary; ``spoken`` maps each spoken form to the text that replaces it"""
+        index = PhoneticIndex(kind, min_key, min_phrase_key)
+        for phrase, canonical in spoken.items():
+            index.add(phrase, canonical)
+        self.indexes[kind] = index  # swapped in whole, so a running rescore never sees half of it
+
+    def set_wake_words(self, wake_words: Sequence[str]):
+        self.wake_words = [word.lower() for word in wake_words]
+        self.set_vocabulary("wake", {word: word for word in self.wake_words})
+
+    def set_entities(self, entities: dict):
+        """Cities and tickers as stored in ``data/entities.json``"""
+        if "cities" in entities:
+            self.set_vocabulary("city", {city: city for city in entities["cities"]})
+        if "tickers" in entities:
+            spoken = {}
+            for symbol, names in entities["tickers"].items():
+                spoken[symbol] = symbol
+                spoken.update({name: symbol for name in names})
+            self.set_vocabulary("ticker", spoken)
+
+    def set_apps(self, names: Iterable[str]):
+        self.set_vocabulary("app", {name.lower(): name.lower() for name in names})
+
+    def score(self, text: str, rank: int = 0, confidence: Optional[float] = None) -> Rescored:
+        """Score one hypothesis, with the corrections that make it fit"""
+        original = text
+        corrections: List[Tuple[str, str]] = []
+        score = -RANK_PENALTY * rank + CONFIDENCE_WEIGHT * (confidence or 0.0)
+
+        # Wake words open a command; elsewhere "a bee buzzed" is not "a beasty"
+        text, exact, phonetic, fixed = _correct(text, self.indexes["wake"], leading=True)
+        corrections += fixed
+        score += VOCABULARY_BONUS * (exact + PHONETIC_FACTOR * phonetic)
+
+        route = self.router.route(text)
+        if route is None:
+            corrected, _, phonetic, fixed = _correct(text, self.indexes["trigger"])
+            if phonetic:
+                route = self.router.route(corrected)
+                if route is not None:
+                    text = corrected
+                    corrections += fixed
+                    score -= TRIGGER_PENALTY
+
+        if route is not None and ENTITY_INTENTS.get(route.name) in self.indexes:
+            index = self.indexes[ENTITY_INTENTS[route.name]]
+            text, exact, phonetic, fixed = _correct(text, index, (route.start, route.end))
+            if fixed:
+                corrections += fixed
+                route = self.router.route(text)
+            score += VOCABULARY_BONUS * (exact + PHONETIC_FACTOR * phonetic)
+
+        if route is not None:
+            score += route.confidence
+        return Rescored(text, original, rank, round(score, 4), route.name if route else None, corrections)
+
+    def best(self, hypotheses: Sequence[Hypothesis]) -> Optional[Rescored]:
+        """The best hypothesis in one pass; ties go to the recognizer's order"""
+        best = None
+        for rank, hypothesis in enumerate(hypotheses):
+            if not hypothesis.text:
+                continue
+            candidate = self.score(hypothesis.text, rank, hypothesis.confidence)
+            if best is None or candidate.score > best.score:
+                best = candidate
+        return best
+
+
+def load_entities(path=ENTITIES_PATH) -> dict:
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def load_corpus(path=CORPUS_PATH) -> List[dict]:
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def _hypotheses(case: dict) -> List[Hypothesis]:
+    """Alternatives as Google's show_all returns them: dicts with "transcript", or plain strings"""
+    return [Hypothesis(a.lower(), None) if isinstance(a, str)
+            else Hypothesis(a["transcript"].lower(), a.get("confidence")) for a in case["alternatives"]]
+
+
+def _outcome(rescorer: HypothesisRescorer, text: str, case: dict) -> bool:
+    if "wake" in case:
+        # The same test as the transcript wake-word detector
+        return any(word in text for word in rescorer.wake_words) == case["wake"]
+    route: Optional[RouteResult] = rescorer.router.route(text)
+    if (route.name if route else None) != case["intent"]:
+        return False
+    return all(route.slots.get(slot) == value for slot, value in case.get("slots", {}).items())
+
+
+def benchmark(rescorer: HypothesisRescorer, corpus: List[dict], golden: Sequence[dict] = (),
+              rounds: int = 50) -> dict:
+    """Routing accuracy of the first hypothesis against the re-scored one, and what re-scoring costs.
+
+    The golden utterances are re-scored as single hypotheses. Any change in
+    their routing is a regression, since they were transcribed correctly.
+    """
+    baseline = rescored = 0
+    fixed, broken, durations = [], [], []
+    for case in corpus:
+        hypotheses = _hypotheses(case)
+        top_ok = _outcome(rescorer, hypotheses[0].text, case)
+        for _ in range(rounds):
+            started = time.perf_counter()
+            best = rescorer.best(hypotheses)
+            durations.append(time.perf_counter() - started)
+        best_ok = _outcome(rescorer, best.text, case)
+        baseline += top_ok
+        rescored += best_ok
+        if best_ok and not top_ok:
+            fixed.append(f"{hypotheses[0].text!r} -> {best.text!r}")
+        elif top_ok and not best_ok:
+            broken.append(f"{hypotheses[0].text!r} -> {best.text!r}")
+    regressions = []
+    for case in golden:
+        before = rescorer.router.route(case["utterance"])
+        after = rescorer.router.route(rescorer.best([Hypothesis(case["utterance"])]).text)
+        if (before and (before.name, before.slots)) != (after and (after.name, after.slots)):
+            regressions.append(case["utterance"])
+    durations.sort()
+    return {
+        "cases": len(corpus),
+        "top_hypothesis_accuracy": round(baseline / len(corpus), 3),
+        "rescored_accuracy": round(rescored / len(corpus), 3),
+        "fixed": fixed,
+        "broken": broken,
+        "golden_regressions": regressions,
+        "mean_alternatives": round(sum(len(case["alternatives"]) for case in corpus) / len(corpus), 2),
+        "rescore_mean_us": round(sum(durations) / len(durations) * 1e6, 1),
+        "rescore_p99_us": round(durations[int(len(durations) * 0.99)] * 1e6, 1),
+        "vocabulary": {kind: len(index) for kind, index in rescorer.indexes.items()},
+    }
+
+
+def record(directory: str, engine: str = "google", limit: int = 5) -> List[dict]:
+    """N-best lists for every ``clip.wav`` in ``directory``, labelled from a ``clip.json`` next to it"""
+    from asr_backends import create_backend, read_wav
+
+    backend = create_backend(engine)
+    cases = []
+    for wav_path in sorted(Path(directory).glob("*.wav")):
+        audio, sample_rate, sample_width = read_wav(wav_path)
+        alternatives = backend.transcribe_alternatives(audio, sample_rate, sample_width, limit=limit)
+        if not alternatives:
+            continue
+        label_path = wav_path.with_suffix(".json")
+        label = json.loads(label_path.read_text(encoding="utf-8")) if label_path.exists() else {"intent": None}
+        cases.append({"alternatives": [{"transcript": a.text, "confidence": a.confidence} if a.confidence
+                                       is not None else a.text for a in alternatives], **label})
+    return cases
+
+
+if __name__ == "__main__":
+    from app_catalog import FIXTURE_DIR, AppCatalog, fixture_sources
+    from settings import DEFAULT_CONFIG
+
+    parser = argparse.ArgumentParser(description="Re-score n-best recognition hypotheses")
+    parser.add_argument("command", nargs="?", choices=("benchmark", "rescore", "record"), default="benchmark")
+    parser.add_argument("args", nargs="*", help="hypotheses for 'rescore', best first; a directory for 'record'")
+    parser.add_argument("--corpus", default=str(CORPUS_PATH))
+    parser.add_argument("--engine", default="google", help="ASR engine for 'record'")
+    args = parser.parse_args()
+
+    if args.command == "record":
+        print(json.dumps(record(args.args[0], args.engine), indent=4))
+    else:
+        rescorer = HypothesisRescorer(wake_words=DEFAULT_CONFIG["system"]["wake_words"], entities=load_entities())
+        # The fake applications stand in for this machine's, so results are the same everywhere
+        catalog = AppCatalog(fixture_sources(FIXTURE_DIR), builtins={})
+        catalog.refresh()
+        rescorer.set_apps(catalog.names())
+        if args.command == "rescore":
+            for rank, text in enumerate(args.args):
+                print(rescorer.score(text.lower(), rank))
+            print("Best:", rescorer.best([Hypothesis(text.lower()) for text in args.args]))
+        else:
+            with open(DATA_DIR / "intent_golden.json", 'r', encoding='utf-8') as f:
+                golden = json.load(f)
+            print(json.dumps(benchmark(rescorer, load_corpus(args.corpus), golden), indent=2))
@@ -0,0 +1,262 @@
+"""Pre-translated response templates for Beastboy.
+
+Fixed responses and responses with a few variable parts (time, city,
+temperature, ...) are written once as English templates in ``TEMPLATES``.
+Handlers return them as ``Phrase`` objects: ordinary strings holding the
+English text that also remember their template key and values. For another
+language, ``PhraseBook.render`` fills the same values into that language's
+template from ``data/phrases/<language>.json``. Each table is loaded on
+first use. Only free-form text with no template, such as Wikipedia extracts
+and AI answers, still goes to the translator. ``python phrases.py`` checks
+every table against the English templates and times rendering;
+``python phrases.py build es fr`` drafts tables with googletrans.
+"""
+
+import argparse
+import json
+import re
+import string
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterable, Optional, Set
+
+PHRASES_DIR = Path(__file__).with_name("data") / "phrases"
+
+TEMPLATES: Dict[str, str] = {
+    "ack": "Yes, how can I help you?",
+    "listening_again": "I'm now listening again!",
+    "paused_hint": "I'm paused. Right-click my tray icon to resume.",
+    "now_paused": "I'm now paused",
+    "now_resumed": "I'm now resumed",
+    "voice_test": "Voice test successful! I'm working properly.",
+    "goodbye": "Goodbye! I'll keep running in the background. Right-click my tray icon to exit completely.",
+    "not_understood": "I didn't understand that command. Say 'help' to see what I can do.",
+    "still_thinking": "Still thinking, one moment.",
+    "help": ("I'm running in background mode! I can help you with:\n"
+             "        • Opening applications and system controls\n"
+             "        • Volume control and system information\n"
+             "        • Time, date, and web searches\n"
+             "        • Math calculations and reminders\n"
+             "        • {features}\n"
+             "        • Background commands: pause, resume, status\n"
+             "        Just say Hey BB followed by your command!"),
+    "feature_translations": "translations",
+    "feature_wikipedia": "Wikipedia searches",
+    "feature_stocks": "stock prices",
+    "feature_ai": "AI-powered conversations",
+    "feature_basic": "basic system controls",
+    "time": "The current time is {time}",
+    "date": "Today's date is {date}",
+    "weather": "Weather in {city}: {description}, {temperature}°C, humidity {humidity}%",
+    "weather_failed": "Couldn't get weather for {city}",
+    "weather_unavailable": "Weather service not available",
+    "stock_price": "{company} stock price is ${price}",
+    "stock_no_price": "Couldn't get current price for {symbol}",
+    "wikipedia_not_found": "No Wikipedia page found for {query}",
+    "wikipedia_ambiguous": "Multiple results found for {query}. Please be more specific.",
+    "reminder_when": "Please specify when: remind me to stretch in 30 minutes, at 5 pm, or every day at 9 am",
+    "reminder_what": "What should I remind you about?",
+    "no_reminders": "You have no reminders.",
+    "no_reminders_to_cancel": "You have no reminders to cancel.",
+    "reminder_not_found": "I couldn't find a reminder about {text}",
+    "reminder_cancelled": "Cancelled the reminder: {text}",
+    "reminders_cancelled": "Cancelled {count} reminders",
+    "status": "I'm running in background mode with {count} services enabled. CPU usage: {cpu}%",
+    "opening": "Opening {app}",
+    "open_failed": "Sorry, I couldn't open {app}",
+    "volume_up": "Volume increased",
+    "volume_down": "Volume decreased",
+    "volume_unavailable": "Volume control not available",
+    "system_info": "System status: CPU {cpu}%, Memory {memory}%, Disk {disk}%",
+    "metric_cpu": "CPU usage",
+    "metric_memory": "memory usage",
+    "metric_disk": "disk usage",
+    "metric_network": "download traffic",
+    "metric_now": "{metric} is {value} right now",
+    "metric_trend": "Over the last {window}, {metric} averaged {mean}, ranging from {low} to {high}",
+    "metric_no_history": "I haven't collected enough samples yet",
+    "metric_unavailable": "System monitoring is turned off",
+    "window_minute": "minute",
+    "window_hour": "hour",
+    "window_seconds": "{count} seconds",
+    "window_minutes": "{count} minutes",
+    "window_hours": "{count} hours",
+    "searching": "Searching for {query}",
+    "search_what": "What would you like me to search for?",
+    "shutdown": "Shutting down the computer in 10 seconds",
+    "restart": "Restarting the computer in 10 seconds",
+    "lock": "Locking the computer",
+    "translate_usage": "Please specify: translate text to language",
+}
+
+
+class Phrase(str):
+    """English response text that remembers the template and values it was made from"""
+
+    key: str
+    values: Dict[str, Any]
+
+    def __new__(cls, key: str, **values):
+        obj = super().__new__(cls, _fill(TEMPLATES[key], values, "en", None))
+        obj.key = key
+        obj.values = values
+        return obj
+
+
+def phrase(key: str, **values) -> Phrase:
+    return Phrase(key, **values)
+
+
+def placeholders(template: str) -> Set[str]:
+    return {name for _, name, _, _ in string.Formatter().parse(template) if name}
+
+
+def _fill(template: str, values: Dict[str, Any], language: str, book: Optional["PhraseBook"]) -> str:
+    """Fill ``template``; values that are phrases, or lists of phrases, are rendered in ``language`` too"""
+    rendered = {}
+    for name, value in values.items():
+        if isinstance(value, (list, tuple)):
+            value = ", ".join(_render_value(item, language, book) for item in value)
+        else:
+            value = _render_value(value, language, book)
+        rendered[name] = value
+    return template.format(**rendered)
+
+
+def _render_value(value: Any, language: str, book: Optional["PhraseBook"]) -> str:
+    if isinstance(value, Phrase) and book is not None:
+        return book.render(value, language) or str(value)
+    return str(value)
+
+
+class PhraseBook:
+    """Per-language template tables, each read from disk the first time that language is spoken"""
+
+    def __init__(self, directory=PHRASES_DIR):
+        self.directory = Path(directory)
+        self._tables: Dict[str, Dict[str, str]] = {}
+        self._lock = threading.Lock()
+        # Plain strings equal to a template without placeholders render as that template
+        self._fixed = {template: key for key, template in TEMPLATES.items() if not placeholders(template)}
+
+    def table(self, language: str) -> Dict[str, str]:
+        table = self._tables.get(language)
+        if table is None:
+            with self._lock:
+                table = self._tables.get(language)
+                if table is None:
+                    table = self._load(language)
+                    self._tables[language] = table
+        return table
+
+    def _load(self, language: str) -> Dict[str, str]:
+        path = self.directory / f"{language}.json"
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                table = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        # A template whose placeholders differ from the English one would fail or drop values
+        return {key: template for key, template in table.items()
+                if key in TEMPLATES and placeholders(template) == placeholders(TEMPLATES[key])}
+
+    @property
+    def languages(self) -> Set[str]:
+        return {path.stem for path in self.directory.glob("*.json")}
+
+    def render(self, text: str, language: str) -> Optional[str]:
+        """``text`` in ``language`` from the phrase tables; None when only a translator could do it"""
+        if language == 'en':
+            return str(text)
+        key = text.key if isinstance(text, Phrase) else self._fixed.get(text)
+        if key is None:
+            return None
+        template = self.table(language).get(key)
+        if template is None:
+            return None
+        return _fill(template, text.values if isinstance(text, Phrase) else {}, language, self)
+
+
+def check(book: PhraseBook) -> Dict[str, dict]:
+    """Missing keys, and keys dropped for mismatched placeholders, per language table"""
+    report = {}
+    for language in sorted(book.languages):
+        with open(book.directory / f"{language}.json", 'r', encoding='utf-8') as f:
+            raw = json.load(f)
+        loaded = book.table(language)
+        report[language] = {
+            "templates": len(loaded),
+            "missing": sorted(set(TEMPLATES) - set(raw)),
+            "bad_placeholders": sorted(key for key in raw if key in TEMPLATES and key not in loaded),
+            "unknown": sorted(set(raw) - set(TEMPLATES)),
+        }
+    return report
+
+
+def build(languages: Iterable[str], directory=PHRASES_DIR, existing: bool = True) -> Dict[str, int]:
+    """Draft tables with googletrans, keeping placeholders intact; reviewed entries are kept"""
+    from googletrans import Translator
+
+    translator = Translator()
+    written = {}
+    for language in languages:
+        path = Path(directory) / f"{language}.json"
+        table = {}
+        if existing and path.exists():
+            with open(path, 'r', encoding='utf-8') as f:
+                table = json.load(f)
+        for key, template in TEMPLATES.items():
+            if key in table:
+                continue
+            # Placeholders become numbered tokens the translator leaves alone
+            names = sorted(placeholders(template))
+            protected = template
+            for index, name in enumerate(names):
+                protected = protected.replace(f"{{{name}}}", f"[{index}]")
+            translated = translator.translate(protected, src='en', dest=language).text
+            for index, name in enumerate(names):
+                translated = re.sub(rf"\[\s*{index}\s*\]", f"{{{name}}}", translated)
+            if placeholders(translated) == set(names):
+                table[key] = translated
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(table, f, ensure_ascii=False, indent=0, sort_keys=True)
+        written[language] = len(table)
+    return written
+
+
+def benchmark(book: PhraseBook, rounds: int = 10000) -> dict:
+    """First-use load time and steady-state render time for each table"""
+    sample = phrase("weather", city="Madrid", description="clear sky", temperature=21.5, humidity=40)
+    results = {}
+    for language in sorted(book.languages):
+        started = time.perf_counter()
+        book.render(sample, language)
+        first = time.perf_counter() - started
+        started = time.perf_counter()
+        for _ in range(rounds):
+            book.render(sample, language)
+        results[language] = {"first_render_ms": round(first * 1000, 2),
+                             "render_us": round((time.perf_counter() - started) / rounds * 1e6, 2)}
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Check, benchmark or draft Beastboy's phrase tables")
+    parser.add_argument("command", nargs="?", choices=("check", "build", "render"), default="check")
+    parser.add_argument("languages", nargs="*")
+    parser.add_argument("--key", default="help", help="template to show for 'render'")
+    args = parser.parse_args()
+
+    if args.command == "build":
+        print(build(args.languages))
+    elif args.command == "render":
+        book = PhraseBook()
+        sample = phrase(args.key, **{name: f"<{name}>" for name in placeholders(TEMPLATES[args.key])})
+        for language in args.languages or sorted(book.languages):
+            print(f"[{language}] {book.render(sample, language)}")
+    else:
+        book = PhraseBook()
+        print(json.dumps(check(book), indent=2))
+        print(benchmark(book))
@@ -0,0 +1,426 @@
+"""Reminder scheduling for Beastboy.
+
+All pending reminders live in one min-heap keyed by due time and a single
+worker thread sleeps until the earliest one is due, so a hundred reminders
+cost a hundred heap entries rather than a hundred sleeping threads.
+Changes are appended to a JSON-lines journal that is replayed on startup,
+so pending reminders survive a restart. The journal is rewritten with only
+the live reminders at startup, and again whenever finished, cancelled or
+superseded records outnumber the live ones, so it stays bounded. Heap
+entries left by cancels are dropped on the same rule. Anything that fell
+due while the assistant was off fires as soon as it starts.
+Recurring reminders are rescheduled by their interval, and spoken times
+("in 20 minutes", "at 5 pm", "tomorrow at 9", "every day at 8 am") are
+parsed by ``parse_reminder``.
+"""
+
+import argparse
+import datetime
+import heapq
+import itertools
+import json
+import logging
+import os
+import re
+import threading
+import time
+import tracemalloc
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+COMPACT_MIN_DEAD = 100   # journal records that no longer matter before a rewrite is worth it
+
+NUMBER_WORDS = {
+    "a": 1, "an": 1, "one": 1, "two": 2, "three": 3, "four": 4, "five": 5, "six": 6, "seven": 7,
+    "eight": 8, "nine": 9, "ten": 10, "eleven": 11, "twelve": 12, "thirteen": 13, "fourteen": 14,
+    "fifteen": 15, "sixteen": 16, "seventeen": 17, "eighteen": 18, "nineteen": 19,
+}
+TENS_WORDS = {"twenty": 20, "thirty": 30, "forty": 40, "fifty": 50, "sixty": 60, "seventy": 70,
+              "eighty": 80, "ninety": 90}
+UNIT_SECONDS = {"second": 1, "minute": 60, "hour": 3600, "day": 86400, "week": 604800}
+
+# "25", "twenty five", "twenty-five", "twenty" or "five"
+NUMBER_PATTERN = (r"\d+|(?:" + "|".join(TENS_WORDS) + r")(?:[ -](?:one|two|three|four|five|six|seven|eight|nine))?|"
+                  + "|".join(sorted(NUMBER_WORDS, key=len, reverse=True)))
+_NUMBER = rf"({NUMBER_PATTERN})"
+_UNIT = r"(second|minute|hour|day|week)s?"
+IN_RE = re.compile(rf"\b(?:in|after) {_NUMBER} {_UNIT}\b")
+EVERY_RE = re.compile(rf"\b(?:every (?:{_NUMBER} )?{_UNIT}|(daily|hourly|weekly))\b")
+# "for" only introduces a clock time ("a reminder for 3:30 pm"), never a count ("for 3 people")
+AT_RE = re.compile(r"\b(?:at|for(?= (?:\d{1,2}(?::\d{2}| ?[ap]\.? ?m\b)|noon\b|midnight\b))) "
+                   r"(?:(?P<hour>\d{1,2})(?::(?P<minute>\d{2}))?(?: ?(?P<ampm>[ap])\.? ?m\b\.?)?"
+                   r"|(?P<named>noon|midnight))")
+TOMORROW_RE = re.compile(r"\btomorrow\b")
+PREFIX_RE = re.compile(r"^.*?\b(?:remind me|set (?:a |me a )?reminder)\b\s*")
+
+
+def parse_number(word: str) -> int:
+    """Value of a number matched by NUMBER_PATTERN; tens and units add up"""
+    if word.isdigit():
+        return int(word)
+    return sum(TENS_WORDS.get(part) or NUMBER_WORDS[part] for part in re.split(r"[ -]", word))
+
+
+@dataclass
+class ParsedReminder:
+    text: str
+    due: float                         # epoch seconds
+    interval: Optional[float] = None   # seconds between recurrences
+    when: str = ""                     # the time phrase as spoken
+
+
+def _next_time_of_day(now: datetime.datetime, hour: int, minute: int, ampm: Optional[str],
+                      tomorrow: bool) -> datetime.datetime:
+    if ampm == "a" and hour == 12:
+        hour = 0
+    elif ampm == "p" and hour < 12:
+        hour += 12
+    candidates = [hour]
+    if ampm is None and 1 <= hour < 12:
+        candidates.append(hour + 12)  # "at 5" means whichever 5 o'clock comes next
+    start = now + datetime.timedelta(days=1) if tomorrow else now
+    options = []
+    for candidate in candidates:
+        at = start.replace(hour=candidate % 24, minute=minute, second=0, microsecond=0)
+        if tomorrow and ampm is None and candidate != hour:
+            continue  # "tomorrow at 9" is the morning
+        if at <= now:
+            at += datetime.timedelta(days=1)
+        options.append(at)
+    return min(options)
+
+
+def parse_reminder(command: str, now: Optional[datetime.datetime] = None) -> Optional[ParsedReminder]:
+    """Split "remind me to X <time>" into text and due time; None if no time was given"""
+    now = now or datetime.datetime.now()
+    body = PREFIX_RE.sub("", command.lower().strip(), count=1)
+    spans: List[Tuple[int, int]] = []
+    interval = None
+    due = None
+
+    every = EVERY_RE.search(body)
+    if every:
+        spans.append(every.span())
+        count = parse_number(every.group(1)) if every.group(1) else 1
+        unit = every.group(2) or {"daily": "day", "hourly": "hour", "weekly": "week"}[every.group(3)]
+        interval = float(count * UNIT_SECONDS[unit])
+
+    tomorrow = TOMORROW_RE.search(body)
+    if tomorrow:
+        spans.append(tomorrow.span())
+
+    at = AT_RE.search(body)
+    after = IN_RE.search(body)
+    if at:
+        spans.append(at.span())
+        if at.group("named"):
+            hour, minute, ampm = (12, 0, None) if at.group("named") == "noon" else (0, 0, "a")
+        else:
+            hour, minute, ampm = int(at.group("hour")), int(at.group("minute") or 0), at.group("ampm")
+        if hour > 23 or minute > 59:
+            return None
+        due = _next_time_of_day(now, hour, minute, ampm, tomorrow is not None)
+    elif after:
+        spans.append(after.span())
+        due = now + datetime.timedelta(seconds=parse_number(after.group(1)) * UNIT_SECONDS[after.group(2)])
+    elif interval:
+        due = now + datetime.timedelta(seconds=interval)
+    elif tomorrow:
+        due = now + datetime.timedelta(days=1)
+    else:
+        return None
+
+    text = body
+    for start, end in sorted(spans, reverse=True):
+        text = text[:start] + " " + text[end:]
+    text = re.sub(r"^(?:(?:for|to|about|that|of)\s+)+", "", " ".join(text.split())).strip(" .,")
+    text = re.sub(r"\s+(?:to|about)$", "", text)
+    when = " ".join(body[start:end] for start, end in sorted(spans))
+    return ParsedReminder(text, due.timestamp(), interval, when)
+
+
+def describe_due(due: float, now: float, interval: Optional[float] = None) -> str:
+    """Short spoken description such as 'in 20 minutes' or 'tomorrow at 9:00 AM'"""
+    if interval:
+        units = [(604800, "week"), (86400, "day"), (3600, "hour"), (60, "minute"), (1, "second")]
+        seconds, unit = next((s, u) for s, u in units if interval % s == 0)
+        count = int(interval // seconds)
+        every = f"every {unit}" if count == 1 else f"every {count} {unit}s"
+        if interval % 86400 == 0:
+            return f"{every} at {datetime.datetime.fromtimestamp(due).strftime('%I:%M %p').lstrip('0')}"
+        return every
+    minutes = max(1, round((due - now) / 60))
+    if minutes < 60:
+        return f"in {minutes} minute{'s' if minutes != 1 else ''}"
+    if minutes % 60 == 0 and minutes <= 12 * 60:
+        hours = minutes // 60
+        return f"in {hours} hour{'s' if hours != 1 else ''}"
+    at = datetime.datetime.fromtimestamp(due)
+    clock = at.strftime('%I:%M %p').lstrip('0')
+    today = datetime.datetime.fromtimestamp(now).date()
+    if at.date() == today:
+        return f"at {clock}"
+    if at.date() == today + datetime.timedelta(days=1):
+        return f"tomorrow at {clock}"
+    return f"on {at.strftime('%A')} at {clock}"
+
+
+@dataclass
+class Reminder:
+    id: int
+    text: str
+    due: float
+    interval: Optional[float] = None
+
+
+class ReminderScheduler:
+    """One heap of due times, one worker thread and an append-only journal"""
+
+    def __init__(self, on_due: Callable[[Reminder], None], journal_path: Optional[str] = None,
+                 clock: Callable[[], float] = time.time):
+        self.on_due = on_due
+        self.clock = clock
+        self.journal_path = Path(journal_path) if journal_path else None
+        self.fired = 0
+        self._heap: List[Tuple[float, int]] = []
+        self._reminders: Dict[int, Reminder] = {}
+        self._ids = itertools.count(1)
+        self._cond = threading.Condition()
+        self._running = False
+        self._thread: Optional[threading.Thread] = None
+        self._journal = None
+        self._journal_records = 0
+        self.compactions = 0
+        if self.journal_path:
+            self._replay()
+
+    # Journal
+    def _replay(self):
+        last_id = 0
+        try:
+            with open(self.journal_path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        continue  # torn write from a crash
+                    op = entry.pop("op")
+                    if op == "add":
+                        reminder = Reminder(**entry)
+                        self._reminders[reminder.id] = reminder
+                        last_id = max(last_id, reminder.id)
+                    elif op == "due" and entry["id"] in self._reminders:
+                        self._reminders[entry["id"]].due = entry["due"]
+                    elif op in ("done", "cancel"):
+                        self._reminders.pop(entry["id"], None)
+        except FileNotFoundError:
+            pass
+        self._ids = itertools.count(last_id + 1)
+        self._compact()
+        if self._reminders:
+            logger.info(f"Restored {len(self._reminders)} pending reminders")
+
+    def _purge_heap(self):
+        """Rebuild the heap from the live reminders, dropping entries left by cancels"""
+        self._heap = [(r.due, r.id) for r in self._reminders.values()]
+        heapq.heapify(self._heap)
+
+    def _compact(self):
+        """Rewrite the journal with only the live reminders, and drop dead heap entries with it"""
+        self._purge_heap()
+        if self._journal is not None:
+            self._journal.close()
+        temp_path = self.journal_path.with_suffix(".tmp")
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            for reminder in self._reminders.values():
+                f.write(json.dumps({"op": "add", **asdict(reminder)}) + "\n")
+        os.replace(temp_path, self.journal_path)
+        self._journal = open(self.journal_path, 'a', encoding='utf-8')
+        self._journal_records = len(self._reminders)
+        self.compactions += 1
+
+    def _log(self, op: str, **fields):
+        """Append one change; called with the lock held, so compacting here is safe"""
+        if self._journal is not None:
+            self._journal.write(json.dumps({"op": op, **fields}) + "\n")
+            self._journal.flush()
+            self._journal_records += 1
+            dead = self._journal_records - len(self._reminders)
+            if dead > max(COMPACT_MIN_DEAD, len(self._reminders)):
+                self._compact()
+
+    # Scheduling
+    def add(self, text: str, due: float, interval: Optional[float] = None) -> Reminder:
+        with self._cond:
+            reminder = Reminder(next(self._ids), text, due, interval)
+            self._reminders[reminder.id] = reminder
+            heapq.heappush(self._heap, (due, reminder.id))
+            self._log("add", **asdict(reminder))
+            if self._heap[0][1] == reminder.id:
+                self._cond.notify()  # new earliest deadline
+            return reminder
+
+    def cancel(self, reminder_id: int) -> bool:
+        """Cancel one reminder; its heap entry is skipped lazily until dead entries outnumber live ones"""
+        with self._cond:
+            if self._reminders.pop(reminder_id, None) is None:
+                return False
+            self._log("cancel", id=reminder_id)
+            dead = len(self._heap) - len(self._reminders)
+            if dead > max(COMPACT_MIN_DEAD, len(self._reminders)):
+                self._purge_heap()  # without a journal nothing else would
+            return True
+
+    def cancel_matching(self, text: str = "") -> List[Reminder]:
+        """Cancel every pending reminder whose text contains ``text`` (all of them if empty)"""
+        with self._cond:
+            matches = [r for r in self._reminders.values() if text.lower() in r.text.lower()]
+        return [r for r in matches if self.cancel(r.id)]
+
+    def pending(self) -> List[Reminder]:
+        with self._cond:
+            return sorted(self._reminders.values(), key=lambda r: r.due)
+
+    def _collect_due(self, now: float) -> List[Reminder]:
+        fired = []
+        while self._heap and self._heap[0][0] <= now:
+            due, reminder_id = heapq.heappop(self._heap)
+            reminder = self._reminders.get(reminder_id)
+            if reminder is None or reminder.due != due:
+                continue  # cancelled or rescheduled
+            fired.append(Reminder(reminder.id, reminder.text, due, reminder.interval))
+            if reminder.interval:
+                # Skip occurrences missed while the assistant was off instead of replaying them all
+                missed = max(1, int((now - due) // reminder.interval) + 1)
+                reminder.due = due + missed * reminder.interval
+                heapq.heappush(self._heap, (reminder.due, reminder.id))
+                self._log("due", id=reminder.id, due=reminder.due)
+            else:
+                del self._reminders[reminder_id]
+                self._log("done", id=reminder_id)
+        return fired
+
+    def _fire(self, reminders: List[Reminder]):
+        for reminder in reminders:
+            self.fired += 1
+            try:
+                self.on_due(reminder)
+            except Exception as e:
+                logger.error(f"Reminder callback failed: {e}")
+
+    def run_due(self, now: Optional[float] = None) -> int:
+        """Fire everything due at ``now`` on the calling thread; used with a fake clock"""
+        with self._cond:
+            fired = self._collect_due(self.clock() if now is None else now)
+        self._fire(fired)
+        return len(fired)
+
+    def start(self):
+        if self._running:
+            return
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name="reminders", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                if not self._running:
+                    return
+                fired = self._collect_due(self.clock())
+                if not fired:
+                    # Re-check at least once a minute in case the wall clock jumps
+                    timeout = 60.0 if not self._heap else min(60.0, max(0.0, self._heap[0][0] - self.clock()))
+                    self._cond.wait(timeout)
+                    continue
+            self._fire(fired)
+
+    def stop(self):
+        with self._cond:
+            self._running = False
+            self._cond.notify()
+        if self._thread and self._thread is not threading.current_thread():
+            self._thread.join(timeout=2)
+        if self._journal is not None:
+            self._journal.close()
+            self._journal = None
+
+    def stats(self) -> dict:
+        with self._cond:
+            return {"pending": len(self._reminders), "heap_entries": len(self._heap), "fired": self.fired,
+                    "journal_records": self._journal_records, "compactions": self.compactions}
+
+
+class FakeClock:
+    def __init__(self, now: float = 0.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def benchmark(count: int = 100_000, horizon: float = 86400.0, step: float = 1.0,
+              journal_path: Optional[str] = None) -> dict:
+    """Schedule ``count`` reminders over ``horizon`` seconds of fake time and fire them all"""
+    import random
+    rng = random.Random(1)
+    clock = FakeClock(1_000_000.0)
+    lateness = []
+    one_shots = [0]
+
+    def on_due(reminder: Reminder):
+        lateness.append(clock.now - reminder.due)
+        if reminder.interval is None:
+            one_shots[0] += 1
+
+    tracemalloc.start()
+    scheduler = ReminderScheduler(on_due, journal_path, clock=clock)
+    started = time.perf_counter()
+    ids = [scheduler.add(f"reminder {i}", clock.now + rng.uniform(0, horizon),
+                         interval=3600.0 if i % 100 == 0 else None).id for i in range(count)]
+    schedule_seconds = time.perf_counter() - started
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    for reminder_id in ids[1::10]:
+        scheduler.cancel(reminder_id)
+
+    dispatch_seconds = 0.0
+    end = clock.now + horizon
+    while clock.now < end:
+        clock.now += step
+        started = time.perf_counter()
+        scheduler.run_due()
+        dispatch_seconds += time.perf_counter() - started
+    stats = scheduler.stats()
+    scheduler.stop()
+    return {
+        "reminders": count,
+        "schedule_us_each": round(schedule_seconds / count * 1e6, 2),
+        "memory_mb": round(current / 1e6, 1),
+        "peak_memory_mb": round(peak / 1e6, 1),
+        "fired": len(lateness),
+        "one_shots_fired": one_shots[0],
+        "one_shots_expected": sum(1 for i in range(count) if i % 100 and i % 10 != 1),
+        "max_lateness_s": round(max(lateness), 3) if lateness else None,
+        "dispatch_us_per_reminder": round(dispatch_seconds / max(1, len(lateness)) * 1e6, 2),
+        **stats,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the reminder scheduler or parse a reminder")
+    parser.add_argument("--count", type=int, default=100_000)
+    parser.add_argument("--journal", help="journal file to write during the benchmark")
+    parser.add_argument("--parse", help="parse a spoken reminder and print the result")
+    args = parser.parse_args()
+
+    if args.parse:
+        parsed = parse_reminder(args.parse)
+        print(parsed and {**asdict(parsed), "due_at": datetime.datetime.fromtimestamp(parsed.due).isoformat(),
+                          "spoken": describe_due(parsed.due, time.time(), parsed.interval)})
+    else:
+        print(benchmark(args.count, journal_path=args.journal))
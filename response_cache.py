@@ -0,0 +1,233 @@
+"""TTL cache for Beastboy's service lookups.
+
+Weather, stock quotes, Wikipedia summaries and translations are cached per
+service with their own time-to-live. Within the TTL an answer is served
+straight from memory; for a further ``stale`` window the old answer is
+still returned immediately while a background refresh fetches a new one
+(stale-while-revalidate). Entries are evicted least recently used beyond
+``max_entries`` and can be written through to a SQLite file so the cache
+survives restarts. Values must be JSON-serializable; a fetch that raises is
+never cached.
+"""
+
+import argparse
+import json
+import logging
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class CachePolicy:
+    ttl: float          # seconds an answer is fresh
+    stale: float = 0.0  # further seconds it may be served while refreshing
+
+    @classmethod
+    def from_dict(cls, values: Dict[str, Any]) -> "CachePolicy":
+        return cls(float(values.get("ttl", 0)), float(values.get("stale", 0)))
+
+
+DEFAULT_POLICIES = {
+    "stock": CachePolicy(ttl=60, stale=240),
+    "weather": CachePolicy(ttl=600, stale=1800),
+    "wikipedia": CachePolicy(ttl=7 * 86400, stale=30 * 86400),
+    "translation": CachePolicy(ttl=30 * 86400, stale=0),
+}
+
+
+@dataclass
+class _Entry:
+    value: Any
+    stored_at: float
+
+
+def _spawn(task: Callable[[], None]):
+    threading.Thread(target=task, name="cache-refresh", daemon=True).start()
+
+
+class ResponseCache:
+    """Per-service TTL cache with LRU eviction, SQLite persistence and stale-while-revalidate"""
+
+    def __init__(self, policies: Optional[Dict[str, CachePolicy]] = None, max_entries: int = 512,
+                 path: Optional[str] = None, clock: Callable[[], float] = time.time,
+                 submit: Callable[[Callable[[], None]], Any] = _spawn):
+        self.policies = dict(DEFAULT_POLICIES)
+        self.policies.update(policies or {})
+        self.max_entries = max_entries
+        self.clock = clock
+        self.submit = submit
+        self._entries: "OrderedDict[Tuple[str, str], _Entry]" = OrderedDict()
+        self._refreshing = set()
+        self._lock = threading.Lock()
+        self._stats: Dict[str, Dict[str, int]] = {}
+        self._db: Optional[sqlite3.Connection] = None
+        if path:
+            self._open_db(path)
+
+    @staticmethod
+    def normalize(key: str) -> str:
+        return " ".join(key.lower().split())
+
+    def _count(self, service: str, event: str):
+        counts = self._stats.setdefault(service, {"hits": 0, "stale_hits": 0, "misses": 0, "refreshes": 0})
+        counts[event] += 1
+
+    def _open_db(self, path: str):
+        try:
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute("CREATE TABLE IF NOT EXISTS entries (service TEXT, key TEXT, value TEXT, "
+                             "stored_at REAL, PRIMARY KEY (service, key))")
+            rows = self._db.execute("SELECT service, key, value, stored_at FROM entries "
+                                    "ORDER BY stored_at DESC LIMIT ?", (self.max_entries,)).fetchall()
+        except sqlite3.Error as e:
+            logger.warning(f"Response cache persistence disabled: {e}")
+            self._db = None
+            return
+        for service, key, value, stored_at in reversed(rows):
+            self._entries[(service, key)] = _Entry(json.loads(value), stored_at)
+
+    def _persist(self, service: str, key: str, entry: _Entry):
+        if self._db is None:
+            return
+        try:
+            with self._db:
+                self._db.execute("INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?)",
+                                 (service, key, json.dumps(entry.value), entry.stored_at))
+        except (sqlite3.Error, TypeError, ValueError) as e:
+            logger.warning(f"Failed to persist cached {service} response: {e}")
+
+    def _forget(self, service: str, key: str):
+        if self._db is None:
+            return
+        try:
+            with self._db:
+                self._db.execute("DELETE FROM entries WHERE service = ? AND key = ?", (service, key))
+        except sqlite3.Error as e:
+            logger.warning(f"Failed to evict cached {service} response: {e}")
+
+    def put(self, service: str, key: str, value: Any):
+        key = self.normalize(key)
+        entry = _Entry(value, self.clock())
+        with self._lock:
+            self._entries[(service, key)] = entry
+            self._entries.move_to_end((service, key))
+            self._persist(service, key, entry)
+            while len(self._entries) > self.max_entries:
+                (old_service, old_key), _ = self._entries.popitem(last=False)
+                self._forget(old_service, old_key)
+
+    def get_or_fetch(self, service: str, key: str, fetch: Callable[[], Any]) -> Any:
+        """Cached value for ``key``, calling ``fetch()`` on a miss; exceptions from fetch propagate"""
+        policy = self.policies.get(service)
+        if policy is None or policy.ttl <= 0:
+            return fetch()
+        key = self.normalize(key)
+        refresh = False
+        with self._lock:
+            entry = self._entries.get((service, key))
+            age = None if entry is None else self.clock() - entry.stored_at
+            if age is not None and age < policy.ttl:
+                self._entries.move_to_end((service, key))
+                self._count(service, "hits")
+                return entry.value
+            stale = age is not None and age < policy.ttl + policy.stale
+            if stale:
+                self._entries.move_to_end((service, key))
+                self._count(service, "stale_hits")
+                refresh = (service, key) not in self._refreshing
+                if refresh:
+                    self._refreshing.add((service, key))
+            else:
+                self._count(service, "misses")
+        if stale:
+            if refresh:
+                self.submit(lambda: self._refresh(service, key, fetch))
+            return entry.value
+        value = fetch()
+        self.put(service, key, value)
+        return value
+
+    def _refresh(self, service: str, key: str, fetch: Callable[[], Any]):
+        try:
+            self.put(service, key, fetch())
+            with self._lock:
+                self._count(service, "refreshes")
+        except Exception as e:
+            logger.warning(f"Background refresh of {service} '{key}' failed: {e}")
+        finally:
+            with self._lock:
+                self._refreshing.discard((service, key))
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            if self._db is not None:
+                with self._db:
+                    self._db.execute("DELETE FROM entries")
+
+    def close(self):
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"entries": len(self._entries), "services": {k: dict(v) for k, v in self._stats.items()}}
+
+
+class FakeClock:
+    """Manually advanced clock for exercising TTLs"""
+
+    def __init__(self, now: float = 0.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+    def advance(self, seconds: float):
+        self.now += seconds
+
+
+def demo(path: Optional[str] = None) -> dict:
+    """Walk one stock quote through fresh, stale and expired states with a slow fake upstream"""
+    clock = FakeClock()
+    calls = []
+
+    def fetch():
+        time.sleep(0.05)  # a slow upstream such as yfinance
+        calls.append(clock.now)
+        return {"price": 100 + len(calls)}
+
+    cache = ResponseCache(max_entries=4, path=path, clock=clock)
+    report = {"loaded": cache.stats()["entries"]}
+    cache.clear()
+    timings = {}
+    for label, advance in [("miss", 0), ("fresh", 30), ("stale", 60), ("refreshed", 1), ("expired", 400)]:
+        clock.advance(advance)
+        started = time.perf_counter()
+        value = cache.get_or_fetch("stock", "AAPL", fetch)
+        timings[label] = {"ms": round((time.perf_counter() - started) * 1000, 2), "value": value}
+        while cache._refreshing:
+            time.sleep(0.01)
+    for i in range(6):
+        cache.put("weather", f"city {i}", {"temp": i})
+    report.update({"timings": timings, "upstream_calls": len(calls), **cache.stats()})
+    cache.close()
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Exercise the Beastboy response cache with a fake clock")
+    parser.add_argument("--db", help="SQLite file to persist into")
+    args = parser.parse_args()
+    report = demo(args.db)
+    for label, row in report.pop("timings").items():
+        print(f"{label:>9}: {row}")
+    print(report)
@@ -0,0 +1,554 @@
+"""Typed, validated and hot-reloadable configuration for Beastboy.
+
+``config.json`` is checked against a schema built from ``DEFAULT_CONFIG``:
+every known key must have the default's type, and ``RULES`` add ranges and
+allowed values. Missing keys take their defaults and unknown keys are kept
+with a warning. Mappings such as ``cache.services`` take entries of any
+name, each checked against one shape. ``ConfigWatcher`` polls the file and hands a fully validated
+``Settings`` object to a callback. A file with any error is rejected as a
+whole, so a half-saved or mistyped edit never leaves the assistant with a
+mix of old and new values.
+"""
+
+import argparse
+import copy
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from dataclasses import dataclass, field, fields
+from typing import Any, Callable, Dict, List, Optional, Sequence, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CONFIG = {
+    "api_keys": {
+        "openai_api_key": "your-openai-api-key-here"
+    },
+    "ai": {
+        "api_base": "https://api.openai.com/v1",
+        "model": "gpt-3.5-turbo",
+        "stream": True,
+        "max_tokens": 150,
+        "temperature": 0.7,
+        "context_tokens": 1200,
+        "context_turns": 16
+    },
+    "voice_settings": {
+        "rate": 200,
+        "volume": 0.9,
+        "voice_index": 1
+    },
+    "features": {
+        "weather_enabled": False,
+        "news_enabled": False,
+        "advanced_ai_enabled": True,
+        "translation_enabled": True,
+        "wikipedia_enabled": True,
+        "stocks_enabled": True,
+        "music_enabled": False,
+        "email_enabled": False
+    },
+    "system": {
+        "default_language": "en",
+        "wake_words": ["hey bb", "bb", "hey b b", "b b", "beasty", "hey beasty", "beastboy"],
+        "wake_word_detector": "template",
+        "wake_word_templates": "wake_words",
+        "wake_word_threshold": 0.6,
+        "wake_word_fallback": True,
+        "session_timeout": 300,
+        "background_mode": True,
+        "minimize_to_tray": True,
+        "config_poll_seconds": 1.0
+    },
+    "pipeline": {
+        "queue_size": 4,
+        "max_workers": 4
+    },
+    "reminders": {
+        "journal": "reminders.jsonl"
+    },
+    "language_id": {
+        "enabled": True,
+        "min_chars": 10,
+        "min_margin": 0.1
+    },
+    "apps": {
+        "index_path": "app_index.json",
+        "min_score": 0.5
+    },
+    "system_monitor": {
+        "enabled": True,
+        "interval_seconds": 2.0,
+        "retention_minutes": 60.0,
+        "disk_path": "/",
+        "top_processes": 3,
+        "process_every": 5
+    },
+    "logging": {
+        "path": "beastboy.log",
+        "level": "INFO",
+        "json": True,
+        "console": True,
+        "max_mb": 10,
+        "rotate_hours": 24,
+        "backups": 7,
+        "compress": True,
+        "queue_size": 10000,
+        "rate_limit_burst": 5,
+        "rate_limit_seconds": 60
+    },
+    "metrics": {
+        "enabled": True,
+        "port": 9464,
+        "tracing": False,
+        "dump_path": "metrics.json"
+    },
+    "startup": {
+        "wait_for_tts": False,
+        "budget_ms": 1500
+    },
+    "dispatch": {
+        "deadline_seconds": 4.0,
+        "local_confidence": 0.75,
+        "max_workers": 4
+    },
+    "http": {
+        "limit_per_host": 4,
+        "keepalive_seconds": 30,
+        "connect_timeout": 3,
+        "total_timeout": 10,
+        "retries": 2
+    },
+    "cache": {
+        "enabled": True,
+        "max_entries": 512,
+        "path": "response_cache.sqlite3",
+        "services": {
+            "stock": {"ttl": 60, "stale": 240},
+            "weather": {"ttl": 600, "stale": 1800},
+            "wikipedia": {"ttl": 604800, "stale": 2592000},
+            "translation": {"ttl": 2592000, "stale": 0}
+        }
+    },
+    "tts_cache": {
+        "enabled": True,
+        "directory": "tts_cache",
+        "max_mb": 50
+    },
+    "asr": {
+        "engine": "google",
+        "vosk_model_path": "models/vosk-model-small-en-us-0.15"
+    },
+    "rescoring": {
+        "enabled": True,
+        "alternatives": 5,
+        "entities": "data/entities.json"
+    },
+    "vad": {
+        "frame_ms": 20,
+        "start_ratio": 3.0,
+        "end_ratio": 2.0,
+        "min_speech_ms": 60,
+        "hangover_ms": 400,
+        "noise_alpha": 0.05,
+        "speech_noise_alpha": 0.0025,
+        "min_noise_floor": 30.0,
+        "warmup_ms": 200,
+        "preroll_ms": 200,
+        "use_spectral": True,
+        "max_flatness": 0.45
+    }
+}
+
+
+@dataclass
+class Rule:
+    """Constraints beyond the type of the default value"""
+    minimum: Optional[float] = None
+    maximum: Optional[float] = None
+    choices: Optional[Sequence[Any]] = None
+    non_empty: bool = False
+
+
+RULES: Dict[str, Rule] = {
+    "ai.max_tokens": Rule(1, 4096),
+    "ai.temperature": Rule(0.0, 2.0),
+    "ai.context_tokens": Rule(100, 100000),
+    "ai.context_turns": Rule(1, 200),
+    "voice_settings.rate": Rule(50, 400),
+    "voice_settings.volume": Rule(0.0, 1.0),
+    "voice_settings.voice_index": Rule(0, 64),
+    "system.wake_words": Rule(non_empty=True),
+    "system.wake_word_detector": Rule(choices=("template", "transcript")),
+    "system.wake_word_threshold": Rule(0.0, 1.0),
+    "system.session_timeout": Rule(10, 86400),
+    "system.config_poll_seconds": Rule(0.1, 60),
+    "pipeline.queue_size": Rule(1, 64),
+    "pipeline.max_workers": Rule(1, 32),
+    "startup.budget_ms": Rule(0, 60000),
+    "language_id.min_chars": Rule(0, 1000),
+    "language_id.min_margin": Rule(0.0, 10.0),
+    "apps.min_score": Rule(0.0, 1.0),
+    "system_monitor.interval_seconds": Rule(0.1, 3600),
+    "system_monitor.retention_minutes": Rule(1, 10080),
+    "system_monitor.top_processes": Rule(0, 100),
+    "system_monitor.process_every": Rule(1, 10000),
+    "logging.level": Rule(choices=("DEBUG", "INFO", "WARNING", "ERROR")),
+    "logging.max_mb": Rule(0.01, 100000),
+    "logging.rotate_hours": Rule(0, 8760),
+    "logging.backups": Rule(0, 1000),
+    "logging.queue_size": Rule(10, 10000000),
+    "logging.rate_limit_burst": Rule(0, 100000),
+    "logging.rate_limit_seconds": Rule(0, 86400),
+    "metrics.port": Rule(0, 65535),
+    "dispatch.deadline_seconds": Rule(0.1, 60),
+    "dispatch.local_confidence": Rule(0.0, 1.0),
+    "dispatch.max_workers": Rule(1, 32),
+    "http.retries": Rule(0, 10),
+    "cache.max_entries": Rule(1, 1000000),
+    "tts_cache.max_mb": Rule(0, 100000),
+    "asr.engine": Rule(choices=("google", "vosk")),
+    "rescoring.alternatives": Rule(1, 10),
+    "cache.services.*.ttl": Rule(0, 31536000),
+    "cache.services.*.stale": Rule(0, 31536000),
+    "vad.frame_ms": Rule(5, 100),
+    "vad.start_ratio": Rule(1.0, 100.0),
+    "vad.end_ratio": Rule(1.0, 100.0),
+    "vad.min_speech_ms": Rule(0, 5000),
+    "vad.hangover_ms": Rule(0, 10000),
+    "vad.noise_alpha": Rule(0.0, 1.0),
+    "vad.speech_noise_alpha": Rule(0.0, 1.0),
+    "vad.min_noise_floor": Rule(0.0, 32767.0),
+    "vad.warmup_ms": Rule(0, 60000),
+    "vad.preroll_ms": Rule(0, 5000),
+    "vad.max_flatness": Rule(0.0, 1.0),
+}
+
+# Free-form mappings whose entries are not checked against the defaults
+OPEN_KEYS = {"api_keys"}
+# Mappings with entries of any name but one shape; RULES address their fields as "<key>.*.<field>"
+ENTRY_SCHEMAS = {"cache.services": {"ttl": 0, "stale": 0}}
+
+
+class ConfigError(ValueError):
+    """config.json could not be read or failed validation"""
+
+    def __init__(self, errors: List[str]):
+        super().__init__("; ".join(errors))
+        self.errors = errors
+
+
+@dataclass(frozen=True)
+class VoiceSettings:
+    rate: int = 200
+    volume: float = 0.9
+    voice_index: int = 1
+
+    @classmethod
+    def from_dict(cls, values: Dict[str, Any]) -> "VoiceSettings":
+        known = {f.name for f in fields(cls)}
+        return cls(**{k: v for k, v in values.items() if k in known})
+
+
+@dataclass(frozen=True)
+class SystemSettings:
+    default_language: str = "en"
+    wake_words: Tuple[str, ...] = ()
+    wake_word_detector: str = "template"
+    wake_word_templates: str = "wake_words"
+    wake_word_threshold: float = 0.6
+    wake_word_fallback: bool = True
+    session_timeout: float = 300
+    background_mode: bool = True
+    minimize_to_tray: bool = True
+
+    @classmethod
+    def from_dict(cls, values: Dict[str, Any]) -> "SystemSettings":
+        known = {f.name for f in fields(cls)}
+        values = {k: v for k, v in values.items() if k in known}
+        values["wake_words"] = tuple(word.lower().strip() for word in values.get("wake_words", ()))
+        return cls(**values)
+
+
+@dataclass(frozen=True)
+class FeatureSettings:
+    weather_enabled: bool = False
+    news_enabled: bool = False
+    advanced_ai_enabled: bool = True
+    translation_enabled: bool = True
+    wikipedia_enabled: bool = True
+    stocks_enabled: bool = True
+    music_enabled: bool = False
+    email_enabled: bool = False
+
+    @classmethod
+    def from_dict(cls, values: Dict[str, Any]) -> "FeatureSettings":
+        known = {f.name for f in fields(cls)}
+        return cls(**{k: v for k, v in values.items() if k in known})
+
+
+@dataclass(frozen=True)
+class Settings:
+    """A validated configuration: the plain dict plus typed views of the live-applied sections"""
+    data: Dict[str, Any]
+    voice: VoiceSettings
+    system: SystemSettings
+    features: FeatureSettings
+    warnings: Tuple[str, ...] = field(default=())
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any], warnings: Sequence[str] = ()) -> "Settings":
+        return cls(data, VoiceSettings.from_dict(data["voice_settings"]),
+                   SystemSettings.from_dict(data["system"]), FeatureSettings.from_dict(data["features"]),
+                   tuple(warnings))
+
+
+def _type_error(key: str, value: Any, default: Any) -> Optional[str]:
+    expected = type(default)
+    if expected is bool:
+        ok = isinstance(value, bool)
+    elif expected is int:
+        ok = isinstance(value, int) and not isinstance(value, bool)
+    elif expected is float:
+        ok = isinstance(value, (int, float)) and not isinstance(value, bool)
+    elif expected is str:
+        ok = value is None or isinstance(value, str)  # null disables optional paths
+    elif expected is list:
+        ok = isinstance(value, list) and (not default or all(isinstance(v, type(default[0])) for v in value))
+    else:
+        ok = isinstance(value, expected)
+    if ok:
+        return None
+    name = expected.__name__ if expected is not list or not default else f"list of {type(default[0]).__name__}"
+    return f"{key}: expected {name}, got {json.dumps(value)}"
+
+
+def _rule_error(key: str, value: Any, rule: Rule) -> Optional[str]:
+    if rule.non_empty and not value:
+        return f"{key}: must not be empty"
+    if rule.choices is not None and value not in rule.choices:
+        return f"{key}: must be one of {', '.join(map(str, rule.choices))}, got {json.dumps(value)}"
+    if rule.minimum is not None and value < rule.minimum:
+        return f"{key}: must be at least {rule.minimum}, got {value}"
+    if rule.maximum is not None and value > rule.maximum:
+        return f"{key}: must be at most {rule.maximum}, got {value}"
+    return None
+
+
+def _rule(path: str) -> Optional[Rule]:
+    if path in RULES:
+        return RULES[path]
+    for key in ENTRY_SCHEMAS:
+        if path.startswith(key + "."):
+            _, _, field_name = path[len(key) + 1:].partition(".")
+            return RULES.get(f"{key}.*.{field_name}")
+    return None
+
+
+def _merge_entries(defaults: Dict[str, Any], values: Any, prefix: str,
+                   errors: List[str], warnings: List[str]) -> Dict[str, Any]:
+    """An open mapping: entries may have any name, but each must match ENTRY_SCHEMAS[prefix]"""
+    if not isinstance(values, dict):
+        errors.append(f"{prefix}: expected an object, got {json.dumps(values)}")
+        return copy.deepcopy(defaults)
+    merged = copy.deepcopy(defaults)
+    for name, entry in values.items():
+        schema = defaults.get(name, ENTRY_SCHEMAS[prefix])
+        merged[name] = _merge(schema, entry, f"{prefix}.{name}", errors, warnings)
+    return merged
+
+
+def _merge(defaults: Dict[str, Any], values: Any, prefix: str,
+           errors: List[str], warnings: List[str]) -> Dict[str, Any]:
+    if not isinstance(values, dict):
+        errors.append(f"{prefix or 'config'}: expected an object, got {json.dumps(values)}")
+        return copy.deepcopy(defaults)
+    merged = copy.deepcopy(defaults)
+    for key, value in values.items():
+        path = f"{prefix}.{key}" if prefix else key
+        if key not in defaults:
+            if prefix not in OPEN_KEYS:
+                warnings.append(f"{path}: unknown setting")
+            merged[key] = value
+            continue
+        default = defaults[key]
+        if isinstance(default, dict) and path in ENTRY_SCHEMAS:
+            merged[key] = _merge_entries(default, value, path, errors, warnings)
+            continue
+        if isinstance(default, dict) and path not in OPEN_KEYS:
+            merged[key] = _merge(default, value, path, errors, warnings)
+            continue
+        error = _type_error(path, value, default)
+        rule = _rule(path)
+        if error is None and rule is not None and value is not None:
+            error = _rule_error(path, value, rule)
+        if error is None:
+            merged[key] = value
+        else:
+            errors.append(error)
+    return merged
+
+
+def validate(values: Any) -> Tuple[Dict[str, Any], List[str], List[str]]:
+    """(config with defaults filled in, errors, warnings); invalid values are replaced by defaults"""
+    errors: List[str] = []
+    warnings: List[str] = []
+    merged = _merge(DEFAULT_CONFIG, values, "", errors, warnings)
+    return merged, errors, warnings
+
+
+def write_atomic(path: str, values: Dict[str, Any]):
+    """Write JSON through a temporary file so readers never see a partial file"""
+    directory = os.path.dirname(os.path.abspath(path))
+    handle, temporary = tempfile.mkstemp(prefix=".config-", suffix=".json", dir=directory)
+    try:
+        with os.fdopen(handle, 'w') as f:
+            json.dump(values, f, indent=4)
+        os.replace(temporary, path)
+    except BaseException:
+        os.unlink(temporary)
+        raise
+
+
+def load_settings(path: str, strict: bool = False) -> Settings:
+    """Read and validate ``path``, creating it with defaults if missing.
+
+    With ``strict`` any error raises ConfigError (used for reloads, so a bad
+    edit is rejected as a whole); otherwise errors are logged and the
+    affected values fall back to their defaults.
+    """
+    if not os.path.exists(path):
+        write_atomic(path, DEFAULT_CONFIG)
+        logger.info(f"Created default {path}")
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            values = json.load(f)
+    except (OSError, ValueError) as e:
+        if strict:
+            raise ConfigError([f"{path}: {e}"]) from None
+        logger.error(f"Failed to load config: {e}")
+        values = {}
+    data, errors, warnings = validate(values)
+    if errors and strict:
+        raise ConfigError(errors)
+    for error in errors:
+        logger.error(f"Invalid setting, using the default: {error}")
+    for warning in warnings:
+        logger.warning(f"Config: {warning}")
+    return Settings.from_dict(data, warnings)
+
+
+def changed_keys(old: Dict[str, Any], new: Dict[str, Any], prefix: str = "") -> Set[str]:
+    """Dotted paths whose values differ between two configs"""
+    changed = set()
+    for key in set(old) | set(new):
+        path = f"{prefix}.{key}" if prefix else key
+        before, after = old.get(key), new.get(key)
+        if isinstance(before, dict) and isinstance(after, dict):
+            changed |= changed_keys(before, after, path)
+        elif before != after:
+            changed.add(path)
+    return changed
+
+
+class ConfigWatcher:
+    """Polls config.json and passes each valid new version to ``on_change(settings, changed)``"""
+
+    def __init__(self, path: str, current: Settings,
+                 on_change: Callable[[Settings, Set[str]], None], interval: float = 1.0):
+        self.path = path
+        self.current = current
+        self.on_change = on_change
+        self.interval = interval
+        self.reloads = 0
+        self.rejected = 0
+        self.last_error: Optional[str] = None
+        self._signature = self._stat()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _stat(self) -> Optional[Tuple[int, int]]:
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def check(self) -> bool:
+        """Poll once; True if a new configuration was applied"""
+        signature = self._stat()
+        if signature is None or signature == self._signature:
+            return False
+        self._signature = signature
+        try:
+            settings = load_settings(self.path, strict=True)
+        except ConfigError as e:
+            # Keep running on the previous configuration until the file is fixed
+            self.rejected += 1
+            self.last_error = str(e)
+            logger.error(f"Config change rejected: {e}")
+            return False
+        changed = changed_keys(self.current.data, settings.data)
+        if not changed:
+            return False
+        self.current = settings
+        self.last_error = None
+        try:
+            self.on_change(settings, changed)
+        except Exception as e:
+            logger.error(f"Applying config change failed: {e}")
+        self.reloads += 1
+        return True
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.check()
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="config-watcher", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=2)
+            self._thread = None
+
+    def stats(self) -> dict:
+        return {"reloads": self.reloads, "rejected": self.rejected, "last_error": self.last_error}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Validate a Beastboy config file or watch it for changes")
+    parser.add_argument("path", nargs="?", default="config.json")
+    parser.add_argument("--watch", action="store_true", help="print every change that would be applied")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    try:
+        settings = load_settings(args.path, strict=True)
+    except ConfigError as e:
+        for error in e.errors:
+            print(f"ERROR  {error}")
+        raise SystemExit(1)
+    for warning in settings.warnings:
+        print(f"WARN   {warning}")
+    print(f"{args.path}: OK ({(time.perf_counter() - started) * 1000:.1f} ms)")
+    print(settings.voice)
+    print(settings.system)
+    print(settings.features)
+
+    if args.watch:
+        def show(new: Settings, changed: Set[str]):
+            print(f"changed: {', '.join(sorted(changed))}")
+        watcher = ConfigWatcher(args.path, settings, show)
+        watcher.start()
+        try:
+            while True:
+                time.sleep(1)
+        except KeyboardInterrupt:
+            watcher.stop()
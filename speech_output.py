@@ -0,0 +1,333 @@
+"""Speech output worker for Beastboy.
+
+A single thread owns the pyttsx3 engine and speaks utterances taken from a
+priority queue, so callers never block on ``runAndWait`` and reminder threads
+never touch the engine concurrently. The current utterance can be cut short
+(barge-in) and the time from enqueueing to the first audio is recorded.
+Fixed phrases can be served from a TtsCache of pre-rendered audio.
+"""
+
+import itertools
+import logging
+import queue
+import statistics
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from enum import IntEnum
+from typing import Callable, Iterable, List, Optional
+
+from tts_cache import TtsCache, cache_key
+
+logger = logging.getLogger(__name__)
+
+
+class Priority(IntEnum):
+    ALERT = 0       # reminders and anything time-critical
+    RESPONSE = 1    # answers to the current command
+    BACKGROUND = 2  # greetings, status chatter
+    CACHE_WARMUP = 3  # render-only jobs for the TTS cache, never audible
+
+
+@dataclass(order=True)
+class Utterance:
+    priority: int
+    seq: int
+    text: str = field(compare=False)
+    created_at: float = field(compare=False, default_factory=time.perf_counter)
+    started_at: Optional[float] = field(compare=False, default=None)
+    interrupted: bool = field(compare=False, default=False)
+    cacheable: bool = field(compare=False, default=False)
+    language: str = field(compare=False, default='en')
+    render_only: bool = field(compare=False, default=False)
+
+    @property
+    def latency(self) -> Optional[float]:
+        """Seconds from creation until the engine started speaking"""
+        return None if self.started_at is None else self.started_at - self.created_at
+
+
+class NullEngine:
+    """pyttsx3-compatible engine that produces no audio, for headless runs"""
+
+    def __init__(self):
+        self._properties = {'rate': 200, 'volume': 1.0, 'voice': None, 'voices': []}
+        self._callbacks = {}
+        self._pending: List[str] = []
+        self._stopped = False
+
+    def connect(self, topic: str, callback: Callable):
+        self._callbacks.setdefault(topic, []).append(callback)
+
+    def setProperty(self, name: str, value):
+        self._properties[name] = value
+
+    def getProperty(self, name: str):
+        return self._properties.get(name)
+
+    def say(self, text: str, name: Optional[str] = None):
+        self._pending.append(text)
+
+    def save_to_file(self, text: str, path: str, name: Optional[str] = None):
+        import wave
+        with wave.open(path, 'wb') as wav:
+            wav.setnchannels(1)
+            wav.setsampwidth(2)
+            wav.setframerate(16000)
+            wav.writeframes(b'\0' * 320 * max(1, len(text.split())))
+
+    def runAndWait(self):
+        self._stopped = False
+        for text in self._pending:
+            for callback in self._callbacks.get('started-utterance', []):
+                callback(None)
+            for location, word in _word_spans(text):
+                if self._stopped:
+                    break
+                for callback in self._callbacks.get('started-word', []):
+                    callback(None, location, len(word))
+            for callback in self._callbacks.get('finished-utterance', []):
+                callback(None, not self._stopped)
+        self._pending = []
+
+    def stop(self):
+        self._stopped = True
+
+
+def _word_spans(text: str):
+    location = 0
+    for word in text.split():
+        location = text.find(word, location)
+        yield location, word
+        location += len(word)
+
+
+def create_pyttsx3_engine():
+    import pyttsx3
+    return pyttsx3.init()
+
+
+class SpeechOutput:
+    """Owns the TTS engine on a worker thread and speaks queued utterances in priority order"""
+
+    def __init__(self, rate: int = 200, volume: float = 0.9, voice_index: int = 1,
+                 engine_factory: Callable = create_pyttsx3_engine, history: int = 200,
+                 cache: Optional[TtsCache] = None, player=None):
+        self.rate = rate
+        self.volume = volume
+        self.voice_index = voice_index
+        self.engine_factory = engine_factory
+        # Cached playback needs both a cache and an output device
+        self.cache = cache if player is not None else None
+        self.player = player
+        self.voice_id = str(voice_index)
+        self.queue: "queue.PriorityQueue[Utterance]" = queue.PriorityQueue()
+        self.latencies = deque(maxlen=history)
+        self.on_started: List[Callable[[Utterance], None]] = []
+        self.on_finished: List[Callable[[Utterance], None]] = []
+        self.engine = None
+        self.current: Optional[Utterance] = None
+        self._seq = itertools.count()
+        self._interrupt = threading.Event()
+        self._idle = threading.Event()
+        self._idle.set()
+        self._ready = threading.Event()
+        self._lock = threading.Lock()
+        self._audible_pending = 0
+        self._dirty = True
+        self._running = False
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def speaking(self) -> bool:
+        return not self._idle.is_set()
+
+    def start(self, timeout: float = 10.0):
+        """Start the worker and wait until the engine is initialised"""
+        if self._running:
+            return
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name="speech-output", daemon=True)
+        self._thread.start()
+        self._ready.wait(timeout)
+
+    def stop(self):
+        """Interrupt anything playing and stop the worker"""
+        self._running = False
+        self.interrupt(clear_pending=True)
+        self.queue.put(Utterance(-1, -1, "", render_only=True))  # wake the worker
+        if self._thread and self._thread is not threading.current_thread():
+            self._thread.join(timeout=2)
+
+    def say(self, text: str, priority: Priority = Priority.RESPONSE,
+            created_at: Optional[float] = None, cacheable: bool = False,
+            language: str = 'en') -> Utterance:
+        """Queue text for speaking and return immediately"""
+        utterance = Utterance(int(priority), next(self._seq), text, cacheable=cacheable, language=language)
+        if created_at is not None:
+            utterance.created_at = created_at
+        with self._lock:
+            self._audible_pending += 1
+            self._idle.clear()
+            self.queue.put(utterance)
+        return utterance
+
+    def warm(self, phrases: Iterable[str], language: str = 'en'):
+        """Render phrases into the TTS cache in the background, below every audible priority"""
+        if self.cache is None:
+            return
+        for text in phrases:
+            self.queue.put(Utterance(int(Priority.CACHE_WARMUP), next(self._seq), text,
+                                     cacheable=True, language=language, render_only=True))
+
+    def interrupt(self, clear_pending: bool = True):
+        """Barge-in: cut the current utterance short and optionally drop queued responses.
+
+        Alerts (reminders) stay queued either way.
+        """
+        if clear_pending:
+            with self._lock:
+                kept = []
+                while True:
+                    try:
+                        item = self.queue.get_nowait()
+                    except queue.Empty:
+                        break
+                    if item.priority <= Priority.ALERT or item.render_only:
+                        kept.append(item)
+                    else:
+                        self._audible_pending -= 1
+                for item in kept:
+                    self.queue.put(item)
+                if self._audible_pending <= 0 and self.current is None:
+                    self._idle.set()
+        if self.current is not None:
+            self._interrupt.set()
+
+    def wait_until_idle(self, timeout: Optional[float] = None) -> bool:
+        """Block until nothing is queued or playing"""
+        return self._idle.wait(timeout)
+
+    def configure(self, rate: Optional[int] = None, volume: Optional[float] = None,
+                  voice_index: Optional[int] = None):
+        """Update voice settings; applied by the worker before the next utterance"""
+        if rate is not None:
+            self.rate = rate
+        if volume is not None:
+            self.volume = volume
+        if voice_index is not None:
+            self.voice_index = voice_index
+        self._dirty = True
+
+    def stats(self) -> dict:
+        """Enqueue-to-first-audio latency over recent utterances, plus cache metrics"""
+        latencies = list(self.latencies)
+        stats = {"utterances": len(latencies)}
+        if latencies:
+            stats.update({
+                "last_ms": round(latencies[-1] * 1000, 1),
+                "median_ms": round(statistics.median(latencies) * 1000, 1),
+                "max_ms": round(max(latencies) * 1000, 1),
+            })
+        if self.cache is not None:
+            stats["cache"] = self.cache.stats()
+        return stats
+
+    def _apply_settings(self):
+        self.engine.setProperty('rate', self.rate)
+        self.engine.setProperty('volume', self.volume)
+        voices = self.engine.getProperty('voices') or []
+        if 0 <= self.voice_index < len(voices):
+            self.engine.setProperty('voice', voices[self.voice_index].id)
+            self.voice_id = voices[self.voice_index].id
+        else:
+            self.voice_id = str(self.voice_index)
+        self._dirty = False
+
+    def _on_started_utterance(self, name=None):
+        if self.current is not None and not self.current.render_only and self.current.started_at is None:
+            self.current.started_at = time.perf_counter()
+            self.latencies.append(self.current.latency)
+            for callback in self.on_started:
+                try:
+                    callback(self.current)
+                except Exception as e:
+                    logger.error(f"Speech callback failed: {e}")
+
+    def _synthesize_to_file(self, text: str, path: str):
+        self.engine.save_to_file(text, path)
+        self.engine.runAndWait()
+
+    def _speak_engine(self, utterance: Utterance):
+        self.engine.say(utterance.text)
+        self.engine.runAndWait()
+
+    def _speak_cached(self, utterance: Utterance):
+        key = cache_key(utterance.text, self.voice_id, self.rate, self.volume, utterance.language)
+        if utterance.render_only:
+            if not self.cache.contains(key):
+                audio = self.cache.render(key, utterance.text, self._synthesize_to_file)
+                if audio is not None:
+                    audio.close()
+            return
+
+        audio = self.cache.get(key)
+        if audio is None:
+            # Speak it live now and render it for next time once we're idle
+            self._speak_engine(utterance)
+            self.queue.put(Utterance(int(Priority.CACHE_WARMUP), next(self._seq), utterance.text,
+                                     cacheable=True, language=utterance.language, render_only=True))
+            return
+        try:
+            self.player.play(audio, should_stop=self._interrupt.is_set, on_start=self._on_started_utterance)
+        finally:
+            audio.close()
+
+    def _on_started_word(self, name, location, length):
+        # pyttsx3 only honours stop() from inside its own callbacks
+        if self._interrupt.is_set():
+            self.engine.stop()
+
+    def _run(self):
+        try:
+            self.engine = self.engine_factory()
+            self._apply_settings()
+            self.engine.connect('started-utterance', self._on_started_utterance)
+            self.engine.connect('started-word', self._on_started_word)
+        except Exception as e:
+            logger.error(f"Failed to initialize speech output: {e}")
+            self.engine = None
+        finally:
+            self._ready.set()
+
+        while self._running:
+            utterance = self.queue.get()
+            if not self._running:
+                break
+            self.current = utterance
+            self._interrupt.clear()
+            try:
+                if self.engine is not None:
+                    if self._dirty:
+                        self._apply_settings()
+                    if utterance.cacheable and self.cache is not None:
+                        self._speak_cached(utterance)
+                    elif not utterance.render_only:
+                        self._speak_engine(utterance)
+            except Exception as e:
+                logger.error(f"Speech synthesis failed: {e}")
+            finally:
+                utterance.interrupted = self._interrupt.is_set()
+                self.current = None
+                if not utterance.render_only:
+                    for callback in self.on_finished:
+                        try:
+                            callback(utterance)
+                        except Exception as e:
+                            logger.error(f"Speech callback failed: {e}")
+                with self._lock:
+                    if not utterance.render_only:
+                        self._audible_pending -= 1
+                    if self._audible_pending <= 0:
+                        self._idle.set()
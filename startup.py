@@ -0,0 +1,155 @@
+"""Startup helpers for Beastboy: lazy imports and per-phase timings.
+
+Optional services (googletrans, yfinance, openai, tkinter dialogs) and the
+tray (pystray, Pillow) are imported on first use instead of at startup. ``module_available`` checks
+that a package is installed without importing it, and ``lazy_import``
+returns a stand-in that imports the real module on first attribute access.
+``StartupTimer`` records how long each startup phase takes, so it is easy
+to see what stands between launching and the tray icon and wake-word
+listener being live. ``python startup.py`` reports import costs from
+``python -X importtime`` and times a cold import of ``beastboy``.
+"""
+
+import argparse
+import importlib
+import importlib.util
+import logging
+import subprocess
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Imported by beastboy at startup before lazy imports, and the optional ones it now defers
+EAGER_MODULES = ("speech_recognition", "psutil", "requests", "numpy")
+DEFERRED_MODULES = ("googletrans", "yfinance", "openai", "aiohttp", "tkinter.messagebox", "pystray", "PIL.Image")
+
+
+def module_available(name: str) -> bool:
+    """True if ``name`` can be imported, without importing it"""
+    try:
+        return importlib.util.find_spec(name) is not None
+    except (ImportError, ValueError):
+        return False
+
+
+class LazyModule:
+    """Stand-in for a module that is imported on first attribute access"""
+
+    def __init__(self, name: str):
+        self._name = name
+        self._module = None
+        self._lock = threading.Lock()
+
+    def _load(self):
+        if self._module is None:
+            with self._lock:
+                if self._module is None:
+                    started = time.perf_counter()
+                    self._module = importlib.import_module(self._name)
+                    logger.info(f"Imported {self._name} on first use in "
+                                f"{(time.perf_counter() - started) * 1000:.0f} ms")
+        return self._module
+
+    @property
+    def loaded(self) -> bool:
+        return self._module is not None
+
+    def __getattr__(self, attribute: str):
+        return getattr(self._load(), attribute)
+
+    def __repr__(self) -> str:
+        return f"<lazy module {self._name!r} ({'loaded' if self.loaded else 'not loaded'})>"
+
+
+def lazy_import(name: str) -> LazyModule:
+    return LazyModule(name)
+
+
+class StartupTimer:
+    """Records named startup phases relative to process start"""
+
+    def __init__(self, clock=time.perf_counter):
+        self.clock = clock
+        self.started = clock()
+        self.phases: List[Tuple[str, float]] = []
+        self.marks: Dict[str, float] = {}
+
+    @contextmanager
+    def phase(self, name: str):
+        started = self.clock()
+        try:
+            yield
+        finally:
+            self.phases.append((name, self.clock() - started))
+
+    def mark(self, name: str):
+        """Milestone such as "tray_visible", measured from the timer's creation"""
+        self.marks.setdefault(name, self.clock() - self.started)
+
+    def report(self) -> dict:
+        return {
+            "phases_ms": {name: round(seconds * 1000, 1) for name, seconds in self.phases},
+            "marks_ms": {name: round(seconds * 1000, 1) for name, seconds in self.marks.items()},
+        }
+
+
+def parse_importtime(stderr: str) -> List[Tuple[str, int, int]]:
+    """(module, self µs, cumulative µs) rows from ``python -X importtime`` output"""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        parts = line[len("import time:"):].split("|")
+        if len(parts) != 3:
+            continue
+        try:
+            rows.append((parts[2].strip(), int(parts[0]), int(parts[1])))
+        except ValueError:
+            continue
+    return rows
+
+
+def measure_import(module: str, python: str = sys.executable) -> Optional[dict]:
+    """Cold import cost of ``module`` in a fresh interpreter; None if it fails to import"""
+    started = time.perf_counter()
+    result = subprocess.run([python, "-X", "importtime", "-c", f"import {module}"],
+                            capture_output=True, text=True)
+    wall = time.perf_counter() - started
+    if result.returncode != 0:
+        return None
+    rows = parse_importtime(result.stderr)
+    total = next((cumulative for name, _, cumulative in reversed(rows) if name == module), None)
+    heaviest = sorted(rows, key=lambda row: row[1], reverse=True)[:5]
+    return {
+        "module": module,
+        "cumulative_ms": round(total / 1000, 1) if total is not None else None,
+        "modules_loaded": len(rows),
+        "heaviest_self_ms": {name: round(self_us / 1000, 1) for name, self_us, _ in heaviest},
+        "process_ms": round(wall * 1000, 1),
+    }
+
+
+def benchmark(modules: Sequence[str]) -> List[dict]:
+    rows = []
+    for module in modules:
+        row = measure_import(module)
+        rows.append(row if row is not None else {"module": module, "error": "not importable here"})
+    return rows
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Break down Beastboy's import-time startup cost")
+    parser.add_argument("modules", nargs="*", help="modules to measure (default: beastboy and its dependencies)")
+    args = parser.parse_args()
+
+    modules = args.modules or list(EAGER_MODULES) + list(DEFERRED_MODULES) + ["beastboy"]
+    deferred_ms = 0.0
+    for row in benchmark(modules):
+        print(row)
+        if row["module"] in DEFERRED_MODULES and row.get("cumulative_ms"):
+            deferred_ms += row["cumulative_ms"]
+    print(f"Import time moved off the startup path by lazy imports: {deferred_ms:.0f} ms")
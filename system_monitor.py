@@ -0,0 +1,307 @@
+"""Background system metrics for Beastboy.
+
+One daemon thread samples CPU, memory, disk, network and the assistant's
+own process every ``interval_seconds``. Each series is stored in a
+fixed-size ``array('d')`` ring buffer sized to ``retention_minutes``, so
+memory use is set at start and never grows. "System info" and status
+questions read the latest sample instantly, instead of blocking for a second
+in ``psutil.cpu_percent(interval=1)``. Trend questions ("what was my CPU
+over the last 10 minutes") summarise a window of the history. The sampler
+times itself: ``stats()`` reports the wall time per sample and the share of
+one core it has used. ``python system_monitor.py`` samples for a few
+seconds and compares answering from the buffers with the old blocking call.
+"""
+
+import argparse
+import heapq
+import json
+import logging
+import threading
+import time
+from array import array
+from dataclasses import dataclass, fields
+from typing import Any, Dict, List, Optional, Tuple
+
+import psutil
+
+logger = logging.getLogger(__name__)
+
+FIELDS = ("cpu_percent", "memory_percent", "memory_available_gb", "disk_percent",
+          "net_sent_kbps", "net_recv_kbps", "process_cpu_percent", "process_rss_mb")
+
+# Spoken metric name -> (series, unit it is spoken with)
+METRICS = {
+    "cpu": ("cpu_percent", "%"),
+    "memory": ("memory_percent", "%"),
+    "disk": ("disk_percent", "%"),
+    "network": ("net_recv_kbps", " KB/s"),
+}
+
+
+@dataclass
+class MonitorConfig:
+    enabled: bool = True
+    interval_seconds: float = 2.0
+    retention_minutes: float = 60.0
+    disk_path: str = "/"
+    top_processes: int = 3        # busiest processes kept from the latest scan; 0 skips the scan
+    process_every: int = 5        # samples between process-table scans, the costliest part of a sample
+
+    @classmethod
+    def from_dict(cls, values: Optional[Dict[str, Any]]) -> "MonitorConfig":
+        names = {f.name for f in fields(cls)}
+        return cls(**{k: v for k, v in (values or {}).items() if k in names})
+
+    @property
+    def capacity(self) -> int:
+        return max(2, int(self.retention_minutes * 60 / self.interval_seconds))
+
+
+class RingBuffer:
+    """Fixed number of floats in a preallocated array; the oldest value is overwritten"""
+
+    __slots__ = ("capacity", "count", "_data", "_next")
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self.count = 0
+        self._data = array('d', bytes(8 * capacity))
+        self._next = 0
+
+    def append(self, value: float):
+        self._data[self._next] = value
+        self._next = (self._next + 1) % self.capacity
+        if self.count < self.capacity:
+            self.count += 1
+
+    def __getitem__(self, index: int) -> float:
+        """Value by age order: 0 is the oldest kept, -1 the newest"""
+        if index < 0:
+            index += self.count
+        if not 0 <= index < self.count:
+            raise IndexError(index)
+        return self._data[(self._next - self.count + index) % self.capacity]
+
+    def __len__(self) -> int:
+        return self.count
+
+    def tail(self, n: int) -> List[float]:
+        """The newest ``n`` values, oldest first"""
+        n = min(n, self.count)
+        start = (self._next - n) % self.capacity
+        if start + n <= self.capacity:
+            return self._data[start:start + n].tolist()
+        return self._data[start:].tolist() + self._data[:self._next].tolist()
+
+    @property
+    def nbytes(self) -> int:
+        return self._data.itemsize * self.capacity
+
+
+@dataclass
+class Sample:
+    timestamp: float
+    cpu_percent: float
+    memory_percent: float
+    memory_available_gb: float
+    disk_percent: float
+    net_sent_kbps: float
+    net_recv_kbps: float
+    process_cpu_percent: float
+    process_rss_mb: float
+
+
+@dataclass
+class Trend:
+    field: str
+    seconds: float    # time actually covered by the samples, which may be less than asked for
+    samples: int
+    mean: float
+    minimum: float
+    maximum: float
+    latest: float
+
+
+class SystemMonitor:
+    """Samples system and process stats on one thread into fixed-size ring buffers"""
+
+    def __init__(self, config: MonitorConfig = MonitorConfig(), clock=time.time):
+        self.config = config
+        self.clock = clock
+        capacity = config.capacity
+        self.timestamps = RingBuffer(capacity)
+        self.series: Dict[str, RingBuffer] = {name: RingBuffer(capacity) for name in FIELDS}
+        self.top: List[Tuple[str, float]] = []
+        self.samples = 0
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._process = psutil.Process()
+        self._net: Optional[Tuple[float, int, int]] = None
+        self._started = 0.0
+        self._sample_seconds = 0.0
+        self._sample_max = 0.0
+        self._sample_cpu = 0.0
+
+    def start(self):
+        if self._thread is not None:
+            return
+        # cpu_percent(None) measures since the previous call, so the first call only sets the baseline
+        psutil.cpu_percent(None)
+        self._process.cpu_percent(None)
+        self._started = time.perf_counter()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="system-monitor", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread and self._thread is not threading.current_thread():
+            self._thread.join(timeout=2)
+        self._thread = None
+
+    def _run(self):
+        # The first sample comes quickly so answers are available soon after startup
+        due = time.monotonic() + min(0.5, self.config.interval_seconds)
+        while not self._stop.wait(max(0.0, due - time.monotonic())):
+            try:
+                self.sample()
+            except Exception as e:
+                logger.warning(f"System sample failed: {e}")
+            due += self.config.interval_seconds
+            if due < time.monotonic():
+                due = time.monotonic()  # fell behind (e.g. after suspend): don't sample in a burst
+
+    def sample(self) -> Sample:
+        """Take one sample and append it to the buffers"""
+        started = time.perf_counter()
+        cpu_started = time.thread_time()
+        memory = psutil.virtual_memory()
+        values = {
+            "cpu_percent": psutil.cpu_percent(None),
+            "memory_percent": memory.percent,
+            "memory_available_gb": memory.available / 1024 ** 3,
+            "disk_percent": psutil.disk_usage(self.config.disk_path or "/").percent,
+            "process_cpu_percent": self._process.cpu_percent(None),
+            "process_rss_mb": self._process.memory_info().rss / 1024 ** 2,
+        }
+        values["net_sent_kbps"], values["net_recv_kbps"] = self._network_rates()
+        if self.config.top_processes and self.samples % max(1, self.config.process_every) == 0:
+            self.top = self._top_processes(self.config.top_processes)
+        now = self.clock()
+        with self._lock:
+            self.timestamps.append(now)
+            for name in FIELDS:
+                self.series[name].append(values[name])
+            self.samples += 1
+        seconds = time.perf_counter() - started
+        self._sample_seconds += seconds
+        self._sample_max = max(self._sample_max, seconds)
+        self._sample_cpu += time.thread_time() - cpu_started
+        return Sample(now, **values)
+
+    def _network_rates(self) -> Tuple[float, float]:
+        counters = psutil.net_io_counters()
+        if counters is None:
+            return 0.0, 0.0
+        now = time.monotonic()
+        previous, self._net = self._net, (now, counters.bytes_sent, counters.bytes_recv)
+        if previous is None or now <= previous[0]:
+            return 0.0, 0.0
+        elapsed = now - previous[0]
+        return ((counters.bytes_sent - previous[1]) / 1024 / elapsed,
+                (counters.bytes_recv - previous[2]) / 1024 / elapsed)
+
+    @staticmethod
+    def _top_processes(n: int) -> List[Tuple[str, float]]:
+        # process_iter reuses its Process objects, so cpu_percent(None) measures since the last sample
+        busy = []
+        for process in psutil.process_iter(["name"]):
+            try:
+                busy.append((process.cpu_percent(None), process.info["name"] or str(process.pid)))
+            except psutil.Error:
+                continue
+        return [(name, round(cpu, 1)) for cpu, name in heapq.nlargest(n, busy)]
+
+    def latest(self) -> Optional[Sample]:
+        with self._lock:
+            if not self.timestamps.count:
+                return None
+            return Sample(self.timestamps[-1], **{name: self.series[name][-1] for name in FIELDS})
+
+    def window(self, field: str, seconds: float) -> Optional[Trend]:
+        """Summary of ``field`` over the last ``seconds``; None without at least one sample"""
+        with self._lock:
+            count = self.timestamps.count
+            if not count:
+                return None
+            cutoff = self.clock() - seconds
+            # Timestamps only grow, so the window starts at the first one inside it
+            low, high = 0, count
+            while low < high:
+                middle = (low + high) // 2
+                if self.timestamps[middle] < cutoff:
+                    low = middle + 1
+                else:
+                    high = middle
+            n = count - low
+            if not n:
+                return None
+            values = self.series[field].tail(n)
+            covered = self.timestamps[-1] - self.timestamps[low]
+        return Trend(field, covered, n, sum(values) / n, min(values), max(values), values[-1])
+
+    def stats(self) -> dict:
+        """How much the sampler itself costs"""
+        elapsed = time.perf_counter() - self._started if self._started else 0.0
+        samples = self.samples
+        return {
+            "samples": samples,
+            "kept": self.timestamps.count,
+            "capacity": self.timestamps.capacity,
+            "interval_seconds": self.config.interval_seconds,
+            "buffer_kb": round((len(FIELDS) + 1) * self.timestamps.nbytes / 1024, 1),
+            "mean_sample_ms": round(self._sample_seconds / samples * 1000, 2) if samples else None,
+            "max_sample_ms": round(self._sample_max * 1000, 2),
+            "cpu_overhead_percent": round(self._sample_cpu / elapsed * 100, 3) if elapsed else None,
+        }
+
+
+def benchmark(seconds: float = 10.0, interval: float = 0.5, top_processes: int = 3, process_every: int = 5) -> dict:
+    """Run the sampler briefly, then compare answering from it with the old blocking call"""
+    monitor = SystemMonitor(MonitorConfig(interval_seconds=interval, top_processes=top_processes,
+                                          process_every=process_every))
+    monitor.start()
+    time.sleep(seconds)
+    started = time.perf_counter()
+    for _ in range(1000):
+        monitor.latest()
+    latest_us = (time.perf_counter() - started) / 1000 * 1e6
+    started = time.perf_counter()
+    for _ in range(1000):
+        trend = monitor.window("cpu_percent", seconds)
+    window_us = (time.perf_counter() - started) / 1000 * 1e6
+    monitor.stop()
+    latest = monitor.latest()
+    started = time.perf_counter()
+    psutil.cpu_percent(interval=1)
+    blocking_ms = (time.perf_counter() - started) * 1000
+    return {
+        "latest": latest.__dict__ if latest else None,
+        "cpu_trend": trend.__dict__ if trend else None,
+        "top_processes": monitor.top,
+        "latest_us": round(latest_us, 2),
+        "window_us": round(window_us, 2),
+        "blocking_cpu_percent_ms": round(blocking_ms, 1),
+        "sampler": monitor.stats(),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Sample system metrics and report the sampler's cost")
+    parser.add_argument("--seconds", type=float, default=10.0)
+    parser.add_argument("--interval", type=float, default=0.5)
+    parser.add_argument("--top-processes", type=int, default=3)
+    parser.add_argument("--process-every", type=int, default=5)
+    args = parser.parse_args()
+    print(json.dumps(benchmark(args.seconds, args.interval, args.top_processes, args.process_every), indent=2))
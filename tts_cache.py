@@ -0,0 +1,238 @@
+"""On-disk cache of synthesized speech for Beastboy.
+
+Fixed phrases such as the wake-word acknowledgement are rendered once with
+the TTS engine, kept as WAV files, and played back straight from a
+memory-mapped file afterwards. Entries are keyed by everything that changes
+the audio (text, voice, rate, volume, language) and evicted least recently
+used once the cache exceeds its size cap. An evicted file that cannot be
+deleted yet (still mapped on Windows) keeps counting toward the cap and the
+delete is retried on the next eviction and at startup.
+"""
+
+import hashlib
+import json
+import logging
+import mmap
+import os
+import struct
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Dict, Optional
+
+try:
+    import pyaudio
+    PYAUDIO_AVAILABLE = True
+except ImportError:
+    PYAUDIO_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+INDEX_FILE = "index.json"
+
+
+def cache_key(text: str, voice: str, rate: int, volume: float, language: str = 'en') -> str:
+    """Stable key for one rendering of ``text``"""
+    raw = json.dumps([text, voice, rate, round(volume, 3), language], ensure_ascii=False)
+    return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+
+@dataclass
+class CachedAudio:
+    """A memory-mapped WAV file; ``frames`` is a zero-copy view of the PCM data"""
+    key: str
+    channels: int
+    sample_rate: int
+    sample_width: int
+    frames: memoryview
+    _mmap: mmap.mmap
+    _file: object
+
+    def close(self):
+        self.frames.release()
+        self._mmap.close()
+        self._file.close()
+
+
+def _open_wav(key: str, path: Path) -> Optional[CachedAudio]:
+    """Map a PCM WAV file and locate its fmt and data chunks"""
+    handle = open(path, 'rb')
+    try:
+        mapped = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+    except ValueError:  # empty file
+        handle.close()
+        return None
+    if mapped[0:4] != b'RIFF' or mapped[8:12] != b'WAVE':
+        mapped.close()
+        handle.close()
+        return None
+    offset = 12
+    fmt = None
+    while offset + 8 <= len(mapped):
+        chunk_id = mapped[offset:offset + 4]
+        size = struct.unpack('<I', mapped[offset + 4:offset + 8])[0]
+        body = offset + 8
+        if chunk_id == b'fmt ':
+            _, channels, sample_rate, _, _, bits = struct.unpack('<HHIIHH', mapped[body:body + 16])
+            fmt = (channels, sample_rate, bits // 8)
+        elif chunk_id == b'data' and fmt:
+            end = min(body + size, len(mapped))
+            return CachedAudio(key, fmt[0], fmt[1], fmt[2], memoryview(mapped)[body:end], mapped, handle)
+        offset = body + size + (size & 1)
+    mapped.close()
+    handle.close()
+    return None
+
+
+class TtsCache:
+    """Size-capped LRU directory of rendered WAV files"""
+
+    def __init__(self, directory: str = "tts_cache", max_bytes: int = 50 * 1024 * 1024):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.bytes_served = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, dict]" = OrderedDict()
+        self._pending_deletes: Dict[str, int] = {}   # evicted key -> size of the file still on disk
+        self._load_index()
+
+    @property
+    def total_bytes(self) -> int:
+        """Bytes on disk, including evicted files that could not be deleted yet"""
+        return sum(entry["size"] for entry in self._entries.values()) + sum(self._pending_deletes.values())
+
+    def _path(self, key: str) -> Path:
+        return self.directory / f"{key}.wav"
+
+    def _load_index(self):
+        index_path = self.directory / INDEX_FILE
+        try:
+            with open(index_path, 'r', encoding='utf-8') as f:
+                entries = json.load(f)
+        except (OSError, ValueError):
+            entries = []
+        for entry in entries:
+            if self._path(entry["key"]).exists():
+                self._entries[entry["key"]] = entry
+        # Anything else is a file evicted, or a render interrupted, before the last exit
+        for path in self.directory.glob("*.wav"):
+            key = path.name[:-len(".wav")]
+            if key not in self._entries:
+                self._pending_deletes[key] = path.stat().st_size
+        self._delete_pending()
+
+    def _save_index(self):
+        index_path = self.directory / INDEX_FILE
+        temp_path = index_path.with_suffix(".tmp")
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(list(self._entries.values()), f, ensure_ascii=False)
+        os.replace(temp_path, index_path)
+
+    def get(self, key: str) -> Optional[CachedAudio]:
+        """Memory-map a cached rendering, counting the hit or miss"""
+        with self._lock:
+            if key in self._entries:
+                audio = _open_wav(key, self._path(key))
+                if audio is not None:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    self.bytes_served += len(audio.frames)
+                    return audio
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+    def contains(self, key: str) -> bool:
+        with self._lock:
+            return key in self._entries
+
+    def render(self, key: str, text: str, synthesize: Callable[[str, str], None]) -> Optional[CachedAudio]:
+        """Render ``text`` with ``synthesize(text, path)`` and add it to the cache"""
+        temp_path = self.directory / f"{key}.part.wav"
+        try:
+            synthesize(text, str(temp_path))
+            if not temp_path.exists() or temp_path.stat().st_size == 0:
+                return None
+            os.replace(temp_path, self._path(key))
+        except Exception as e:
+            logger.error(f"Failed to render '{text}' into the TTS cache: {e}")
+            temp_path.unlink(missing_ok=True)
+            return None
+
+        with self._lock:
+            self._pending_deletes.pop(key, None)  # the old file was just replaced
+            self._entries[key] = {"key": key, "text": text, "size": self._path(key).stat().st_size}
+            self._entries.move_to_end(key)
+            self._evict()
+            self._save_index()
+        return _open_wav(key, self._path(key))
+
+    def _delete_pending(self):
+        for key in list(self._pending_deletes):
+            try:
+                self._path(key).unlink(missing_ok=True)
+            except OSError:
+                continue
+            del self._pending_deletes[key]
+
+    def _evict(self):
+        self._delete_pending()
+        total = self.total_bytes
+        while total > self.max_bytes and len(self._entries) > 1:
+            key, entry = self._entries.popitem(last=False)
+            self.evictions += 1
+            try:
+                self._path(key).unlink()
+                total -= entry["size"]
+            except OSError:
+                # Still mapped on Windows: it stays on disk and counted until a later retry deletes it
+                self._pending_deletes[key] = entry["size"]
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "bytes": self.total_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            "bytes_served": self.bytes_served,
+            "evictions": self.evictions,
+            "pending_deletes": len(self._pending_deletes),
+        }
+
+
+class WavPlayer:
+    """Streams cached PCM to the default output device through PyAudio"""
+
+    def __init__(self, chunk_frames: int = 1024):
+        if not PYAUDIO_AVAILABLE:
+            raise ImportError("PyAudio is required for cached playback")
+        self.chunk_frames = chunk_frames
+        self._audio = pyaudio.PyAudio()
+
+    def play(self, audio: CachedAudio, should_stop: Callable[[], bool] = lambda: False,
+             on_start: Optional[Callable[[], None]] = None) -> bool:
+        """Play until done or ``should_stop()``; returns False if interrupted"""
+        stream = self._audio.open(format=self._audio.get_format_from_width(audio.sample_width),
+                                  channels=audio.channels, rate=audio.sample_rate, output=True)
+        step = self.chunk_frames * audio.sample_width * audio.channels
+        try:
+            for offset in range(0, len(audio.frames), step):
+                if should_stop():
+                    return False
+                if offset == 0 and on_start:
+                    on_start()
+                stream.write(audio.frames[offset:offset + step])
+            return True
+        finally:
+            stream.stop_stream()
+            stream.close()
+
+    def close(self):
+        self._audio.terminate()
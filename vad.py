@@ -0,0 +1,303 @@
+"""Voice activity detection for Beastboy.
+
+The detector tracks the room's noise floor incrementally from frames that
+were already captured, so there is never a blocking calibration step, and it
+emits speech-start / speech-end events as soon as the energy crosses its
+hysteresis thresholds. ``UtteranceSegmenter`` turns those events into audio
+segments for the wake-word and command stages.
+"""
+
+import argparse
+import array
+import logging
+import math
+import random
+from dataclasses import dataclass, fields
+from enum import Enum
+from typing import Any, Dict, Iterator, List, Optional
+
+from audio_capture import DEFAULT_SAMPLE_RATE, DEFAULT_SAMPLE_WIDTH, NUMPY_AVAILABLE, frame_rms, pcm_samples
+
+if NUMPY_AVAILABLE:
+    import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class VadEventType(Enum):
+    SPEECH_START = "speech_start"
+    SPEECH_END = "speech_end"
+
+
+@dataclass
+class VadEvent:
+    type: VadEventType
+    position: int  # byte offset into the processed stream
+    noise_floor: float
+
+
+@dataclass
+class SpeechSegment:
+    audio: bytes
+    start: int
+    end: int
+    truncated: bool = False
+
+
+@dataclass
+class VadConfig:
+    """Thresholds for the ``vad`` section of config.json"""
+    frame_ms: int = 20
+    start_ratio: float = 3.0        # energy over noise floor that opens speech
+    end_ratio: float = 2.0          # energy over noise floor that keeps it open
+    min_speech_ms: int = 60         # voiced time needed before speech_start fires
+    hangover_ms: int = 400          # silence needed before speech_end fires
+    noise_alpha: float = 0.05       # EMA weight of each non-speech frame
+    speech_noise_alpha: float = 0.0025  # much slower drift while in speech
+    min_noise_floor: float = 30.0   # RMS floor so digital silence doesn't trigger on hiss
+    warmup_ms: int = 200            # initial frames always treated as noise
+    preroll_ms: int = 200           # audio kept before speech_start in segments
+    use_spectral: bool = True       # reject flat (noise-like) spectra when NumPy is present
+    max_flatness: float = 0.45
+
+    @classmethod
+    def from_dict(cls, values: Optional[Dict[str, Any]]) -> "VadConfig":
+        """Build from a config dict, ignoring unknown keys"""
+        known = {f.name for f in fields(cls)}
+        return cls(**{k: v for k, v in (values or {}).items() if k in known})
+
+
+class VoiceActivityDetector:
+    """Energy VAD with an exponential moving noise floor and hysteresis"""
+
+    def __init__(self, config: Optional[VadConfig] = None, sample_rate: int = DEFAULT_SAMPLE_RATE,
+                 sample_width: int = DEFAULT_SAMPLE_WIDTH):
+        self.config = config or VadConfig()
+        self.sample_rate = sample_rate
+        self.sample_width = sample_width
+        self.bytes_per_ms = sample_rate * sample_width // 1000
+        self.frame_bytes = self.config.frame_ms * self.bytes_per_ms
+        self.use_spectral = self.config.use_spectral and NUMPY_AVAILABLE
+        self.noise_floor = self.config.min_noise_floor
+        self.frames_seen = 0
+        self.offset = 0
+        self.reset_state()
+
+    def reset_state(self):
+        """Forget any speech in progress but keep the learned noise floor"""
+        self.in_speech = False
+        self._voiced_run = 0
+        self._voiced_start = 0
+        self._silence_run = 0
+        self._last_voiced_end = 0
+
+    def _spectrally_flat(self, frame) -> bool:
+        samples = pcm_samples(frame, self.sample_width).astype(np.float64)
+        power = np.abs(np.fft.rfft(samples)) ** 2 + 1e-10
+        flatness = np.exp(np.mean(np.log(power))) / np.mean(power)
+        return flatness > self.config.max_flatness
+
+    def process(self, frame) -> Optional[VadEvent]:
+        """Feed one frame; returns an event when speech starts or ends"""
+        config = self.config
+        start = self.offset
+        self.offset += len(frame)
+        self.frames_seen += 1
+        rms = frame_rms(frame, self.sample_width)
+
+        if self.frames_seen * config.frame_ms <= config.warmup_ms:
+            self._update_noise(rms)
+            return None
+
+        if not self.in_speech:
+            voiced = rms > self.noise_floor * config.start_ratio
+            if voiced and self.use_spectral and self._spectrally_flat(frame):
+                voiced = False
+            if not voiced:
+                self._voiced_run = 0
+                self._update_noise(rms)
+                return None
+            if self._voiced_run == 0:
+                self._voiced_start = start
+            self._voiced_run += len(frame)
+            if self._voiced_run >= config.min_speech_ms * self.bytes_per_ms:
+                self.in_speech = True
+                self._silence_run = 0
+                self._last_voiced_end = self.offset
+                return VadEvent(VadEventType.SPEECH_START, self._voiced_start, self.noise_floor)
+            return None
+
+        # Creep towards the current level even during speech, so a permanent
+        # jump in background noise eventually closes the segment
+        self.noise_floor += config.speech_noise_alpha * (rms - self.noise_floor)
+        if rms > self.noise_floor * config.end_ratio:
+            self._silence_run = 0
+            self._last_voiced_end = self.offset
+            return None
+        self._silence_run += len(frame)
+        if self._silence_run >= config.hangover_ms * self.bytes_per_ms:
+            end = self._last_voiced_end
+            self.reset_state()
+            return VadEvent(VadEventType.SPEECH_END, end, self.noise_floor)
+        return None
+
+    def _update_noise(self, rms: float):
+        if self.frames_seen == 1:
+            self.noise_floor = max(rms, self.config.min_noise_floor)
+            return
+        self.noise_floor += self.config.noise_alpha * (rms - self.noise_floor)
+        self.noise_floor = max(self.noise_floor, self.config.min_noise_floor)
+
+
+class UtteranceSegmenter:
+    """Collects the audio between speech-start and speech-end events.
+
+    Keeps a short preroll so the first phoneme isn't clipped. Segments longer
+    than ``max_segment_ms`` are either cut off and returned (command capture)
+    or dropped entirely (wake-word gating, where long speech is never a wake
+    word).
+    """
+
+    def __init__(self, vad: VoiceActivityDetector, max_segment_ms: int = 7000,
+                 min_segment_ms: int = 0, drop_too_long: bool = False):
+        self.vad = vad
+        self.max_segment_bytes = max_segment_ms * vad.bytes_per_ms
+        self.min_segment_bytes = min_segment_ms * vad.bytes_per_ms
+        self.drop_too_long = drop_too_long
+        self.preroll_bytes = vad.config.preroll_ms * vad.bytes_per_ms
+        self.reset()
+
+    @property
+    def sample_rate(self) -> int:
+        return self.vad.sample_rate
+
+    @property
+    def in_speech(self) -> bool:
+        return self.vad.in_speech
+
+    def reset(self):
+        """Drop any partial segment (the VAD keeps its noise floor)"""
+        self.vad.reset_state()
+        self._history = bytearray()
+        self._history_start = self.vad.offset
+        self._collecting = False
+        self._too_long = False
+
+    def process(self, frame) -> Optional[SpeechSegment]:
+        """Feed one frame; returns a finished segment when speech stops"""
+        frame_start = self.vad.offset
+        event = self.vad.process(frame)
+        if not self._history:
+            self._history_start = frame_start
+        self._history += frame
+
+        if not self._collecting:
+            if event is None or event.type is not VadEventType.SPEECH_START:
+                # Only keep enough history to cover the preroll and the onset
+                excess = len(self._history) - self.preroll_bytes - self.vad.config.min_speech_ms * self.vad.bytes_per_ms
+                if excess > 0:
+                    del self._history[:excess]
+                    self._history_start += excess
+                return None
+            self._collecting = True
+            keep_from = max(self._history_start, event.position - self.preroll_bytes)
+            del self._history[:keep_from - self._history_start]
+            self._history_start = keep_from
+            return None
+
+        if len(self._history) > self.max_segment_bytes:
+            if not self.drop_too_long:
+                return self._finish(self._history_start + self.max_segment_bytes, truncated=True)
+            self._too_long = True
+            self._history = self._history[-self.preroll_bytes:] if self.preroll_bytes else bytearray()
+            self._history_start = self.vad.offset - len(self._history)
+
+        if event is not None and event.type is VadEventType.SPEECH_END:
+            if self._too_long:
+                self.reset()
+                return None
+            return self._finish(event.position)
+        return None
+
+    def _finish(self, end: int, truncated: bool = False) -> Optional[SpeechSegment]:
+        start = self._history_start
+        audio = bytes(self._history[:end - start])
+        self.reset()
+        if len(audio) < self.min_segment_bytes:
+            return None
+        return SpeechSegment(audio, start, end, truncated)
+
+
+def synthetic_sequence(pattern: List[tuple], sample_rate: int = DEFAULT_SAMPLE_RATE,
+                       frame_ms: int = 20, seed: int = 7) -> Iterator[bytes]:
+    """Render (kind, seconds, level) steps into 16-bit frames.
+
+    ``kind`` is 'noise' (Gaussian, level = std dev), 'tone' (440 Hz plus
+    harmonics, level = amplitude, over a little background noise) or
+    'silence'.
+    """
+    rng = random.Random(seed)
+    frame_len = sample_rate * frame_ms // 1000
+    n = 0
+    for kind, seconds, level in pattern:
+        for _ in range(int(seconds * 1000 / frame_ms)):
+            samples = array.array('h')
+            for _ in range(frame_len):
+                t = n / sample_rate
+                if kind == 'tone':
+                    value = level * (0.6 * math.sin(2 * math.pi * 440 * t) + 0.3 * math.sin(2 * math.pi * 880 * t)
+                                     + 0.1 * math.sin(2 * math.pi * 1320 * t)) + rng.gauss(0, 20)
+                elif kind == 'noise':
+                    value = rng.gauss(0, level)
+                else:
+                    value = 0
+                samples.append(max(-32768, min(32767, int(value))))
+                n += 1
+            yield samples.tobytes()
+
+
+def run_harness(config: Optional[VadConfig] = None) -> bool:
+    """Feed synthetic noise/tone sequences through the VAD and check the events"""
+    config = config or VadConfig()
+    frame_bytes = DEFAULT_SAMPLE_RATE * DEFAULT_SAMPLE_WIDTH * config.frame_ms // 1000
+    bytes_per_second = DEFAULT_SAMPLE_RATE * DEFAULT_SAMPLE_WIDTH
+    cases = [
+        ("quiet room, one utterance", [('noise', 1.0, 40), ('tone', 1.0, 3000), ('noise', 1.0, 40)],
+         [(VadEventType.SPEECH_START, 1.0), (VadEventType.SPEECH_END, 2.0)]),
+        ("noise only never triggers", [('noise', 3.0, 300)], []),
+        ("noise floor rises, louder speech still detected",
+         [('noise', 1.0, 40), ('noise', 1.0, 100), ('noise', 1.0, 200), ('noise', 1.0, 400),
+          ('tone', 0.8, 8000), ('noise', 1.0, 400)],
+         [(VadEventType.SPEECH_START, 4.0), (VadEventType.SPEECH_END, 4.8)]),
+        ("two utterances separated by a pause",
+         [('noise', 0.5, 40), ('tone', 0.5, 3000), ('noise', 1.0, 40), ('tone', 0.5, 3000), ('noise', 1.0, 40)],
+         [(VadEventType.SPEECH_START, 0.5), (VadEventType.SPEECH_END, 1.0),
+          (VadEventType.SPEECH_START, 2.0), (VadEventType.SPEECH_END, 2.5)]),
+        ("short click ignored", [('noise', 0.5, 40), ('tone', 0.02, 5000), ('noise', 1.0, 40)], []),
+    ]
+    tolerance = 0.1
+    passed = True
+    for name, pattern, expected in cases:
+        vad = VoiceActivityDetector(config)
+        events = [e for e in (vad.process(f) for f in synthetic_sequence(pattern)) if e is not None]
+        got = [(e.type, e.position / bytes_per_second) for e in events]
+        ok = len(got) == len(expected) and all(
+            g[0] is x[0] and abs(g[1] - x[1]) <= tolerance for g, x in zip(got, expected))
+        passed &= ok
+        detail = ", ".join(f"{t.value}@{s:.2f}s" for t, s in got) or "no events"
+        print(f"{'PASS' if ok else 'FAIL'}  {name}: {detail}")
+
+    segmenter = UtteranceSegmenter(VoiceActivityDetector(config), max_segment_ms=500)
+    pattern = [('noise', 0.5, 40), ('tone', 1.5, 3000), ('noise', 1.0, 40)]
+    segments = [s for s in (segmenter.process(f) for f in synthetic_sequence(pattern)) if s is not None]
+    ok = bool(segments) and segments[0].truncated and len(segments[0].audio) <= 500 * frame_bytes // config.frame_ms
+    passed &= ok
+    print(f"{'PASS' if ok else 'FAIL'}  segmenter cuts long speech at the phrase limit")
+    return passed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the VAD against synthetic noise and tone sequences")
+    parser.add_argument("--no-spectral", action="store_true", help="disable the spectral flatness check")
+    args = parser.parse_args()
+    raise SystemExit(0 if run_harness(VadConfig(use_spectral=not args.no_spectral)) else 1)
@@ -0,0 +1,199 @@
+"""Asyncio voice pipeline for Beastboy.
+
+One event loop lives for the whole process on its own thread. The stages
+listen -> recognize -> route -> speak run as coroutines connected by bounded
+queues. Blocking work (recognition, service lookups, translation) is
+offloaded to a bounded thread pool, and audio capture has a dedicated
+thread, so a slow service can never stall the microphone: when the
+recognize queue is full the oldest pending utterance is dropped instead.
+"""
+
+import asyncio
+import contextvars
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Callable, Coroutine, Optional
+
+from log_pipeline import correlation_id, new_correlation_id
+from metrics import MetricsRegistry, Trace, current_trace
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class Turn:
+    """One utterance travelling through the pipeline"""
+    audio: bytes
+    captured_at: float = field(default_factory=time.perf_counter)
+    text: str = ""
+    language: str = 'en'
+    response: Optional[str] = None
+    trace: Optional[Trace] = None
+    correlation_id: str = field(default_factory=new_correlation_id)
+
+
+class VoicePipeline:
+    """Runs the assistant's stages on a single long-lived event loop.
+
+    ``assistant`` must provide ``next_command_audio()`` (blocking),
+    ``recognize_command(audio) -> (text, language)``, ``process_command(text)``
+    and ``speak(text, language)``.
+    """
+
+    def __init__(self, assistant, queue_size: int = 4, max_workers: int = 4,
+                 metrics: Optional[MetricsRegistry] = None):
+        self.assistant = assistant
+        self.metrics = metrics or MetricsRegistry()
+        self.queue_size = queue_size
+        self.max_workers = max_workers
+        self.loop = asyncio.new_event_loop()
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="beastboy-io")
+        self.audio_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="beastboy-audio")
+        self.loop.set_default_executor(self.executor)
+        self.dropped = 0
+        self._thread: Optional[threading.Thread] = None
+        self._tasks = []
+        self._ready = threading.Event()
+
+    @property
+    def running(self) -> bool:
+        return self.loop.is_running()
+
+    def start(self):
+        """Start the loop thread and the pipeline stages"""
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run_loop, name="beastboy-loop", daemon=True)
+        self._thread.start()
+        self._ready.wait(5)
+
+    def _run_loop(self):
+        asyncio.set_event_loop(self.loop)
+        self._slots = asyncio.Semaphore(self.max_workers)
+        self.recognize_queue: "asyncio.Queue[Turn]" = asyncio.Queue(self.queue_size)
+        self.route_queue: "asyncio.Queue[Turn]" = asyncio.Queue(self.queue_size)
+        self.speak_queue: "asyncio.Queue[Turn]" = asyncio.Queue(self.queue_size)
+        self._tasks = [
+            self.loop.create_task(self._listen_stage(), name="listen"),
+            self.loop.create_task(self._recognize_stage(), name="recognize"),
+            self.loop.create_task(self._route_stage(), name="route"),
+            self.loop.create_task(self._speak_stage(), name="speak"),
+        ]
+        self.loop.call_soon(self._ready.set)
+        try:
+            self.loop.run_forever()
+        finally:
+            self.loop.run_until_complete(self.loop.shutdown_asyncgens())
+            self.loop.close()
+
+    def stop(self, timeout: float = 5.0):
+        """Cancel the stages, run pending cleanup and stop the loop"""
+        if self._thread is None:
+            return
+
+        async def shutdown():
+            for task in self._tasks:
+                task.cancel()
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+
+        if self.loop.is_running():
+            try:
+                asyncio.run_coroutine_threadsafe(shutdown(), self.loop).result(timeout)
+            except Exception as e:
+                logger.warning(f"Pipeline shutdown incomplete: {e}")
+            self.loop.call_soon_threadsafe(self.loop.stop)
+        if self._thread is not threading.current_thread():
+            self._thread.join(timeout)
+        self._thread = None
+        self.executor.shutdown(wait=False)
+        self.audio_executor.shutdown(wait=False)
+
+    def run_coroutine(self, coro: Coroutine, timeout: Optional[float] = None) -> Any:
+        """Run a coroutine on the pipeline loop from any other thread and wait for it"""
+        if threading.current_thread() is self._thread:
+            coro.close()
+            raise RuntimeError("run_coroutine would deadlock when called on the pipeline loop")
+        return asyncio.run_coroutine_threadsafe(coro, self.loop).result(timeout)
+
+    async def offload(self, func: Callable, *args, trace: Optional[Trace] = None) -> Any:
+        """Run a blocking call on the bounded executor, waiting for a free slot.
+
+        ``trace`` becomes the current trace in the worker, so stages timed
+        there are added to it. The worker also inherits the stage's
+        correlation ID, so its log records belong to the same utterance.
+        """
+        context = contextvars.copy_context()
+        context.run(current_trace.set, trace)
+        async with self._slots:
+            return await self.loop.run_in_executor(self.executor, context.run, func, *args)
+
+    @staticmethod
+    def _offer(queue: asyncio.Queue, turn: Turn) -> bool:
+        """Non-blocking put that drops the oldest item when the queue is full"""
+        dropped = False
+        if queue.full():
+            stale = queue.get_nowait()
+            logger.warning(f"Pipeline backlog, dropped utterance from "
+                           f"{time.perf_counter() - stale.captured_at:.1f}s ago")
+            dropped = True
+        queue.put_nowait(turn)
+        return dropped
+
+    async def _listen_stage(self):
+        while True:
+            try:
+                audio = await self.loop.run_in_executor(self.audio_executor, self.assistant.next_command_audio)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Error in listen stage: {e}")
+                await asyncio.sleep(1)  # Prevent rapid error loops
+                continue
+            if audio:
+                self.metrics.counter("utterances", "Utterances captured after a wake word").inc()
+                turn = Turn(audio)
+                turn.trace = self.metrics.start_trace(started=turn.captured_at)
+                if self._offer(self.recognize_queue, turn):
+                    self.dropped += 1
+                    self.metrics.counter("dropped_utterances", "Utterances dropped from a full queue").inc()
+
+    async def _recognize_stage(self):
+        while True:
+            turn = await self.recognize_queue.get()
+            correlation_id.set(turn.correlation_id)
+            try:
+                turn.text, turn.language = await self.offload(self.assistant.recognize_command, turn.audio,
+                                                                    trace=turn.trace)
+            except Exception as e:
+                logger.error(f"Error in recognize stage: {e}")
+                continue
+            if turn.text:
+                await self.route_queue.put(turn)
+
+    async def _route_stage(self):
+        while True:
+            turn = await self.route_queue.get()
+            correlation_id.set(turn.correlation_id)
+            try:
+                turn.response = await self.offload(self.assistant.process_command, turn.text, trace=turn.trace)
+            except Exception as e:
+                logger.error(f"Error in route stage: {e}")
+                continue
+            if turn.response:
+                await self.speak_queue.put(turn)
+
+    async def _speak_stage(self):
+        while True:
+            turn = await self.speak_queue.get()
+            correlation_id.set(turn.correlation_id)
+            try:
+                # speak() only enqueues for the TTS worker, but may translate first
+                await self.offload(self.assistant.speak, turn.response, turn.language, trace=turn.trace)
+                seconds = time.perf_counter() - turn.captured_at
+                self.metrics.observe("turn", seconds, turn.captured_at)
+                logger.info(f"Turn handled in {seconds:.2f}s")
+            except Exception as e:
+                logger.error(f"Error in speak stage: {e}")
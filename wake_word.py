@@ -0,0 +1,323 @@
+"""On-device wake-word detection for Beastboy.
+
+Frames from the capture ring buffer are run through the VAD, which cuts out
+short speech segments. A detector then decides whether a segment is one
+of the configured wake words, without sending idle room audio to a cloud
+recognizer. Full recognition only starts once a detector fires. Until wake
+words are enrolled as templates, speech segments are transcribed instead;
+with that fallback turned off, building the detector fails rather than
+leaving the assistant deaf.
+"""
+
+import argparse
+import logging
+import math
+import time
+import wave
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+from audio_capture import DEFAULT_SAMPLE_RATE, DEFAULT_SAMPLE_WIDTH, NUMPY_AVAILABLE, pcm_samples
+from vad import SpeechSegment, UtteranceSegmenter, VoiceActivityDetector
+
+if NUMPY_AVAILABLE:
+    import numpy as np
+
+logger = logging.getLogger(__name__)
+
+FRAME_MS = 20
+MAX_WAKE_WORD_MS = 2000
+MIN_WAKE_WORD_MS = 150
+
+
+class WakeWordUnavailable(RuntimeError):
+    """No detector could ever fire with the current configuration"""
+
+
+@dataclass
+class WakeWordEvent:
+    word: str
+    score: float
+    start: int  # byte offsets into the processed stream
+    end: int
+
+
+def extract_features(audio: bytes, sample_rate: int = DEFAULT_SAMPLE_RATE) -> List[Tuple[float, ...]]:
+    """Per-frame feature vectors with the segment's mean log energy removed.
+
+    With NumPy this is log energy in 12 log-spaced spectral bands; without it
+    a cheaper log energy / high-frequency ratio / zero-crossing triple. Only
+    the overall level is normalised, so spectral shape still counts.
+    """
+    frame_len = sample_rate * FRAME_MS // 1000
+    samples = pcm_samples(audio)
+    count = len(samples) // frame_len
+    if count == 0:
+        return []
+
+    if NUMPY_AVAILABLE:
+        frames = samples[:count * frame_len].astype(np.float32).reshape(count, frame_len)
+        spectrum = np.abs(np.fft.rfft(frames * np.hanning(frame_len), axis=1)) ** 2
+        edges = np.unique(np.geomspace(2, spectrum.shape[1], 13).astype(int))
+        bands = np.stack([spectrum[:, lo:hi].sum(axis=1) for lo, hi in zip(edges[:-1], edges[1:])], axis=1)
+        features = np.log(bands + 1.0)
+        features -= features.mean()
+        return [tuple(row) for row in features.tolist()]
+
+    features = []
+    for i in range(count):
+        frame = samples[i * frame_len:(i + 1) * frame_len]
+        energy = sum(x * x for x in frame) / frame_len
+        diff_energy = sum((frame[j] - frame[j - 1]) ** 2 for j in range(1, frame_len)) / frame_len
+        crossings = sum(1 for j in range(1, frame_len) if (frame[j] >= 0) != (frame[j - 1] >= 0))
+        features.append((math.log(energy + 1.0), math.log((diff_energy + 1.0) / (energy + 1.0)),
+                         4.0 * crossings / frame_len))
+    mean_energy = sum(f[0] for f in features) / count
+    return [(f[0] - mean_energy,) + f[1:] for f in features]
+
+
+def dtw_distance(a: List[Tuple[float, ...]], b: List[Tuple[float, ...]]) -> float:
+    """Length-normalised DTW distance with a Sakoe-Chiba band"""
+    n, m = len(a), len(b)
+    if not n or not m:
+        return math.inf
+    band = max(abs(n - m), max(n, m) // 4) + 1
+    previous = [math.inf] * (m + 1)
+    previous[0] = 0.0
+    for i in range(1, n + 1):
+        current = [math.inf] * (m + 1)
+        ai = a[i - 1]
+        for j in range(max(1, i - band), min(m, i + band) + 1):
+            bj = b[j - 1]
+            cost = math.sqrt(sum((x - y) * (x - y) for x, y in zip(ai, bj)))
+            current[j] = cost + min(previous[j], previous[j - 1], current[j - 1])
+        previous = current
+    return previous[m] / (n + m)
+
+
+def wake_word_segmenter(vad: Optional[VoiceActivityDetector] = None) -> UtteranceSegmenter:
+    """Segmenter that only passes short utterances, as wake words are"""
+    return UtteranceSegmenter(vad or VoiceActivityDetector(), max_segment_ms=MAX_WAKE_WORD_MS,
+                              min_segment_ms=MIN_WAKE_WORD_MS, drop_too_long=True)
+
+
+class WakeWordDetector:
+    """Base class: gates frames and decides whether a segment is a wake word"""
+
+    name = "base"
+
+    def __init__(self, wake_words: List[str], segmenter: Optional[UtteranceSegmenter] = None):
+        self.wake_words = [w.lower() for w in wake_words]
+        self.segmenter = segmenter or wake_word_segmenter()
+
+    def reset(self):
+        self.segmenter.reset()
+
+    def use_vad(self, vad: VoiceActivityDetector):
+        """Gate frames through ``vad``; call on the thread that feeds frames, as this resets its state"""
+        self.segmenter = wake_word_segmenter(vad)
+
+    def process(self, frame: bytes) -> Optional[WakeWordEvent]:
+        segment = self.segmenter.process(frame)
+        if segment is None:
+            return None
+        return self.classify(segment)
+
+    def classify(self, segment: SpeechSegment) -> Optional[WakeWordEvent]:
+        raise NotImplementedError
+
+
+class TemplateWakeWordDetector(WakeWordDetector):
+    """DTW template matcher over a few enrolled recordings per wake word.
+
+    Templates live in ``<templates_dir>/<wake word>/*.wav`` (spaces in the
+    wake word may be written as underscores).
+    """
+
+    name = "template"
+
+    def __init__(self, wake_words: List[str], templates_dir: str = "wake_words",
+                 threshold: float = 0.6, segmenter: Optional[UtteranceSegmenter] = None):
+        super().__init__(wake_words, segmenter)
+        self.threshold = threshold
+        self.templates: List[Tuple[str, List[Tuple[float, ...]]]] = []
+        self.load_templates(templates_dir)
+
+    def load_templates(self, templates_dir: str):
+        root = Path(templates_dir)
+        if not root.is_dir():
+            return
+        for word_dir in sorted(p for p in root.iterdir() if p.is_dir()):
+            word = word_dir.name.replace('_', ' ').lower()
+            if word not in self.wake_words:
+                continue
+            for clip in sorted(word_dir.glob("*.wav")):
+                audio, rate = read_wav(clip)
+                features = extract_features(audio, rate)
+                if features:
+                    self.templates.append((word, features))
+        logger.info(f"Loaded {len(self.templates)} wake-word templates from {templates_dir}")
+
+    def classify(self, segment: SpeechSegment) -> Optional[WakeWordEvent]:
+        features = extract_features(segment.audio, self.segmenter.sample_rate)
+        best_word, best_distance = None, math.inf
+        for word, template in self.templates:
+            distance = dtw_distance(features, template)
+            if distance < best_distance:
+                best_word, best_distance = word, distance
+        if best_word is not None and best_distance <= self.threshold:
+            return WakeWordEvent(best_word, best_distance, segment.start, segment.end)
+        return None
+
+
+class TranscriptWakeWordDetector(WakeWordDetector):
+    """Fallback when no templates are enrolled: transcribe gated segments only.
+
+    Silence and long stretches of speech never reach the recognizer, which is
+    still far cheaper than transcribing every second of room audio.
+    """
+
+    name = "transcript"
+
+    def __init__(self, wake_words: List[str], transcribe: Callable[[bytes], str],
+                 segmenter: Optional[UtteranceSegmenter] = None):
+        super().__init__(wake_words, segmenter)
+        self.transcribe = transcribe
+
+    def classify(self, segment: SpeechSegment) -> Optional[WakeWordEvent]:
+        text = (self.transcribe(segment.audio) or "").lower()
+        for word in sorted(self.wake_words, key=len, reverse=True):
+            if word in text:
+                return WakeWordEvent(word, 1.0, segment.start, segment.end)
+        return None
+
+
+DETECTORS: Dict[str, type] = {
+    TemplateWakeWordDetector.name: TemplateWakeWordDetector,
+    TranscriptWakeWordDetector.name: TranscriptWakeWordDetector,
+}
+
+
+def create_detector(name: str, wake_words: List[str], transcribe: Optional[Callable[[bytes], str]] = None,
+                    vad: Optional[VoiceActivityDetector] = None, fallback: bool = True,
+                    **options) -> WakeWordDetector:
+    """Build a detector by name.
+
+    Without enrolled templates the template detector never fires, so it
+    gives way to the transcript detector, which sends every speech segment
+    to the recognizer. Without ``fallback`` (or ``transcribe``) that raises
+    WakeWordUnavailable instead.
+    """
+    if name not in DETECTORS:
+        raise ValueError(f"Unknown wake-word detector '{name}', choose from {sorted(DETECTORS)}")
+    segmenter = wake_word_segmenter(vad)
+    if name == TemplateWakeWordDetector.name:
+        detector = TemplateWakeWordDetector(wake_words, segmenter=segmenter, **options)
+        if detector.templates:
+            return detector
+        if not fallback or transcribe is None:
+            raise WakeWordUnavailable("No wake-word templates are enrolled and system.wake_word_fallback is off, "
+                                      "so no wake word would ever be detected. Record some with "
+                                      "'python wake_word.py enroll \"hey bb\"' or turn the fallback on")
+        logger.warning("No wake-word templates enrolled: every speech segment is sent to the speech recognizer "
+                       "until they are recorded with 'python wake_word.py enroll \"hey bb\"'")
+    return TranscriptWakeWordDetector(wake_words, transcribe, segmenter=segmenter)
+
+
+def read_wav(path) -> Tuple[bytes, int]:
+    """Read a mono 16-bit WAV file"""
+    with wave.open(str(path), 'rb') as wav:
+        if wav.getnchannels() != 1 or wav.getsampwidth() != 2:
+            raise ValueError(f"{path}: expected mono 16-bit PCM")
+        return wav.readframes(wav.getnframes()), wav.getframerate()
+
+
+def iter_frames(audio: bytes, sample_rate: int = DEFAULT_SAMPLE_RATE) -> Iterator[bytes]:
+    """Split PCM into FRAME_MS frames"""
+    size = sample_rate * FRAME_MS // 1000 * DEFAULT_SAMPLE_WIDTH
+    for i in range(0, len(audio) - size + 1, size):
+        yield audio[i:i + size]
+
+
+def benchmark(detector: WakeWordDetector, clips_dir: str) -> dict:
+    """Run a detector over ``clips_dir/positive`` and ``clips_dir/negative`` WAVs.
+
+    Reports CPU seconds per second of audio plus false-reject (positives
+    missed) and false-accept (negatives triggered) rates.
+    """
+    results = {"positive": [0, 0], "negative": [0, 0]}  # [clips, fired]
+    audio_seconds = 0.0
+    cpu = 0.0
+    for label in results:
+        for clip in sorted(Path(clips_dir, label).glob("*.wav")):
+            audio, rate = read_wav(clip)
+            # Pad with silence so the VAD hangover can close the segment
+            audio += b'\0' * (rate * DEFAULT_SAMPLE_WIDTH // 2)
+            detector.reset()
+            started = time.process_time()
+            fired = any(detector.process(frame) for frame in iter_frames(audio, rate))
+            cpu += time.process_time() - started
+            audio_seconds += len(audio) / (rate * DEFAULT_SAMPLE_WIDTH)
+            results[label][0] += 1
+            results[label][1] += int(fired)
+
+    positives, hits = results["positive"]
+    negatives, false_hits = results["negative"]
+    return {
+        "clips": positives + negatives,
+        "audio_seconds": round(audio_seconds, 2),
+        "cpu_per_audio_second": round(cpu / audio_seconds, 5) if audio_seconds else None,
+        "false_reject_rate": round(1 - hits / positives, 4) if positives else None,
+        "false_accept_rate": round(false_hits / negatives, 4) if negatives else None,
+    }
+
+
+def enroll(word: str, templates_dir: str, count: int = 3):
+    """Record ``count`` examples of a wake word from the microphone"""
+    from audio_capture import AudioCapture, MicrophoneSource
+
+    target = Path(templates_dir, word.replace(' ', '_'))
+    target.mkdir(parents=True, exist_ok=True)
+    capture = AudioCapture(MicrophoneSource())
+    capture.start()
+    reader = capture.reader()
+    segmenter = wake_word_segmenter(VoiceActivityDetector(sample_rate=capture.sample_rate))
+    frame_size = capture.sample_rate * FRAME_MS // 1000 * capture.sample_width
+    try:
+        for i in range(count):
+            print(f"🎤 Say '{word}' ({i + 1}/{count})")
+            segment = None
+            while segment is None:
+                segment = segmenter.process(reader.read_bytes(frame_size, timeout=2))
+            path = target / f"{int(time.time() * 1000)}.wav"
+            with wave.open(str(path), 'wb') as wav:
+                wav.setnchannels(1)
+                wav.setsampwidth(capture.sample_width)
+                wav.setframerate(capture.sample_rate)
+                wav.writeframes(segment.audio)
+            print(f"Saved {path}")
+    finally:
+        capture.stop()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Beastboy wake-word tools")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    bench = subparsers.add_parser("benchmark", help="measure CPU and FA/FR rates on recorded clips")
+    bench.add_argument("clips", help="folder with positive/ and negative/ WAV subfolders")
+    bench.add_argument("--templates", default="wake_words")
+    bench.add_argument("--threshold", type=float, default=0.6)
+    bench.add_argument("--wake-words", nargs="+", default=["hey bb", "bb", "beastboy"])
+
+    rec = subparsers.add_parser("enroll", help="record wake-word templates from the microphone")
+    rec.add_argument("word")
+    rec.add_argument("--templates", default="wake_words")
+    rec.add_argument("--count", type=int, default=3)
+
+    args = parser.parse_args()
+    if args.command == "benchmark":
+        print(benchmark(TemplateWakeWordDetector(args.wake_words, args.templates, args.threshold), args.clips))
+    else:
+        enroll(args.word, args.templates, args.count)